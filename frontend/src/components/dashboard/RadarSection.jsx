@@ -17,12 +17,12 @@ const RadarSection = () => {
     setRadarError(null);
     try {
       const data = await getSatelliteImage(band, palette, forceRefresh);
-      if (data.image) {
-        setRadarImage(data.image);
-        setLegendImage(data.legend || '');
+      if (data.image_url) {
+        setRadarImage(data.image_url);
+        setLegendImage(data.legend_url || '');
         setIsCached(data.cached || false);
-        console.log('Imagen recibida (base64):', data.image ? 'Sí' : 'No');
-        console.log('Leyenda recibida (base64):', data.legend ? 'Sí' : 'No');
+        console.log('URL de imagen recibida:', data.image_url);
+        console.log('URL de leyenda recibida:', data.legend_url);
         console.log('¿Usando caché?:', data.cached ? 'Sí' : 'No');
       } else {
         setRadarError(data.error || 'No se pudo cargar la imagen del radar.');
@@ -1,24 +1,15 @@
-import matplotlib.pyplot as plt
-import numpy as np
 import os
+import sys
 
-# Definir la paleta y el rango de valores
-palette = 'inferno'
-vmin, vmax = -80, 40 # Rango en Celsius para la banda 13
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Crear una figura y un eje
-fig, ax = plt.subplots(figsize=(1, 5), dpi=100) # Figura delgada y alta
+from src.config import Config
+from src.services.goes_service import VALID_PALETTES, legend_registry
 
-# Crear un gradiente de colores
-cmap = plt.get_cmap(palette)
-norm = plt.Normalize(vmin=vmin, vmax=vmax)
+# Genera por adelantado las leyendas de todas las paletas para las bandas y productos derivados
+# que publica la ingesta, más las clases visible (2) e infrarroja (13) que se piden a demanda
+bands = sorted({2, 13, *Config.GOES_BANDS, *Config.GOES_DERIVED_PRODUCTS})
+legend_registry.warm_up(VALID_PALETTES.values(), bands)
 
-cb = plt.colorbar(plt.cm.ScalarMappable(cmap=cmap, norm=norm), cax=ax)
-cb.set_label('Temperatura (°C)', rotation=270, labelpad=15)
-
-# Guardar la leyenda
-output_path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'src', 'static', 'radar_images', 'inferno_legend.png'))
-plt.savefig(output_path, bbox_inches='tight', transparent=True)
-plt.close(fig)
-
-print(f"Leyenda 'inferno' generada en: {output_path}")
+for filename in sorted(os.listdir(legend_registry.folder)):
+    print(f"Leyenda generada en: {os.path.join(legend_registry.folder, filename)}")
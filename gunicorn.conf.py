@@ -0,0 +1,9 @@
+# Configuración de gunicorn: gunicorn -c gunicorn.conf.py src.app:app
+# Las tareas de fondo no arrancan al importar la app: cada worker las inicia después
+# del fork (la ingesta GOES y la grilla de granizo quedan en un solo worker).
+
+
+def post_fork(server, worker):
+    from src.app import start_background_workers
+
+    start_background_workers()
@@ -0,0 +1,76 @@
+"""
+Benchmark de las animaciones GOES para N=12 y N=48 cuadros.
+
+Llena un FrameStore temporal con recortes sintéticos que se desplazan entre escaneos y
+mide con FrameAnimator:
+- codificación en frío (cuantización de todos los cuadros + WebP/APNG) y su tamaño,
+- un escaneo nuevo: agregar un cuadro y volver a codificar (solo se cuantiza ese),
+- el PNG de un cuadro suelto (lo que descarga el cliente del manifiesto por escaneo).
+
+Uso: python scripts/bench_animation.py [filas] [columnas]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_render import synthetic_crop
+from src.services.goes_frames import FrameAnimator, FrameStore
+
+BAND = 13
+PALETTE = 'inferno'
+FRAME_COUNTS = (12, 48)
+START = datetime(2026, 10, 18, 12, 0, tzinfo=timezone.utc)
+
+
+def frame_key(i):
+    return (START + timedelta(minutes=10 * i)).strftime('%Y%m%d_%H%M%S')
+
+
+def fill_store(store, count, base):
+    """Cuadros que se desplazan unas columnas por escaneo, como una tormenta en movimiento"""
+    for i in range(count):
+        store.append(BAND, frame_key(i), np.roll(base, 3 * i, axis=1))
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 275
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    base = synthetic_crop(rows, cols)
+
+    print(f"🎞️ Recortes {rows}x{cols}, banda {BAND}, paleta {PALETTE}")
+    for count in FRAME_COUNTS:
+        with tempfile.TemporaryDirectory() as folder:
+            store = FrameStore(folder, capacity=max(FRAME_COUNTS))
+            fill_store(store, count, base)
+
+            for fmt in ('WEBP', 'PNG'):
+                animator = FrameAnimator(store)
+                frames = animator.recent_frames(BAND, count)
+                data, cold_ms = timed(lambda: animator.render_animation(BAND, PALETTE, frames, fmt=fmt))
+                _, cached_ms = timed(lambda: animator.render_animation(BAND, PALETTE, frames, fmt=fmt))
+
+                store.append(BAND, frame_key(count), np.roll(base, 3 * count, axis=1))
+                frames = animator.recent_frames(BAND, count)
+                _, append_ms = timed(lambda: animator.render_animation(BAND, PALETTE, frames, fmt=fmt))
+
+                print(f"   N={count:2d} {fmt:4s}: frío {cold_ms:7.1f} ms  {len(data) / 1024:8.1f} KB  "
+                      f"caché {cached_ms:5.2f} ms  escaneo nuevo {append_ms:7.1f} ms")
+
+            frame_png, frame_ms = timed(lambda: FrameAnimator(store).render_frame(BAND, PALETTE, frame_key(count)))
+            print(f"   N={count:2d} cuadro suelto (manifiesto): {frame_ms:6.1f} ms  {len(frame_png) / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark del micro-batching de predicciones con 1, 8, 32 y 128 clientes concurrentes.
+
+Cada cliente hace predicciones de una fila seguidas. Se compara:
+- directo: cada pedido llama al modelo con lote de 1 (las llamadas al modelo se
+  serializan, como pasa con un único modelo Keras en el proceso),
+- micro-batching: los pedidos pasan por MicroBatcher, que junta los que llegan en la
+  ventana y hace una sola llamada.
+
+Por defecto el modelo es un costo simulado (overhead fijo por llamada + costo por fila,
+ajustables); con --model se usa el modelo de granizo real (hail_model.predict).
+
+Uso: python scripts/bench_batching.py [--model] [pedidos_por_cliente] [overhead_ms] [ms_por_fila]
+"""
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.config import Config
+from src.services.hail_features import FEATURE_ORDER
+from src.services.inference_batcher import MicroBatcher
+
+CONCURRENCY = (1, 8, 32, 128)
+
+
+def simulated_model(overhead_ms, per_row_ms):
+    def predict(matrix):
+        time.sleep((overhead_ms + per_row_ms * len(matrix)) / 1000)
+        return np.full(len(matrix), 0.5, dtype=np.float32)
+    return predict
+
+
+def run(callers, requests_per_caller, predict):
+    row = np.zeros(len(FEATURE_ORDER), dtype=np.float32)
+    latencies = []
+    lock = threading.Lock()
+
+    def caller():
+        own = []
+        for _ in range(requests_per_caller):
+            started = time.perf_counter()
+            predict(row)
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=caller) for _ in range(callers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return len(latencies) / elapsed, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95) - 1] * 1000
+
+
+def main():
+    args = sys.argv[1:]
+    use_model = '--model' in args
+    args = [arg for arg in args if arg != '--model']
+    requests_per_caller = int(args[0]) if len(args) > 0 else 20
+    overhead_ms = float(args[1]) if len(args) > 1 else 8
+    per_row_ms = float(args[2]) if len(args) > 2 else 0.05
+
+    if use_model:
+        from src.services.hail_model import hail_model
+        hail_model.warm_up()
+        model = hail_model.predict
+        print(f"🧠 Modelo real {hail_model.version}")
+    else:
+        model = simulated_model(overhead_ms, per_row_ms)
+        print(f"🧠 Modelo simulado: {overhead_ms} ms por llamada + {per_row_ms} ms por fila")
+
+    model_lock = threading.Lock()
+
+    def direct(row):
+        with model_lock:
+            return model(row[np.newaxis, :])[0]
+
+    batcher = MicroBatcher(model, max_batch=Config.PREDICTION_BATCH_MAX_SIZE,
+                           max_wait_ms=Config.PREDICTION_BATCH_MAX_WAIT_MS)
+    print(f"   lote máximo {batcher.max_batch}, ventana {batcher.max_wait * 1000:.1f} ms, "
+          f"{requests_per_caller} pedidos por cliente")
+
+    for callers in CONCURRENCY:
+        for label, predict in (("directo", direct), ("micro-batching", batcher.predict)):
+            rate, p50, p95 = run(callers, requests_per_caller, predict)
+            print(f"   {callers:3d} clientes {label:15s} {rate:8.1f} pred/s  p50 {p50:7.1f} ms  p95 {p95:7.1f} ms")
+    print(f"   estadísticas del batcher: {batcher.stats()}")
+
+
+if __name__ == '__main__':
+    main()
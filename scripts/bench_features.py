@@ -0,0 +1,100 @@
+"""
+Benchmark del armado de features para 10k respuestas sintéticas de Open-Meteo.
+
+- Antes: un dict por respuesta con daily.get(...)[0] y np.mean sobre listas (el
+  _transform_data_for_model original), luego la fila en el orden del modelo.
+- Después, por fila: hail_features.build_row para cada respuesta.
+- Después, en lote: hail_features.build_matrix con todas las respuestas en una pasada.
+
+Reporta filas por segundo y verifica que el lote y las filas sueltas coincidan.
+
+Uso: python scripts/bench_features.py [respuestas]
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.services.hail_features import DAILY_VARIABLES, FEATURE_ORDER, HOURLY_VARIABLES, build_matrix, build_row
+
+
+def synthetic_responses(count, seed=0):
+    """Respuestas con la forma de Open-Meteo (1 día, 24 horas), con algún dato faltante"""
+    rng = random.Random(seed)
+    responses, lats, lons = [], [], []
+    for _ in range(count):
+        daily = {variable: [round(rng.uniform(0, 40), 1)] for variable in DAILY_VARIABLES}
+        daily["time"] = ["2026-10-18"]
+        hourly = {variable: [round(rng.uniform(-5, 1020), 1) for _ in range(24)] for variable in HOURLY_VARIABLES}
+        if rng.random() < 0.05:
+            daily["rain_sum"] = [None]
+        responses.append({"daily": daily, "hourly": hourly})
+        lats.append(rng.uniform(-37.5, -32.0))
+        lons.append(rng.uniform(-70.5, -66.5))
+    return responses, lats, lons
+
+
+def legacy_row(lat, lon, data):
+    """_transform_data_for_model original + la fila en el orden del scaler"""
+    daily = data.get("daily", {})
+    hourly = data.get("hourly", {})
+    tmax = daily.get("temperature_2m_max", [0])[0]
+    tmin = daily.get("temperature_2m_min", [0])[0]
+    now = datetime.now()
+    features = {
+        "PRCP": daily.get("precipitation_sum", [0])[0],
+        "SNWD": daily.get("snowfall_sum", [0])[0],
+        "TAVG": (tmax + tmin) / 2,
+        "TMAX": tmax,
+        "TMIN": tmin,
+        "latitude": lat,
+        "longitude": lon,
+        "om_weather_code": daily.get("weather_code", [0])[0],
+        "om_rain_sum": daily.get("rain_sum", [0])[0],
+        "om_snowfall_sum": daily.get("snowfall_sum", [0])[0],
+        "om_precipitation_hours": daily.get("precipitation_hours", [0])[0],
+        "om_wind_gusts_10m_max": daily.get("wind_gusts_10m_max", [0])[0],
+        "om_wind_direction_10m_dominant": daily.get("wind_direction_10m_dominant", [0])[0],
+        "om_shortwave_radiation_sum": daily.get("shortwave_radiation_sum", [0])[0],
+        "om_et0_fao_evapotranspiration": daily.get("et0_fao_evapotranspiration", [0])[0],
+        "om_dew_point_2m_mean": np.mean(hourly.get("dew_point_2m", [0])),
+        "om_relative_humidity_2m_mean": np.mean(hourly.get("relative_humidity_2m", [0])),
+        "om_pressure_msl_mean": np.mean(hourly.get("pressure_msl", [0])),
+        "año": now.year,
+        "mes": now.month,
+        "dia_del_año": now.timetuple().tm_yday,
+        "rango_temp_diario": tmax - tmin,
+    }
+    return np.array([features[name] or 0 for name in FEATURE_ORDER], dtype=np.float32)
+
+
+def timed(label, count, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"   {label:22s} {elapsed * 1000:9.1f} ms  {count / elapsed:12,.0f} filas/s")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    responses, lats, lons = synthetic_responses(count)
+    today = date(2026, 10, 18)
+
+    print(f"🧮 {count} respuestas sintéticas, {len(FEATURE_ORDER)} features")
+    timed("antes (dict por fila)", count, lambda: np.stack([legacy_row(lat, lon, r) for r, lat, lon in zip(responses, lats, lons)]))
+    rows = timed("build_row por fila", count, lambda: np.stack([build_row(r, lat, lon, today) for r, lat, lon in zip(responses, lats, lons)]))
+    matrix = timed("build_matrix en lote", count, lambda: build_matrix(responses, lats, lons, today))
+
+    same = np.array_equal(rows, matrix)
+    print(f"   lote y filas sueltas {'idénticos' if same else 'DISTINTOS'} ({matrix.shape}, {matrix.dtype})")
+    sys.exit(0 if same else 1)
+
+
+if __name__ == '__main__':
+    main()
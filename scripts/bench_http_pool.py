@@ -0,0 +1,88 @@
+"""
+Benchmark: 100 llamadas secuenciales a un servidor HTTP local con requests.get suelto
+(una conexión TCP nueva por llamada, como antes) vs el cliente con pool de conexiones
+keep-alive de http_client.
+
+El servidor de prueba responde un JSON chico con HTTP/1.1 y puede agregar una demora
+fija al aceptar cada conexión nueva para simular el handshake TCP+TLS a un servicio
+remoto (con localhost el handshake es casi gratis y la diferencia se subestima).
+
+Uso: python scripts/bench_http_pool.py [llamadas] [demora_conexion_ms]
+"""
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from src.services.http_client import UpstreamClient
+
+PAYLOAD = json.dumps({"daily": {"temperature_2m_max": [31.2]}, "hourly": {}}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Mantiene la conexión abierta entre requests
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connect_delay = 0.0
+    connections = 0
+
+    def process_request(self, request, client_address):
+        # Una vez por conexión aceptada: simula el costo del handshake
+        self.connections += 1
+        if self.connect_delay:
+            time.sleep(self.connect_delay)
+        socketserver.ThreadingMixIn.process_request(self, request, client_address)
+
+
+def run(label, get, calls, server):
+    connections = server.connections
+    latencies = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        response = get()
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    total = sum(latencies)
+    print(f"   {label:22s} total {total * 1000:8.1f} ms  media {total / calls * 1000:6.2f} ms  "
+          f"p95 {latencies[int(calls * 0.95) - 1] * 1000:6.2f} ms  conexiones {server.connections - connections}")
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    delay_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    server.connect_delay = delay_ms / 1000
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/forecast"
+
+    print(f"🌐 {calls} llamadas secuenciales a {url} (demora por conexión nueva {delay_ms:.0f} ms)")
+    run("requests.get suelto", lambda: requests.get(url, timeout=10), calls, server)
+    client = UpstreamClient('stub', timeout=(3.05, 10), retries=0)
+    run("UpstreamClient (pool)", lambda: client.get(url), calls, server)
+    print(f"   métricas del cliente: {client.stats()}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: lectura por rangos del recorte de Mendoza vs descarga completa del NetCDF.
+
+Sirve un archivo CMIPF local con un cliente S3 falso (head_object, get_object con
+Range y download_file) que cuenta los bytes transferidos. Opcionalmente agrega una
+latencia fija por GET para aproximar la de S3.
+
+- Antes: download_file a un temporal + xarray.open_dataset + sel (camino original).
+- Después: read_cmi_crop con GETs por rango, con la caché de ventanas vacía (frío)
+  y ya cargada (caliente).
+
+Uso: python scripts/bench_range_read.py <archivo_CMIPF.nc> [latencia_ms_por_GET] [repeticiones]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.services.goes_crop_index import MENDOZA_BBOX, CropIndexCache
+from src.services.goes_remote import read_cmi_crop
+
+
+class LocalS3:
+    """Cliente S3 falso sobre un archivo local: cuenta GETs y bytes"""
+
+    def __init__(self, path, latency_ms=0):
+        self.path = path
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self.bytes = 0
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def head_object(self, Bucket, Key):
+        self._wait()
+        return {'ContentLength': os.path.getsize(self.path)}
+
+    def get_object(self, Bucket, Key, Range=None):
+        self._wait()
+        with open(self.path, 'rb') as f:
+            if Range:
+                start, end = (int(value) for value in Range.split('=')[1].split('-'))
+                f.seek(start)
+                data = f.read(end - start + 1)
+            else:
+                data = f.read()
+        self.requests += 1
+        self.bytes += len(data)
+        return {'Body': _Body(data)}
+
+    def download_file(self, Bucket, Key, Filename):
+        self._wait()
+        shutil.copyfile(self.path, Filename)
+        self.requests += 1
+        self.bytes += os.path.getsize(self.path)
+
+
+class _Body:
+    def __init__(self, data):
+        self._data = data
+
+    def read(self):
+        return self._data
+
+
+def full_download(path, latency_ms, folder):
+    """Camino original: descarga completa a disco, xarray y sel sobre x/y"""
+    import xarray as xr
+    from pyproj import Proj
+
+    s3 = LocalS3(path, latency_ms)
+    local_path = os.path.join(folder, 'temp_goes_image.nc')
+    started = time.perf_counter()
+    s3.download_file('local', os.path.basename(path), local_path)
+    with xr.open_dataset(local_path) as ds:
+        proj_info = ds.goes_imager_projection
+        h_sat, lon_cen = proj_info.perspective_point_height, proj_info.longitude_of_projection_origin
+        p = Proj(proj='geos', h=h_sat, lon_0=lon_cen)
+        x1, y1 = p(MENDOZA_BBOX[0], MENDOZA_BBOX[1])
+        x2, y2 = p(MENDOZA_BBOX[2], MENDOZA_BBOX[3])
+        ds['x'] = ds['x'] * h_sat
+        ds['y'] = ds['y'] * h_sat
+        recorte = ds.sel(x=slice(x1, x2), y=slice(y2, y1))['CMI'].values
+    elapsed = time.perf_counter() - started
+    disk = os.path.getsize(local_path)
+    os.remove(local_path)
+    return recorte, elapsed, s3, disk
+
+
+def range_read(path, latency_ms, crop_index):
+    s3 = LocalS3(path, latency_ms)
+    started = time.perf_counter()
+    recorte, _ = read_cmi_crop(s3, 'local', os.path.basename(path), MENDOZA_BBOX, crop_index)
+    return recorte, time.perf_counter() - started, s3
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    path = sys.argv[1]
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 0
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    print(f"📦 {os.path.basename(path)}: {os.path.getsize(path) / 1e6:.1f} MB, latencia por GET {latency_ms:.0f} ms")
+    with tempfile.TemporaryDirectory() as folder:
+        baseline = None
+        try:
+            runs = [full_download(path, latency_ms, folder) for _ in range(repeats)]
+            baseline = runs[-1][0]
+            best = min(run[1] for run in runs)
+            print(f"   antes  (descarga completa): {best * 1000:8.1f} ms  {runs[-1][2].bytes / 1e6:8.2f} MB  "
+                  f"{runs[-1][2].requests} GETs  disco temporal {runs[-1][3] / 1e6:.1f} MB")
+        except ImportError as e:
+            print(f"⚠️ Sin {e.name}: se omite el camino original")
+
+        crop_index = CropIndexCache(os.path.join(folder, 'crop_index.json'))
+        recorte, elapsed, s3 = range_read(path, latency_ms, crop_index)
+        print(f"   después (frío, sin ventanas): {elapsed * 1000:8.1f} ms  {s3.bytes / 1e6:8.2f} MB  {s3.requests} GETs")
+        runs = [range_read(path, latency_ms, crop_index) for _ in range(repeats)]
+        best = min(run[1] for run in runs)
+        print(f"   después (caliente):          {best * 1000:8.1f} ms  {runs[-1][2].bytes / 1e6:8.2f} MB  "
+              f"{runs[-1][2].requests} GETs  disco temporal 0 MB")
+
+        if baseline is not None:
+            same_shape = baseline.shape == recorte.shape
+            diff = float(np.nanmax(np.abs(baseline - recorte))) if same_shape else None
+            print(f"   mismo recorte: forma {'igual' if same_shape else f'{baseline.shape} vs {recorte.shape}'}"
+                  + (f", diferencia máxima {diff:.6f}" if diff is not None else ""))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: render con matplotlib (figura + savefig, el camino original) vs LUT de NumPy
++ Pillow (goes_render.render_image), sobre un recorte sintético del tamaño del de
+Mendoza en la banda 13.
+
+Mide renders por segundo y el pico de memoria (tracemalloc, que incluye los buffers
+de NumPy) de cada camino, y compara los colores de la LUT con los del colormap de
+matplotlib píxel a píxel.
+
+Uso: python scripts/bench_render.py [renders] [filas] [columnas]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.services.goes_render import BAND_CLASSES, colorize, render_image
+
+PALETTES = ['inferno', 'viridis', 'plasma', 'gray']
+
+
+def synthetic_crop(rows, cols, seed=0):
+    """Campo de temperaturas (°C) con gradiente, núcleos fríos y ruido"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:rows, 0:cols]
+    field = 20 - 40 * y / rows + 10 * np.sin(x / 17.0)
+    for _ in range(6):
+        cy, cx = rng.integers(0, rows), rng.integers(0, cols)
+        field -= 70 * np.exp(-((y - cy) ** 2 + (x - cx) ** 2) / (2 * rng.uniform(5, 25) ** 2))
+    return (field + rng.normal(0, 1.5, field.shape)).astype(np.float32)
+
+
+def render_matplotlib(data, palette, vmin, vmax, path):
+    """Camino original de goes_service (solo la imagen, sin la leyenda)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(5, 5), dpi=100)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.imshow(data, cmap=palette, vmin=vmin, vmax=vmax)
+    ax.axis('off')
+    fig.tight_layout(pad=0)
+    plt.savefig(path, bbox_inches='tight', pad_inches=0, transparent=True)
+    plt.close(fig)
+
+
+def measure(render, data, renders, folder):
+    vmin, vmax = BAND_CLASSES['ir']
+    render(data, PALETTES[0], vmin, vmax, os.path.join(folder, 'warm.png'))  # Carga de módulos y LUT
+    tracemalloc.start()
+    started = time.perf_counter()
+    for i in range(renders):
+        render(data, PALETTES[i % len(PALETTES)], vmin, vmax, os.path.join(folder, f'render_{i}.png'))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(os.path.join(folder, f'render_{renders - 1}.png'))
+    return renders / elapsed, peak, size
+
+
+def color_equivalence(data):
+    """Máxima diferencia por canal entre la LUT y el colormap de matplotlib sobre el recorte"""
+    import matplotlib
+    from matplotlib.colors import Normalize
+
+    vmin, vmax = BAND_CLASSES['ir']
+    worst = 0
+    for palette in PALETTES:
+        expected = matplotlib.colormaps[palette](Normalize(vmin, vmax)(data), bytes=True)
+        worst = max(worst, int(np.abs(colorize(data, palette, vmin, vmax).astype(int) - expected.astype(int)).max()))
+    return worst
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 275
+    cols = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    data = synthetic_crop(rows, cols)
+
+    print(f"🎨 {renders} renders de un recorte {rows}x{cols}")
+    with tempfile.TemporaryDirectory() as folder:
+        for name, render in (("matplotlib", render_matplotlib), ("LUT + Pillow", render_image)):
+            rate, peak, size = measure(render, data, renders, folder)
+            print(f"   {name:13s} {rate:8.1f} renders/s  pico {peak / 1e6:7.2f} MB  PNG {size / 1024:.1f} KB")
+    print(f"   diferencia máxima de color LUT vs matplotlib: {color_equivalence(data)} (0 = idénticos)")
+
+
+if __name__ == '__main__':
+    main()
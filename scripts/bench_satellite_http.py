@@ -0,0 +1,112 @@
+"""
+Benchmark de carga de la imagen satelital: JSON con base64 (el endpoint original) vs
+binario cacheable con ETag/304.
+
+Un cliente que consulta la imagen cada pocos segundos ve casi siempre el mismo escaneo.
+Con el cliente de pruebas de Flask sobre la app real (servicio GOES redirigido a una
+carpeta temporal con un recorte sintético, como en check_single_download) se mide:
+- antes: cada consulta descarga imagen y leyenda en base64 dentro del JSON,
+- después, primera visita: metadatos + PNG + leyenda en binario,
+- después, consultas siguientes del mismo escaneo: metadatos + GET condicional del PNG
+  con If-None-Match (304 sin cuerpo); la leyenda es inmutable y no se vuelve a pedir.
+
+Reporta bytes de cuerpo por consulta y latencia (p50/p95) de cada caso.
+
+Uso: python scripts/bench_satellite_http.py [consultas] [banda] [paleta]
+"""
+import base64
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify, request
+
+from check_single_download import use_temp_goes_folder
+from src.app import app
+
+
+def legacy_satellite_image(goes_service):
+    """Respuesta del endpoint original: imagen y leyenda en base64 dentro del JSON"""
+    def view():
+        band = request.args.get('band', default=13, type=int)
+        palette = request.args.get('palette', default='inferno', type=str)
+        result = goes_service.get_latest_goes_image_url(band, palette)
+        if "error" in result:
+            return jsonify(result), 500
+        image_path = os.path.join(goes_service.STATIC_FOLDER, result["url"].split('/')[-1])
+        legend_path = os.path.join(goes_service.legend_registry.folder, result["legend_url"].split('/')[-1])
+        with open(image_path, 'rb') as f:
+            image_data = base64.b64encode(f.read()).decode('utf-8')
+        with open(legend_path, 'rb') as f:
+            legend_data = base64.b64encode(f.read()).decode('utf-8')
+        return jsonify({
+            "image": f"data:image/png;base64,{image_data}",
+            "legend": f"data:image/png;base64,{legend_data}",
+            "timestamp": result["timestamp"],
+            "cached": result.get("cached", False)
+        })
+    return view
+
+
+def run(label, polls, poll):
+    """poll() -> bytes de cuerpo transferidos en una consulta"""
+    latencies = []
+    total_bytes = 0
+    for _ in range(polls):
+        started = time.perf_counter()
+        total_bytes += poll()
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(f"   {label:32s} {total_bytes / polls / 1024:9.1f} KB/consulta  "
+          f"p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms  p95 {latencies[int(polls * 0.95) - 1] * 1000:6.2f} ms")
+
+
+def main():
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    band = int(sys.argv[2]) if len(sys.argv) > 2 else 13
+    palette = sys.argv[3] if len(sys.argv) > 3 else 'inferno'
+
+    with tempfile.TemporaryDirectory() as folder:
+        goes_service = use_temp_goes_folder(folder, os.path.join(folder, 'get_object.log'))
+        app.add_url_rule('/bench/legacy-satellite-image', 'bench_legacy_satellite_image',
+                         legacy_satellite_image(goes_service))
+        # El escaneo se renderiza y publica una vez; después todas las consultas lo sirven
+        warm = goes_service.get_latest_goes_image_url(band, palette)
+        if "error" in warm:
+            print(f"❌ {warm['error']}")
+            sys.exit(1)
+
+        client = app.test_client()
+        query = {"band": band, "palette": palette}
+        print(f"🛰️ {polls} consultas de la banda {band} ({palette}) con el mismo escaneo")
+
+        def legacy():
+            response = client.get('/bench/legacy-satellite-image', query_string=query)
+            return len(response.data)
+
+        def first_visit():
+            meta = client.get('/api/satellite-image', query_string=query)
+            body = meta.get_json()
+            image = client.get(body["image_url"])
+            legend = client.get(body["legend_url"])
+            return len(meta.data) + len(image.data) + len(legend.data)
+
+        image_path = f'/api/satellite-image/{band}/{palette}.png'
+        etag = client.get(image_path).headers['ETag']
+
+        def revalidate():
+            meta = client.get('/api/satellite-image', query_string=query)
+            image = client.get(image_path, headers={'If-None-Match': etag})
+            assert image.status_code == 304, image.status_code
+            return len(meta.data) + len(image.data)
+
+        run("antes: JSON con base64", polls, legacy)
+        run("después: primera visita", polls, first_visit)
+        run("después: misma imagen (304)", polls, revalidate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark de los tiles XYZ contra la imagen única del endpoint original.
+
+Arma un recorte sintético con la georreferencia real de la banda 13 de GOES-19 (grilla
+fija de 2 km, ventana de Mendoza calculada con compute_crop_windows) y mide, para un
+viewport de 1280x800 px centrado en la ciudad de Mendoza en cada zoom:
+- imagen única: render del recorte completo (render_image) y bytes del PNG, que el
+  cliente descarga entero sin importar el zoom ni lo que se ve,
+- tiles en frío: tiempo hasta el primer tile (incluye la tabla de reproyección y la
+  cuantización del cuadro) y hasta completar el viewport, y bytes del viewport,
+- tiles en caliente: el mismo viewport con las tablas y los PNG ya en caché.
+
+Uso: python scripts/bench_tiles.py [ancho] [alto]
+"""
+import math
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_render import synthetic_crop
+from src.services.goes_crop_index import MENDOZA_BBOX, compute_crop_windows
+from src.services.goes_frames import FrameAnimator, FrameStore
+from src.services.goes_render import BAND_CLASSES, render_image
+from src.services.goes_tiles import MAX_ZOOM, MIN_ZOOM, TILE_SIZE, TileRenderer
+
+BAND = 13
+PALETTE = 'inferno'
+SCAN = '20261018_150000'
+CENTER = (-68.84, -32.89)  # Ciudad de Mendoza
+
+# Grilla fija de disco completo de la banda 13 (GOES-19, 2 km): 5424 x 5424
+H_SAT = 35786023.0
+LON_CEN = -75.0
+GRID_SIZE = 5424
+SCALE = 5.6e-05
+OFFSET = 0.151844
+
+
+def mendoza_georef():
+    """Georreferencia y forma del recorte de Mendoza como las arma read_cmi_regions"""
+    x = -OFFSET + np.arange(GRID_SIZE) * SCALE
+    y = OFFSET - np.arange(GRID_SIZE) * SCALE
+    window = compute_crop_windows(H_SAT, LON_CEN, x, y, {"crop": MENDOZA_BBOX})["crop"]
+    georef = {
+        "h_sat": H_SAT, "lon_cen": LON_CEN,
+        "x_scale": SCALE, "x_offset": -OFFSET,
+        "y_scale": -SCALE, "y_offset": OFFSET,
+        "window": list(window),
+    }
+    return georef, (window[1] - window[0], window[3] - window[2])
+
+
+def viewport_tiles(z, width, height):
+    """Tiles (x, y) que cubren un viewport de width x height px centrado en CENTER"""
+    world = TILE_SIZE * 2 ** z
+    cx = (CENTER[0] + 180.0) / 360.0 * world
+    cy = (1 - math.asinh(math.tan(math.radians(CENTER[1]))) / math.pi) / 2 * world
+    x0, x1 = int((cx - width / 2) // TILE_SIZE), int((cx + width / 2) // TILE_SIZE)
+    y0, y1 = int((cy - height / 2) // TILE_SIZE), int((cy + height / 2) // TILE_SIZE)
+    return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+
+def fetch_viewport(renderer, z, tiles):
+    """(ms hasta el primer tile, ms del viewport completo, bytes del viewport)"""
+    started = time.perf_counter()
+    first_ms = None
+    total_bytes = 0
+    for x, y in tiles:
+        data = renderer.render_tile(BAND, PALETTE, SCAN, z, x, y)
+        total_bytes += len(data)
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+    return first_ms, (time.perf_counter() - started) * 1000, total_bytes
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1280
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 800
+
+    georef, shape = mendoza_georef()
+    crop = synthetic_crop(*shape)
+    print(f"🗺️ Recorte {shape[0]}x{shape[1]} de la banda {BAND}, viewport {width}x{height} px")
+
+    with tempfile.TemporaryDirectory() as folder:
+        vmin, vmax = BAND_CLASSES['ir']
+        image_path = os.path.join(folder, 'single.png')
+        started = time.perf_counter()
+        render_image(crop, PALETTE, vmin, vmax, image_path)
+        single_ms = (time.perf_counter() - started) * 1000
+        single_bytes = os.path.getsize(image_path)
+        print(f"   imagen única: render {single_ms:7.1f} ms  {single_bytes / 1024:7.1f} KB en cada zoom")
+
+        store = FrameStore(os.path.join(folder, 'frames'))
+        store.append(BAND, SCAN, crop, georef=georef)
+
+        for z in range(MIN_ZOOM, MAX_ZOOM + 1):
+            tiles = viewport_tiles(z, width, height)
+            # Cada zoom arranca en frío: tablas de reproyección y cuadro cuantizado nuevos
+            renderer = TileRenderer(FrameAnimator(store))
+            first_ms, cold_ms, viewport_bytes = fetch_viewport(renderer, z, tiles)
+            _, warm_ms, _ = fetch_viewport(renderer, z, tiles)
+            print(f"   z{z:2d} {len(tiles):3d} tiles: primer tile {first_ms:7.1f} ms  viewport frío {cold_ms:8.1f} ms  "
+                  f"caliente {warm_ms:6.2f} ms  {viewport_bytes / 1024:7.1f} KB "
+                  f"({viewport_bytes / single_bytes:4.2f}x la imagen única)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Prueba del descubrimiento de escaneos y de la deduplicación de la ingesta GOES con un
+S3 falso. Se usa el ScanIndex real; el cliente falso implementa el paginador de
+list_objects_v2 (Prefix, StartAfter, páginas de pocas claves) y registra cada llamada.
+
+1. ScanIndex: con horas fijas se verifica la paginación del primer listado, el listado
+   incremental por banda con StartAfter, que las horas cerradas no se vuelvan a listar,
+   latest() (incluido un canal menor publicado después de uno mayor) y la poda de las
+   horas que salen de la ventana.
+2. Ingesta: P procesos corren cada uno un GoesIngestWorker (como los workers de gunicorn
+   sin el lock de tareas de fondo) con poll cada pocos décimos de segundo. El S3 falso
+   publica un escaneo y, a mitad de la prueba, el siguiente. Se espera que cada banda se
+   descargue y cada banda/producto se renderice exactamente una vez por escaneo, aunque
+   el poll vea el mismo escaneo muchas veces.
+
+Uso: python scripts/check_ingest_dedup.py [procesos] [segundos]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from check_single_download import CountingS3, read_log, scan_key, use_temp_goes_folder
+
+PRODUCT = 'ABI-L2-CMIPF'
+BANDS = [13]
+PRODUCTS = [1308]
+INPUT_BANDS = [13, 8]
+PALETTES = ['inferno', 'gray']
+
+
+class FakePaginator:
+    def __init__(self, client):
+        self.client = client
+
+    def paginate(self, Bucket, Prefix, StartAfter=None):
+        self.client.list_requests.append({"Prefix": Prefix, "StartAfter": StartAfter})
+        # S3 devuelve las claves en orden lexicográfico y siempre al menos una página
+        keys = sorted(key for key in self.client.visible_keys()
+                      if key.startswith(Prefix) and (StartAfter is None or key > StartAfter))
+        pages = [keys[i:i + self.client.page_size] for i in range(0, len(keys), self.client.page_size)] or [[]]
+        for page in pages:
+            yield {"KeyCount": len(page), "Contents": [{"Key": key} for key in page]} if page else {"KeyCount": 0}
+
+
+class ListingS3(CountingS3):
+    """
+    CountingS3 con listado: objects es una lista de (visible_desde, clave); una clave
+    aparece en los listados cuando time.time() pasa visible_desde.
+    """
+
+    def __init__(self, log_path, objects=(), page_size=5):
+        super().__init__(log_path)
+        self.objects = list(objects)
+        self.page_size = page_size
+        self.list_requests = []
+
+    def publish(self, *keys):
+        self.objects.extend((0, key) for key in keys)
+
+    def visible_keys(self):
+        now = time.time()
+        return [key for visible_at, key in self.objects if visible_at <= now]
+
+    def get_paginator(self, operation):
+        assert operation == 'list_objects_v2', operation
+        return FakePaginator(self)
+
+
+def _at(hour, minute):
+    return datetime(2026, 10, 18, hour, minute, tzinfo=timezone.utc)
+
+
+def _keys(bands, *starts):
+    return [scan_key(band, start) for start in starts for band in bands]
+
+
+def check_scan_index():
+    try:
+        from src.services.goes_scans import ScanIndex
+    except ImportError as e:
+        print(f"⚠️ Se omite la prueba del índice (faltan dependencias: {e.name})")
+        return None
+
+    failures = []
+
+    def expect(label, actual, expected):
+        if actual != expected:
+            failures.append(f"{label}: {actual!r} (esperado {expected!r})")
+
+    with tempfile.TemporaryDirectory() as folder:
+        s3 = ListingS3(os.path.join(folder, 'get_object.log'), page_size=5)
+        index = ScanIndex('noaa-goes19', PRODUCT, lookback_hours=2, ttl_seconds=3600,
+                          client_factory=lambda: s3, bands=INPUT_BANDS)
+
+        # Primer listado: 14:00-15:30 para las bandas 8 y 13 (12 claves en la hora 14, 8 en la 15)
+        s3.publish(*_keys(INPUT_BANDS, *[_at(14, 0) + timedelta(minutes=10 * i) for i in range(10)]))
+        index.refresh(now=_at(15, 37), force=True)
+        expect("llamadas del primer listado (3 + 2 páginas)", index.list_calls, 5)
+        expect("StartAfter del primer listado", {r["StartAfter"] for r in s3.list_requests}, {None})
+        expect("latest(8)", index.latest(8), scan_key(8, _at(15, 30)))
+        expect("latest(13)", index.latest(13), scan_key(13, _at(15, 30)))
+
+        # 15:40: la hora 14 está cerrada y no se vuelve a listar; la 15 se lista por banda
+        s3.list_requests.clear()
+        s3.publish(*_keys([13, 8], _at(15, 40)))
+        index.refresh(now=_at(15, 47), force=True)
+        expect("llamadas incrementales", index.list_calls, 7)
+        expect("listados incrementales", sorted((r["Prefix"], r["StartAfter"]) for r in s3.list_requests), sorted(
+            (key[:key.index('_s') + 2], key) for key in _keys(INPUT_BANDS, _at(15, 30))
+        ))
+        expect("latest(8) tras C13 (canal menor publicado después)", index.latest(8), scan_key(8, _at(15, 40)))
+        expect("latest(13)", index.latest(13), scan_key(13, _at(15, 40)))
+
+        # 17:05 con 2 horas de ventana: solo quedan las horas 16 y 17
+        s3.list_requests.clear()
+        s3.publish(*_keys(INPUT_BANDS, _at(16, 0)))
+        index.refresh(now=_at(17, 5), force=True)
+        hours = {r["Prefix"].split('/')[3] for r in s3.list_requests}
+        expect("horas listadas", hours, {'16', '17'})
+        expect("escaneos de la banda 13 tras la poda", [start for start, _ in index.scans(13)], [_at(16, 0)])
+        expect("latest(8) tras la poda", index.latest(8), scan_key(8, _at(16, 0)))
+
+    print(f"🗂️ ScanIndex con S3 falso: {index.list_calls} llamadas a list_objects_v2")
+    for failure in failures:
+        print(f"   ❌ {failure}")
+    return not failures
+
+
+def scan_objects(t0, seconds):
+    """El escaneo anterior ya publicado y el siguiente visible a mitad de la prueba"""
+    now = datetime.now(timezone.utc)
+    start = now.replace(minute=now.minute - now.minute % 10, second=0, microsecond=0) - timedelta(minutes=20)
+    starts = [start, start + timedelta(minutes=10)]
+    objects = [(t0, key) for key in _keys(INPUT_BANDS, starts[0])]
+    objects += [(t0 + seconds / 2, key) for key in _keys(INPUT_BANDS, starts[1])]
+    return starts, objects
+
+
+def _ingest_worker(folder, download_log, render_log, objects, t0, seconds):
+    s3 = ListingS3(download_log, objects)
+    goes_service = use_temp_goes_folder(folder, download_log, s3=s3)
+
+    from src.services import goes_batch, goes_ingest
+    from src.services.goes_scans import ScanIndex
+    from src.services.worker_status import StatusFile
+
+    render_scaled = goes_service.render_scaled
+
+    def counting_render_scaled(band, recorte, palettes, cache_key):
+        fd = os.open(render_log, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        try:
+            os.write(fd, f"{band} {cache_key}\n".encode())
+        finally:
+            os.close(fd)
+        return render_scaled(band, recorte, palettes, cache_key)
+
+    goes_service.render_scaled = counting_render_scaled
+    goes_batch.scan_index = ScanIndex(goes_service.BUCKET_NAME, PRODUCT, lookback_hours=2,
+                                      ttl_seconds=0.2, client_factory=goes_service.get_s3_client)
+    goes_batch.get_s3_client = goes_service.get_s3_client
+    goes_ingest.legend_registry = goes_service.legend_registry
+    goes_ingest.status_file = StatusFile(os.path.join(folder, f'ingest_status_{os.getpid()}.json'))
+
+    # Un solo proceso de decodificación: las bandas se leen acá con el read_cmi_crop falso
+    worker = goes_ingest.GoesIngestWorker(BANDS, PALETTES, poll_seconds=0.2, products=PRODUCTS, decode_workers=1)
+    worker.start()
+    time.sleep(max(0, t0 + seconds - time.time()))
+    worker.stop()
+    status = worker.status()
+    if status["last_error"]:
+        print(f"❌ {status['last_error']}")
+    incremental = sum(1 for request in s3.list_requests if request["StartAfter"])
+    print(f"   proceso {os.getpid()}: {goes_batch.scan_index.list_calls} llamadas de listado, {incremental} con StartAfter")
+
+
+def check_ingest_dedup(processes, seconds):
+    try:
+        import numpy  # noqa: F401
+        import boto3  # noqa: F401
+    except ImportError as e:
+        print(f"⚠️ Se omite la prueba de ingesta (faltan dependencias: {e.name})")
+        return None
+
+    print(f"🛰️ {processes} workers de ingesta durante {seconds}s")
+    with tempfile.TemporaryDirectory() as folder:
+        download_log = os.path.join(folder, 'get_object.log')
+        render_log = os.path.join(folder, 'render.log')
+        t0 = time.time()
+        starts, objects = scan_objects(t0, seconds)
+        ctx = multiprocessing.get_context('spawn')
+        workers = [ctx.Process(target=_ingest_worker, args=(folder, download_log, render_log, objects, t0, seconds))
+                   for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        downloads = Counter(read_log(download_log))
+        renders = Counter(read_log(render_log))
+
+    expected_downloads = _keys(INPUT_BANDS, *starts)
+    expected_renders = [f"{target} {start:%Y%m%d_%H%M%S}" for target in BANDS + PRODUCTS for start in starts]
+
+    ok = True
+    for key in expected_downloads:
+        ok &= downloads[key] == 1
+        print(f"   descarga {os.path.basename(key)[:40]}…: {downloads[key]}")
+    for render in expected_renders:
+        ok &= renders[render] == 1
+        print(f"   render {render}: {renders[render]}")
+    extra = set(renders) - set(expected_renders)
+    if extra:
+        ok = False
+        print(f"   renders inesperados: {sorted(extra)}")
+    return ok
+
+
+if __name__ == '__main__':
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    results = [check_scan_index(), check_ingest_dedup(processes, seconds)]
+    failed = [result for result in results if result is False]
+    print("❌ Falló la prueba de ingesta" if failed else "✅ Prueba de ingesta OK")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,182 @@
+"""
+Prueba de concurrencia del single-flight y del lock entre procesos.
+
+1. FileLock: varios procesos incrementan un contador en disco (leer, esperar, escribir)
+   dentro del lock; si dos entraran a la vez se perderían incrementos.
+2. Imagen GOES: P procesos x T hilos piden a la vez la imagen más reciente de varias
+   bandas con un cliente S3 falso que cuenta cada get_object. Se espera exactamente una
+   descarga por clave. Todo se escribe en una carpeta temporal.
+
+Uso: python scripts/check_single_download.py [procesos] [hilos]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.single_flight import FileLock
+
+BANDS = [13, 8]
+
+
+def scan_key(band, start):
+    """Clave S3 con el formato de NOAA para el escaneo de una banda que empieza en start"""
+    stamp = start.strftime('%Y%j%H%M%S')
+    return (f"ABI-L2-CMIPF/{start:%Y}/{start.strftime('%j')}/{start:%H}/"
+            f"OR_ABI-L2-CMIPF-M6C{band:02d}_G19_s{stamp}0_e{stamp}9_c{stamp}9.nc")
+
+
+SCAN_START = datetime(2026, 10, 18, 15, 0, tzinfo=timezone.utc)
+SCAN_KEYS = {band: scan_key(band, SCAN_START) for band in BANDS}
+
+
+def _count_lock_worker(folder, increments):
+    counter = os.path.join(folder, 'counter.txt')
+    for _ in range(increments):
+        with FileLock(os.path.join(folder, 'counter.lock'), timeout=60, poll_interval=0.01):
+            with open(counter) as f:
+                value = int(f.read())
+            time.sleep(0.001)
+            with open(counter, 'w') as f:
+                f.write(str(value + 1))
+
+
+def check_file_lock(processes, increments=50):
+    with tempfile.TemporaryDirectory() as folder:
+        with open(os.path.join(folder, 'counter.txt'), 'w') as f:
+            f.write('0')
+        ctx = multiprocessing.get_context('spawn')
+        workers = [ctx.Process(target=_count_lock_worker, args=(folder, increments)) for _ in range(processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        with open(os.path.join(folder, 'counter.txt')) as f:
+            total = int(f.read())
+        # El archivo del lock se borra al liberarlo
+        leftovers = [name for name in os.listdir(folder) if name.startswith('counter.lock')]
+
+    expected = processes * increments
+    print(f"🔒 FileLock: {total}/{expected} incrementos, lock residual: {leftovers or 'no'}")
+    return total == expected and not leftovers
+
+
+class CountingS3:
+    """Cliente S3 falso: cada get_object agrega una línea (clave) a un archivo compartido"""
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+
+    def get_object(self, Bucket, Key, **kwargs):
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+        try:
+            os.write(fd, f"{Key}\n".encode())
+        finally:
+            os.close(fd)
+        time.sleep(0.2)  # Una descarga lenta agranda la ventana de carrera
+        return {"Body": None}
+
+
+class FixedScanIndex:
+    def latest(self, band):
+        return SCAN_KEYS.get(band)
+
+
+def use_temp_goes_folder(folder, log_path, s3=None):
+    """Redirige el servicio GOES a la carpeta temporal y al cliente S3 falso (CountingS3 por defecto)"""
+    import numpy as np
+
+    from src.services import goes_service
+    from src.services.goes_archive import CropArchive
+    from src.services.goes_catalog import ImageCatalog
+    from src.services.goes_frames import FrameStore
+    from src.services.goes_legends import LegendRegistry
+
+    s3 = s3 or CountingS3(log_path)
+
+    def fake_read_cmi_crop(client, bucket, file_key, bbox, crop_index):
+        client.get_object(Bucket=bucket, Key=file_key)
+        recorte = np.linspace(200.0, 300.0, 120 * 160, dtype=np.float32).reshape(120, 160)
+        stats = {"object_bytes": 0, "bytes_fetched": 0, "requests": 1, "georef": None}
+        return recorte, stats
+
+    goes_service.STATIC_FOLDER = folder
+    goes_service.image_catalog = ImageCatalog(folder)
+    goes_service.crop_archive = CropArchive(os.path.join(folder, 'archive'))
+    goes_service.frame_store = FrameStore(os.path.join(folder, 'frames'))
+    goes_service.legend_registry = LegendRegistry(os.path.join(folder, 'legends'))
+    goes_service.scan_index = FixedScanIndex()
+    goes_service.get_s3_client = lambda: s3
+    goes_service.read_cmi_crop = fake_read_cmi_crop
+    return goes_service
+
+
+def read_log(path):
+    try:
+        with open(path) as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def _download_worker(folder, log_path, threads, barrier):
+    goes_service = use_temp_goes_folder(folder, log_path)
+    errors = []
+
+    def request(band):
+        result = goes_service.get_latest_goes_image_url(band, 'inferno')
+        if "error" in result:
+            errors.append(result["error"])
+
+    pool = [threading.Thread(target=request, args=(BANDS[i % len(BANDS)],)) for i in range(threads)]
+    barrier.wait()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    for error in errors:
+        print(f"❌ {error}")
+
+
+def check_single_download(processes, threads):
+    try:
+        import numpy  # noqa: F401
+        import boto3  # noqa: F401
+    except ImportError as e:
+        print(f"⚠️ Se omite la prueba de descargas (faltan dependencias: {e.name})")
+        return None
+
+    with tempfile.TemporaryDirectory() as folder:
+        log_path = os.path.join(folder, 'get_object.log')
+        ctx = multiprocessing.get_context('spawn')
+        barrier = ctx.Barrier(processes)
+        workers = [ctx.Process(target=_download_worker, args=(folder, log_path, threads, barrier))
+                   for _ in range(processes)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        keys = read_log(log_path)
+
+    downloads = {key: keys.count(key) for key in SCAN_KEYS.values()}
+    print(f"🛰️ {processes} procesos x {threads} hilos en {elapsed:.1f}s")
+    for band, key in SCAN_KEYS.items():
+        print(f"   banda {band}: {downloads[key]} descarga(s)")
+    return all(count == 1 for count in downloads.values())
+
+
+if __name__ == '__main__':
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    results = [check_file_lock(processes), check_single_download(processes, threads)]
+    failed = [result for result in results if result is False]
+    print("❌ Falló la prueba de concurrencia" if failed else "✅ Prueba de concurrencia OK")
+    sys.exit(1 if failed else 0)
@@ -1,5 +1,8 @@
 import sys
 import os
+import io
+import math
+import time
 from flask import send_from_directory
 import random
 import string
@@ -7,17 +10,38 @@ import string
 # Añade el directorio raíz del proyecto al path de Python
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, send_file, url_for
+from datetime import datetime, timezone
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager, create_access_token
 
 # Importaciones existentes
-from src.services.clima import get_clima
+from src.services.clima import get_clima, get_clima_group
+from src.services.fanout import fan_out
 from src.services.news_service import get_news_safe
 from src.services.meteo import get_weather_by_coords, get_clima_by_ip, get_clima_ciudad
-from src.services.orchestration import get_hail_prediction
-from src.services.goes_service import get_latest_goes_image_url
+from src.services.hail_model import hail_model
+from src.services.orchestration import get_hail_prediction, get_prediction_stats, warm_up_prediction_backend
+from src.services.hail_grid import (
+    compute_grid, get_default_grid, grid_to_json, grid_to_png, predict_points,
+    start_hail_grid_worker, get_hail_grid_status
+)
+from src.services.goes_service import (
+    VALID_PALETTES, get_latest_goes_image_url, get_image_path, get_scan_id, get_scan_image_path,
+    get_region_summary, legend_registry, legend_url,
+    image_catalog, LISTING_TTL_SECONDS, ANIMATION_MAX_FRAMES, frame_animator,
+    tile_renderer
+)
+from src.services.goes_tiles import MIN_ZOOM, MAX_ZOOM
+from src.services.goes_crop_index import REGIONS
+from src.services.goes_eviction import start_eviction_worker, get_eviction_status
+from src.services.goes_legends import LEGEND_MAX_AGE
+from src.services.goes_ingest import start_ingest_worker, get_ingest_status
+from src.services.http_client import get_http_stats
+from src.services.sqlite_cache import shared_cache
+from src.services.ip_location import client_ip, location_cache
+from src.services.single_flight import ProcessLock
 from src.database import db  # Importar db desde nuestro archivo database.py
 
 # 1. Inicialización de la App con configuración de archivos estáticos
@@ -35,6 +59,50 @@ jwt = JWTManager(app)
 # Importar el modelo de usuario DESPUÉS de inicializar db
 from src.models.user import User
 
+_background_started = False
+_background_lock = ProcessLock(app.config['BACKGROUND_LOCK_PATH'])
+
+def start_background_workers():
+    """
+    Arranca las tareas de fondo. No se ejecuta al importar el módulo (lo importa
+    también el proceso del reloader de werkzeug): se llama desde el bloque principal o
+    desde el post_fork de gunicorn.
+    Lo que sirve requests de este proceso (catálogo, modelo, eviction) corre en cada
+    worker; la ingesta y la grilla de granizo, en un solo proceso por servidor, que
+    publica su estado en BACKGROUND_STATUS_DIR para que cualquier worker lo informe.
+    """
+    global _background_started
+    if _background_started:
+        return
+    _background_started = True
+
+    # Catálogo de imágenes satelitales: se arma una sola vez al iniciar
+    image_catalog.build()
+
+    # Caché compartida: se descartan al iniciar las entradas que ya no se pueden servir
+    try:
+        shared_cache.purge()
+    except Exception as e:
+        print(f"⚠️ No se pudo limpiar la caché compartida: {e}")
+
+    # Modelo de granizo local: se carga y se precalienta en segundo plano al iniciar
+    warm_up_prediction_backend()
+
+    # Eviction del almacén de imágenes en segundo plano (nunca bloquea una request)
+    start_eviction_worker(image_catalog, app.config)
+
+    if not _background_lock.try_acquire():
+        print("ℹ️ Ingesta GOES y grilla de granizo: las corre otro proceso del servidor")
+        return
+
+    # Grilla de riesgo de granizo de la provincia, precalculada en segundo plano
+    if app.config['HAIL_GRID_ENABLED']:
+        start_hail_grid_worker(app.config)
+
+    # Worker de ingesta GOES-19: pre-renderiza las imágenes fuera del camino de las requests
+    if app.config['GOES_INGEST_ENABLED']:
+        start_ingest_worker(app.config)
+
 # 3. Comando para inicializar la base de datos
 @app.cli.command("create-db")
 def create_db():
@@ -163,12 +231,111 @@ def main_prediction():
         # Captura cualquier otro error inesperado durante el proceso
         return jsonify({"error": f"Ocurrió un error interno en el servidor: {e}"}), 500
 
+def _parse_points(points):
+    """[[lat, lon], ...] o [{"lat": ..., "lon": ...}, ...] -> (lats, lons)"""
+    lats, lons = [], []
+    for point in points:
+        if isinstance(point, dict):
+            lats.append(float(point["lat"]))
+            lons.append(float(point["lon"]))
+        else:
+            lats.append(float(point[0]))
+            lons.append(float(point[1]))
+    return lats, lons
+
+@app.route('/api/hail-grid', methods=['GET', 'POST'])
+def hail_grid():
+    """
+    Predicción de granizo en lote.
+    - POST {"points": [[lat, lon], ...]}: probabilidad y alerta por punto.
+    - GET ?bbox=lon_min,lat_min,lon_max,lat_max&resolution=0.1: grilla recortada a la
+      provincia. Sin bbox devuelve la grilla precalculada de Mendoza.
+      ?format=png devuelve el heatmap (un píxel por celda) en vez del JSON compacto.
+    """
+    try:
+        if request.method == 'POST':
+            body = request.get_json(silent=True) or {}
+            try:
+                lats, lons = _parse_points(body.get("points") or [])
+            except (KeyError, IndexError, TypeError, ValueError):
+                return jsonify({"error": "'points' debe ser una lista de [lat, lon] o {lat, lon}"}), 400
+            if not lats:
+                return jsonify({"error": "Se requiere al menos un punto en 'points'"}), 400
+            if len(lats) > app.config['HAIL_GRID_MAX_POINTS']:
+                return jsonify({"error": f"Máximo {app.config['HAIL_GRID_MAX_POINTS']} puntos por pedido"}), 400
+
+            probabilities = predict_points(lats, lons)
+            predictions = []
+            for lat, lon, probability in zip(lats, lons, probabilities.tolist()):
+                if math.isnan(probability):  # Sin pronóstico para el punto
+                    predictions.append({"lat": lat, "lon": lon, "error": "Pronóstico no disponible"})
+                else:
+                    predictions.append(dict(hail_model.to_response(probability), lat=lat, lon=lon))
+            return jsonify({"model_version": hail_model.version, "predictions": predictions})
+
+        fmt = request.args.get('format', 'json').lower()
+        palette = request.args.get('palette', 'inferno')
+        if fmt not in ('json', 'png'):
+            return jsonify({"error": "Formato inválido (json o png)"}), 400
+        if palette not in VALID_PALETTES:
+            return jsonify({"error": f"Paleta inválida: {palette}"}), 400
+
+        bbox = request.args.get('bbox')
+        if bbox:
+            try:
+                bbox = [float(value) for value in bbox.split(',')]
+            except ValueError:
+                return jsonify({"error": "bbox debe ser lon_min,lat_min,lon_max,lat_max"}), 400
+            try:
+                resolution = float(request.args.get('resolution', app.config['HAIL_GRID_RESOLUTION']))
+            except ValueError:
+                return jsonify({"error": "resolution debe ser un número en grados"}), 400
+            if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3] or not (math.isfinite(resolution) and resolution > 0):
+                return jsonify({"error": "bbox debe ser lon_min,lat_min,lon_max,lat_max y resolution > 0"}), 400
+            try:
+                result = compute_grid(bbox, resolution)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+        else:
+            result = get_default_grid()
+
+        if fmt == 'png':
+            response = send_file(io.BytesIO(grid_to_png(result, VALID_PALETTES[palette])), mimetype='image/png')
+        else:
+            response = jsonify(grid_to_json(result))
+        response.headers['Cache-Control'] = f"public, max-age={app.config['HAIL_GRID_REFRESH_SECONDS'] // 4}"
+        return response
+    except RuntimeError as e:
+        # Modelo local no disponible: la grilla no se puede calcular con la API remota
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": f"Ocurrió un error interno en el servidor: {e}"}), 500
+
+
+# --- RUTAS DE IMÁGENES SATELITALES ---
+def _resolve_satellite_image(band, palette, force_refresh=False):
+    """Devuelve (resultado de goes_service, código de error HTTP si lo hubo)"""
+    # Con la ingesta activa para la banda solo se sirven imágenes ya renderizadas por el worker
+    ingest_only = app.config['GOES_INGEST_ENABLED'] and (
+        band in app.config['GOES_BANDS'] or band in app.config['GOES_DERIVED_PRODUCTS']
+    )
+
+    result = get_latest_goes_image_url(
+        band, palette,
+        force_refresh=force_refresh and not ingest_only,
+        allow_render=not ingest_only
+    )
+
+    if "error" in result:
+        print(f"Error en goes_service: {result['error']}")
+        return result, 503 if ingest_only else 500
+    return result, None
 
-# Reemplaza todo el bloque de RUTA DE IMÁGENES SATELITALES por esto:
 @app.route('/api/satellite-image', methods=['GET'])
 def satellite_image():
     """
-    Endpoint para obtener la imagen más reciente del satélite GOES-19 en formato base64.
+    Endpoint con los metadatos de la imagen más reciente del satélite GOES-19.
+    La imagen y la leyenda se descargan aparte por URL, así el navegador puede cachearlas.
     """
     try:
         band = request.args.get('band', default=13, type=int)
@@ -177,71 +344,19 @@ def satellite_image():
         
         print(f"Recibida solicitud: band={band}, palette={palette}, force_refresh={force_refresh}")
         
-        # Llamar al servicio para obtener las imágenes
-        result = get_latest_goes_image_url(band, palette, force_refresh)
-        
-        if "error" in result:
-            print(f"Error en goes_service: {result['error']}")
-            return jsonify(result), 500
-        
-        print(f"Resultado de goes_service: {result}")
-        
-        # Importar base64
-        import base64
-        
-        # DEFINITIVO: Probar ambas posibles rutas para encontrar las imágenes
-        possible_paths = [
-            os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'radar_images')),
-            os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'radar_images')),
-            os.path.abspath(os.path.join(os.path.dirname(__file__), 'static', 'radar_images')),
-        ]
-        
-        image_filename = result["url"].split('/')[-1]
-        legend_filename = result["legend_url"].split('/')[-1]
-        
-        print(f"Buscando imagen: {image_filename}")
-        print(f"Buscando leyenda: {legend_filename}")
-        
-        image_path = None
-        legend_path = None
-        
-        # Buscar las imágenes en todas las posibles rutas
-        for path_dir in possible_paths:
-            img_path = os.path.join(path_dir, image_filename)
-            leg_path = os.path.join(path_dir, legend_filename)
-            
-            print(f"Verificando ruta: {path_dir}")
-            print(f"  - Imagen: {img_path} - Existe: {os.path.exists(img_path)}")
-            print(f"  - Leyenda: {leg_path} - Existe: {os.path.exists(leg_path)}")
-            
-            if os.path.exists(img_path) and image_path is None:
-                image_path = img_path
-                print(f"  -> Encontrada imagen en: {img_path}")
-                
-            if os.path.exists(leg_path) and legend_path is None:
-                legend_path = leg_path
-                print(f"  -> Encontrada leyenda en: {leg_path}")
-        
-        # Verificar si se encontraron las imágenes
-        if image_path is None:
-            return jsonify({"error": f"No se encontró la imagen: {image_filename} en ninguna de las rutas probadas"}), 500
-        
-        if legend_path is None:
-            return jsonify({"error": f"No se encontró la leyenda: {legend_filename} en ninguna de las rutas probadas"}), 500
+        result, error_status = _resolve_satellite_image(band, palette, force_refresh)
+        if error_status:
+            return jsonify(result), error_status
         
-        # Convertir imágenes a base64
-        with open(image_path, "rb") as image_file:
-            image_data = base64.b64encode(image_file.read()).decode('utf-8')
-        
-        with open(legend_path, "rb") as legend_file:
-            legend_data = base64.b64encode(legend_file.read()).decode('utf-8')
-        
-        print("Imágenes convertidas a base64 correctamente")
+        palette = palette if palette in VALID_PALETTES else 'inferno'
         
+        # La URL lleva el escaneo: cambia con cada escaneo nuevo y si no, el navegador revalida con ETag
         return jsonify({
-            "image": f"data:image/png;base64,{image_data}",
-            "legend": f"data:image/png;base64,{legend_data}",
+            "image_url": url_for('satellite_image_file', band=band, palette=palette, scan=get_scan_id(result), _external=True),
+            "legend_url": request.host_url.rstrip('/') + result["legend_url"],
+            "tiles_url": _tiles_url_template(band, palette, get_scan_id(result)),
             "timestamp": result["timestamp"],
+            "scan_start": result.get("scan_start"),
             "cached": result.get("cached", False)
         })
         
@@ -249,6 +364,86 @@ def satellite_image():
         print(f"Error general en satellite_image: {str(e)}")
         return jsonify({"error": f"Error general: {str(e)}"}), 500
 
+@app.route('/api/satellite-image/<int:band>/<palette>.png', methods=['GET'])
+def satellite_image_file(band, palette):
+    """
+    Imagen GOES-19 en binario, con ETag fuerte derivado del escaneo, Last-Modified y
+    GET condicional (304). Con ?scan= se sirve exactamente ese escaneo (404 si ya se
+    eliminó) y es inmutable; sin él, el más reciente con Cache-Control según la
+    cadencia de escaneo.
+    """
+    try:
+        palette = palette if palette in VALID_PALETTES else 'inferno'
+        scan = request.args.get('scan')
+
+        if scan:
+            image_path = get_scan_image_path(band, palette, scan)
+            if image_path is None:
+                return jsonify({"error": "Ese escaneo ya no está disponible"}), 404
+            try:
+                scan_start = datetime.strptime(scan, '%Y%m%d_%H%M%S').replace(tzinfo=timezone.utc)
+            except ValueError:
+                scan_start = datetime.fromtimestamp(os.path.getmtime(image_path), timezone.utc)
+            # Un escaneo no cambia: la URL versionada se puede cachear sin revalidar
+            max_age = 24 * 3600
+        else:
+            result, error_status = _resolve_satellite_image(band, palette)
+            if error_status:
+                return jsonify(result), error_status
+
+            image_path = get_image_path(result)
+            if image_path is None:
+                return jsonify({"error": "La imagen satelital ya no está disponible"}), 503
+
+            scan = get_scan_id(result)
+            if result.get("scan_start"):
+                scan_start = datetime.fromisoformat(result["scan_start"])
+            else:
+                scan_start = datetime.fromtimestamp(os.path.getmtime(image_path), timezone.utc)
+
+            # Hasta el próximo escaneo esperado la imagen no cambia
+            cadence = app.config['GOES_SCAN_CADENCE_SECONDS']
+            age = (datetime.now(timezone.utc) - scan_start).total_seconds()
+            max_age = int(max(30, cadence - age))
+
+        return send_file(
+            image_path,
+            mimetype='image/png',
+            etag=f"{band}-{palette}-{scan}",
+            last_modified=scan_start,
+            conditional=True,
+            max_age=max_age
+        )
+    except Exception as e:
+        print(f"Error general en satellite_image_file: {str(e)}")
+        return jsonify({"error": f"Error general: {str(e)}"}), 500
+
+@app.route('/api/satellite-regions', methods=['GET'])
+def satellite_regions():
+    """
+    Estadísticas del escaneo más reciente de una banda ABI para la provincia y cada
+    departamento (?region= repetible para pedir solo algunas regiones).
+    """
+    try:
+        band = request.args.get('band', default=13, type=int)
+        region_names = request.args.getlist('region')
+        if not 1 <= band <= 16:
+            return jsonify({"error": "band debe ser una banda ABI entre 1 y 16"}), 400
+        unknown = [name for name in region_names if name not in REGIONS]
+        if unknown:
+            return jsonify({"error": f"Regiones desconocidas: {', '.join(unknown)}", "regions": sorted(REGIONS)}), 400
+
+        result = get_region_summary(band, region_names)
+        if "error" in result:
+            return jsonify(result), 500
+
+        response = jsonify(result)
+        response.headers['Cache-Control'] = f"public, max-age={LISTING_TTL_SECONDS}"
+        return response
+    except Exception as e:
+        print(f"Error general en satellite_regions: {str(e)}")
+        return jsonify({"error": f"Error general: {str(e)}"}), 500
+
 # --- RUTAS EXISTENTES ---
 @app.route('/api/clima/<city_name>', methods=['GET'])
 def get_weather(city_name):
@@ -261,14 +456,28 @@ def get_weather(city_name):
 
 @app.route('/api/clima', methods=['GET'])
 def get_all_weather():
-    """Endpoint para obtener el clima de TODAS las ciudades configuradas"""
+    """
+    Endpoint para obtener el clima de TODAS las ciudades configuradas.
+    Primero intenta una sola request agrupada; si falla, consulta las ciudades en
+    paralelo con un deadline y devuelve lo que haya llegado a tiempo.
+    """
     try:
-        all_weather = {}
-        for city_name in app.config['CITIES']:
-            weather_data = get_clima(city_name)
-            all_weather[city_name] = weather_data
-        
-        return jsonify(all_weather)
+        cities = list(app.config['CITIES'])
+        deadline = app.config['FANOUT_DEADLINE_SECONDS']
+
+        # La request agrupada usa como mucho la mitad del deadline (incluidos reintentos)
+        started = time.monotonic()
+        grouped, _ = fan_out({"grupo": lambda: get_clima_group(cities)}, deadline / 2)
+        if "error" not in grouped["grupo"]:
+            return jsonify(grouped["grupo"])
+        print(f"⚠️ Clima agrupado no disponible ({grouped['grupo']['error']}), consultando por ciudad")
+
+        remaining = max(0.5, deadline - (time.monotonic() - started))
+        all_weather, _ = fan_out(
+            {city_name: (lambda city_name=city_name: get_clima(city_name)) for city_name in cities},
+            remaining
+        )
+        return jsonify({city_name: all_weather[city_name] for city_name in cities})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -292,26 +501,32 @@ def get_news_by_category(category):
 
 @app.route('/api/noticias', methods=['GET'])
 def get_all_news():
-    """Obtiene noticias de todas las categorías"""
+    """Obtiene noticias de todas las categorías (en paralelo, con deadline)"""
     try:
         categorias = ['general', 'deportes', 'clima']
-        all_news = {}
-        
-        for category in categorias:
-            all_news[category] = get_news_safe(category, limit=2)
+        results, timed_out = fan_out(
+            {category: (lambda category=category: get_news_safe(category, limit=2)) for category in categorias},
+            app.config['FANOUT_DEADLINE_SECONDS']
+        )
+        # Una categoría que falla o no llega a tiempo se devuelve vacía, como cuando falla NewsAPI
+        all_news = {
+            category: results[category] if isinstance(results[category], list) else []
+            for category in categorias
+        }
         
         return jsonify({
             'total_categorias': len(categorias),
-            'noticias': all_news
+            'noticias': all_news,
+            'categorias_sin_respuesta': timed_out
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/meteo/ip', methods=['GET'])
 def clima_por_ip():
-    """Endpoint que obtiene clima según la IP del cliente"""
+    """Endpoint que obtiene clima según la IP del cliente (X-Forwarded-For solo desde proxies de confianza)"""
     try:
-        result = get_clima_by_ip()
+        result = get_clima_by_ip(client_ip(request.remote_addr, request.headers.get('X-Forwarded-For')))
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -345,50 +560,222 @@ def health_check():
     """Endpoint para verificar que la API está funcionando"""
     return jsonify({"status": "healthy", "message": "Nimbus API is running!"})
 
+@app.route('/api/http-clients/status', methods=['GET'])
+def http_clients_status():
+    """Endpoint para monitorear los servicios externos (latencia, errores, reutilización de conexiones)"""
+    return jsonify(get_http_stats())
+
+@app.route('/api/prediction/status', methods=['GET'])
+def prediction_status():
+    """Endpoint para monitorear el backend de predicción (modelo local/remoto, latencias p50/p99)"""
+    return jsonify(get_prediction_stats())
+
+@app.route('/api/hail-grid/status', methods=['GET'])
+def hail_grid_status():
+    """Endpoint para monitorear el precálculo de la grilla de granizo de la provincia"""
+    return jsonify(get_hail_grid_status())
+
+@app.route('/api/cache/status', methods=['GET'])
+def cache_status():
+    """
+    Endpoint para monitorear las cachés compartidas (de este worker): aciertos,
+    servidos vencidos, fallos y llamadas reales a los servicios externos.
+    """
+    stats = shared_cache.stats()
+    stats["ip_location"] = location_cache.stats()
+    return jsonify(stats)
+
+@app.route('/api/satellite-legend/<path:filename>', methods=['GET'])
+def satellite_legend(filename):
+    """Leyendas de paleta con nombre por hash de contenido (inmutables)"""
+    response = send_from_directory(legend_registry.folder, filename, max_age=LEGEND_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={LEGEND_MAX_AGE}, immutable'
+    return response
+
+def _tiles_url_template(band, palette, scan):
+    """Plantilla XYZ ({z}/{x}/{y}) para Leaflet/OpenLayers de un escaneo"""
+    return f"{request.host_url.rstrip('/')}/api/tiles/{band}/{palette}/{scan}/{{z}}/{{x}}/{{y}}.png"
+
+@app.route('/api/tiles/<int:band>/<palette>/<scan>/<int:z>/<int:x>/<int:y>.png', methods=['GET'])
+def satellite_tile(band, palette, scan, z, x, y):
+    """
+    Tile XYZ de 256 px (Web Mercator) de un escaneo GOES. Se genera a pedido y,
+    como el escaneo no cambia, es inmutable para el navegador.
+    """
+    try:
+        if palette not in VALID_PALETTES:
+            return jsonify({"error": f"Paleta inválida: {palette}"}), 400
+        if not MIN_ZOOM <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return jsonify({"error": f"Tile fuera de rango (zoom {MIN_ZOOM} a {MAX_ZOOM})"}), 400
+
+        data = tile_renderer.render_tile(band, VALID_PALETTES[palette], scan, z, x, y)
+        if data is None:
+            return jsonify({"error": "El escaneo no está disponible para tiles"}), 404
+
+        response = send_file(io.BytesIO(data), mimetype='image/png',
+                             etag=f"{band}-{palette}-{scan}-{z}-{x}-{y}",
+                             conditional=True, max_age=LEGEND_MAX_AGE)
+        response.headers['Cache-Control'] = f'public, max-age={LEGEND_MAX_AGE}, immutable'
+        return response
+    except Exception as e:
+        print(f"Error general en satellite_tile: {str(e)}")
+        return jsonify({"error": f"Error general: {str(e)}"}), 500
+
+def _animation_frame_count():
+    """Cantidad de cuadros pedida (?frames=N), acotada al tamaño del buffer"""
+    count = request.args.get('frames', default=12, type=int)
+    return max(1, min(count, ANIMATION_MAX_FRAMES))
+
+def _frame_range():
+    """
+    Rango histórico pedido (?start=&end=, ISO 8601) o None para los últimos cuadros.
+    Lanza ValueError si falta un extremo o no se puede interpretar.
+    """
+    start, end = request.args.get('start'), request.args.get('end')
+    if start is None and end is None:
+        return None
+    if start is None or end is None:
+        raise ValueError("Hay que indicar start y end")
+    bounds = []
+    for value in (start, end):
+        moment = datetime.fromisoformat(value)
+        bounds.append(moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc))
+    if bounds[0] > bounds[1]:
+        raise ValueError("start debe ser anterior a end")
+    return bounds
+
+def _requested_frames(band, count):
+    """Los últimos cuadros del buffer, o los del rango histórico (buffer + archivo de recortes)"""
+    frame_range = _frame_range()
+    if frame_range is None:
+        return frame_animator.recent_frames(band, count)
+    return frame_animator.frames_between(band, frame_range[0], frame_range[1], count)
+
+@app.route('/api/satellite-frames', methods=['GET'])
+def satellite_frames():
+    """
+    Manifiesto de los últimos N cuadros de la banda (loop de animación), o de los
+    últimos N de un rango histórico con ?start=&end= (desde el archivo de recortes).
+    Cada cuadro tiene URL propia e inmutable: con cada escaneo nuevo el cliente
+    solo descarga un cuadro más.
+    """
+    try:
+        band = request.args.get('band', default=13, type=int)
+        palette = request.args.get('palette', default='inferno', type=str)
+        palette = palette if palette in VALID_PALETTES else 'inferno'
+        count = _animation_frame_count()
+
+        try:
+            frames = _requested_frames(band, count)
+        except ValueError as e:
+            return jsonify({"error": f"Rango inválido: {e}"}), 400
+        if not frames:
+            return jsonify({"error": f"Todavía no hay cuadros para la banda {band}"}), 503
+
+        return jsonify({
+            "band": band,
+            "palette": palette,
+            "frame_count": len(frames),
+            "frames": [
+                {
+                    "scan_start": frame["scan_start"],
+                    "url": url_for('satellite_frame_file', band=band, palette=palette, key=frame["key"], _external=True),
+                    # Los tiles necesitan la georreferencia del buffer; los cuadros solo archivados no la tienen
+                    "tiles_url": _tiles_url_template(band, palette, frame["key"]) if frame.get("georef") else None,
+                }
+                for frame in frames
+            ],
+            "animation_url": url_for('satellite_animation', band=band, palette=palette, fmt='webp', frames=count,
+                                     start=request.args.get('start'), end=request.args.get('end'), _external=True),
+            "apng_url": url_for('satellite_animation', band=band, palette=palette, fmt='png', frames=count,
+                                start=request.args.get('start'), end=request.args.get('end'), _external=True),
+            "legend_url": request.host_url.rstrip('/') + legend_url(palette, band),
+        })
+    except Exception as e:
+        print(f"Error general en satellite_frames: {str(e)}")
+        return jsonify({"error": f"Error general: {str(e)}"}), 500
+
+@app.route('/api/satellite-frames/<int:band>/<palette>/<key>.png', methods=['GET'])
+def satellite_frame_file(band, palette, key):
+    """Un cuadro del buffer de animación (o del archivo); un escaneo no cambia, así que es inmutable"""
+    if palette not in VALID_PALETTES:
+        return jsonify({"error": f"Paleta inválida: {palette}"}), 400
+    data = frame_animator.render_frame(band, VALID_PALETTES[palette], key)
+    if data is None:
+        return jsonify({"error": "El cuadro ya no está en el buffer de animación ni en el archivo"}), 404
+
+    response = send_file(io.BytesIO(data), mimetype='image/png', etag=f"{band}-{palette}-{key}",
+                         conditional=True, max_age=LEGEND_MAX_AGE)
+    response.headers['Cache-Control'] = f'public, max-age={LEGEND_MAX_AGE}, immutable'
+    return response
+
+@app.route('/api/satellite-animation/<int:band>/<palette>.<fmt>', methods=['GET'])
+def satellite_animation(band, palette, fmt):
+    """
+    Loop animado (WebP o APNG) de los últimos N cuadros, cacheado hasta el próximo
+    escaneo. Con ?start=&end= anima un rango histórico del archivo de recortes.
+    """
+    try:
+        if palette not in VALID_PALETTES:
+            return jsonify({"error": f"Paleta inválida: {palette}"}), 400
+        if fmt not in ('webp', 'png'):
+            return jsonify({"error": "Formato inválido: usar webp o png"}), 400
+
+        try:
+            frames = _requested_frames(band, _animation_frame_count())
+        except ValueError as e:
+            return jsonify({"error": f"Rango inválido: {e}"}), 400
+        if not frames:
+            return jsonify({"error": f"Todavía no hay cuadros para la banda {band}"}), 503
+
+        data = frame_animator.render_animation(band, VALID_PALETTES[palette], frames, fmt=fmt)
+        if data is None:
+            return jsonify({"error": "Los cuadros ya no están en el buffer de animación"}), 503
+
+        newest = datetime.fromisoformat(frames[-1]["scan_start"])
+        age = (datetime.now(timezone.utc) - newest).total_seconds()
+        max_age = int(max(30, app.config['GOES_SCAN_CADENCE_SECONDS'] - age))
+
+        return send_file(
+            io.BytesIO(data),
+            mimetype='image/webp' if fmt == 'webp' else 'image/apng',
+            etag=f"{band}-{palette}-{len(frames)}-{frames[0]['key']}-{frames[-1]['key']}",
+            last_modified=newest,
+            conditional=True,
+            max_age=max_age
+        )
+    except Exception as e:
+        print(f"Error general en satellite_animation: {str(e)}")
+        return jsonify({"error": f"Error general: {str(e)}"}), 500
+
+@app.route('/api/satellite-ingest/status', methods=['GET'])
+def satellite_ingest_status():
+    """Endpoint para monitorear el worker de ingesta GOES (cola, último escaneo, duración del render)"""
+    return jsonify(get_ingest_status())
+
 @app.route('/api/disk-usage', methods=['GET'])
 def disk_usage():
     """Endpoint para monitorear el uso de disco de imágenes"""
     try:
-        possible_paths = [
-            os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'radar_images')),
-            os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'radar_images')),
-            os.path.abspath(os.path.join(os.path.dirname(__file__), 'static', 'radar_images')),
-        ]
-        
-        total_size = 0
-        file_count = 0
-        oldest_file = None
-        newest_file = None
-        
-        for path_dir in possible_paths:
-            if os.path.exists(path_dir):
-                for root, dirs, files in os.walk(path_dir):
-                    for file in files:
-                        if file.endswith('.png'):
-                            file_path = os.path.join(root, file)
-                            file_size = os.path.getsize(file_path)
-                            file_time = os.path.getmtime(file_path)
-                            
-                            total_size += file_size
-                            file_count += 1
-                            
-                            if oldest_file is None or file_time < oldest_file['time']:
-                                oldest_file = {'name': file, 'time': file_time}
-                            if newest_file is None or file_time > newest_file['time']:
-                                newest_file = {'name': file, 'time': file_time}
+        stats = image_catalog.stats()
         
         return jsonify({
-            "total_size_mb": round(total_size / (1024 * 1024), 2),
-            "file_count": file_count,
-            "oldest_file": oldest_file['name'] if oldest_file else None,
-            "newest_file": newest_file['name'] if newest_file else None,
-            "max_age_hours": 24,  # Valor por defecto
-            "max_images_per_config": 4,  # Valor por defecto
-            "cache_duration_minutes": 30  # Valor por defecto
+            "total_size_mb": round(stats["total_bytes"] / (1024 * 1024), 2),
+            "file_count": stats["file_count"],
+            "oldest_file": stats["oldest_file"],
+            "newest_file": stats["newest_file"],
+            "max_age_hours": app.config['GOES_MAX_AGE_HOURS'],
+            "max_images_per_config": app.config['GOES_RETENTION_PER_CONFIG'],
+            "listing_ttl_seconds": LISTING_TTL_SECONDS,
+            "tile_cache": tile_renderer.stats(),
+            "eviction": get_eviction_status()
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 # --- BLOQUE PRINCIPAL ---
 if __name__ == '__main__':
+    # Con el reloader de werkzeug el proceso padre solo vigila archivos: los workers van en el hijo
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_workers()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -11,16 +11,78 @@ class Config:
     
     # Ciudades de Mendoza que vamos a monitorear
     CITIES = {
-        "mendoza": {"id": 3844421, "name": "Mendoza"},
-        "san_rafael": {"id": 3836669, "name": "San Rafael"},
-        "tunuyan": {"id": 3833520, "name": "Tunuyán"},
-        "malargue": {"id": 3845181, "name": "Malargüe"},
-        "las_heras": {"id": 3848354, "name": "Las Heras"},  
-        "rivadavia": {"id": 3838759, "name": "Rivadavia"} 
+        "mendoza": {"id": 3844421, "name": "Mendoza", "lat": -32.8895, "lon": -68.8458},
+        "san_rafael": {"id": 3836669, "name": "San Rafael", "lat": -34.6177, "lon": -68.3301},
+        "tunuyan": {"id": 3833520, "name": "Tunuyán", "lat": -33.5761, "lon": -69.0153},
+        "malargue": {"id": 3845181, "name": "Malargüe", "lat": -35.4752, "lon": -69.5853},
+        "las_heras": {"id": 3848354, "name": "Las Heras", "lat": -32.8507, "lon": -68.8285},
+        "rivadavia": {"id": 3838759, "name": "Rivadavia", "lat": -33.1910, "lon": -68.4611}
     }
     
     NEWSAPI_URL = "https://newsapi.org/v2/everything"
 
+    # Caché compartida entre workers (SQLite): pronósticos, geocodificación, ...
+    CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'nimbus_cache.db')))
+    FORECAST_GRID_DEGREES = float(os.getenv('FORECAST_GRID_DEGREES', 0.1))  # ~11 km, resolución de los modelos de Open-Meteo
+    FORECAST_TTL_SECONDS = int(os.getenv('FORECAST_TTL_SECONDS', 3600))  # Los modelos se actualizan cada hora
+    FORECAST_STALE_SECONDS = int(os.getenv('FORECAST_STALE_SECONDS', 6 * 3600))  # Se sirve vencido mientras se revalida
+    FORECAST_BULK_CHUNK = int(os.getenv('FORECAST_BULK_CHUNK', 100))  # Ubicaciones por request a Open-Meteo
+    GEOCODE_TTL_SECONDS = int(os.getenv('GEOCODE_TTL_SECONDS', 365 * 86400))  # Las coordenadas de una ciudad no cambian
+    GEOCODE_NEGATIVE_TTL_SECONDS = int(os.getenv('GEOCODE_NEGATIVE_TTL_SECONDS', 86400))  # "No encontrada"
+
+    # Geolocalización por IP (/api/meteo/ip)
+    TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES', '127.0.0.1,::1').split(',')  # Proxies cuyo X-Forwarded-For se respeta
+    IP_CACHE_SIZE = int(os.getenv('IP_CACHE_SIZE', 10000))  # Prefijos de red en la caché LRU
+    IP_CACHE_TTL_SECONDS = int(os.getenv('IP_CACHE_TTL_SECONDS', 86400))
+    GEOIP_DB_PATH = os.getenv('GEOIP_DB_PATH')  # Base .mmdb offline opcional (requiere geoip2)
+    # Ubicación para IPs privadas/loopback (desarrollo local, red interna)
+    DEFAULT_LOCATION = {"city": "Mendoza", "region": "Mendoza", "country": "Argentina", "lat": -32.8895, "lon": -68.8458}
+
+    # Tiempo máximo para armar las respuestas agregadas (/api/clima, /api/noticias)
+    FANOUT_DEADLINE_SECONDS = float(os.getenv('FANOUT_DEADLINE_SECONDS', 6))
+
+    # Predicción de granizo: modelo local (en proceso) o la API de Hugging Face Spaces
+    PREDICTION_BACKEND = os.getenv('PREDICTION_BACKEND', 'local')  # 'local' o 'remote'
+    PREDICTION_REMOTE_FALLBACK = os.getenv('PREDICTION_REMOTE_FALLBACK', 'true').lower() == 'true'  # Si falla el local
+    HF_PREDICTION_URL = os.getenv('HF_PREDICTION_URL', 'https://nahuelito22-nimbus-ai.hf.space/api/predict')
+    HAIL_MODEL_PATH = os.getenv('HAIL_MODEL_PATH', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models', 'multimodal_v3.1_optimizado.keras')))
+    HAIL_SCALER_PATH = os.getenv('HAIL_SCALER_PATH', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'processed', 'modelo_multimodal', 'sets_finales', 'scaler.pkl')))
+    HAIL_THRESHOLD = float(os.getenv('HAIL_THRESHOLD', 0.566))  # Umbral que maximiza el F1 (notebook 11)
+    # Micro-lotes: las predicciones concurrentes se agrupan en una sola llamada al modelo
+    PREDICTION_BATCH_MAX_SIZE = int(os.getenv('PREDICTION_BATCH_MAX_SIZE', 64))
+    PREDICTION_BATCH_MAX_WAIT_MS = float(os.getenv('PREDICTION_BATCH_MAX_WAIT_MS', 5))
+    PREDICTION_TIMEOUT_SECONDS = float(os.getenv('PREDICTION_TIMEOUT_SECONDS', 10))
+    # Caché de predicciones por celda y versión del modelo (misma caché compartida que los pronósticos)
+    PREDICTION_CACHE_ENABLED = os.getenv('PREDICTION_CACHE_ENABLED', 'true').lower() == 'true'
+    PREDICTION_TTL_SECONDS = int(os.getenv('PREDICTION_TTL_SECONDS', FORECAST_TTL_SECONDS))
+    PREDICTION_STALE_SECONDS = int(os.getenv('PREDICTION_STALE_SECONDS', 3600))  # Se sirve vencida mientras se revalida
+    # Grilla de riesgo de granizo (/api/hail-grid): la de la provincia se precalcula periódicamente
+    HAIL_GRID_ENABLED = os.getenv('HAIL_GRID_ENABLED', 'true').lower() == 'true'
+    HAIL_GRID_RESOLUTION = float(os.getenv('HAIL_GRID_RESOLUTION', 0.1))  # Grados, igual que la grilla de pronósticos
+    HAIL_GRID_MAX_POINTS = int(os.getenv('HAIL_GRID_MAX_POINTS', 500))  # Puntos por pedido (como mucho 5 pedidos en lote a Open-Meteo)
+    HAIL_GRID_REFRESH_SECONDS = int(os.getenv('HAIL_GRID_REFRESH_SECONDS', 3600))  # Los pronósticos cambian cada hora
+
+    # Tareas de fondo (ingesta GOES, grilla de granizo): un solo proceso por servidor las corre
+    BACKGROUND_LOCK_PATH = os.getenv('BACKGROUND_LOCK_PATH', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'background_workers.lock')))
+    # Estado de las tareas de fondo publicado por ese proceso (lo leen todos los workers)
+    BACKGROUND_STATUS_DIR = os.getenv('BACKGROUND_STATUS_DIR', os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'cache')))
+
+    # Configuración del worker de ingesta GOES-19 (pre-renderiza las imágenes satelitales)
+    GOES_INGEST_ENABLED = os.getenv('GOES_INGEST_ENABLED', 'true').lower() == 'true'
+    GOES_BANDS = [int(b) for b in os.getenv('GOES_BANDS', '13').split(',')]
+    GOES_PALETTES = os.getenv('GOES_PALETTES', 'inferno,viridis,plasma,gray').split(',')
+    # Productos derivados renderizados en el mismo lote (1308 = diferencia C13 - C08)
+    GOES_DERIVED_PRODUCTS = [int(p) for p in os.getenv('GOES_DERIVED_PRODUCTS', '1308').split(',') if p.strip()]
+    GOES_DECODE_WORKERS = int(os.getenv('GOES_DECODE_WORKERS', 0))  # Procesos para decodificar bandas (0 = núcleos)
+    GOES_POLL_SECONDS = int(os.getenv('GOES_POLL_SECONDS', 120))  # Frecuencia de consulta a S3
+    GOES_SCAN_CADENCE_SECONDS = int(os.getenv('GOES_SCAN_CADENCE_SECONDS', 600))  # Disco completo cada 10 min (modo 6)
+
+    # Eviction del almacén de imágenes satelitales (radar_images)
+    GOES_CACHE_BUDGET_MB = int(os.getenv('GOES_CACHE_BUDGET_MB', 200))  # Presupuesto total de disco
+    GOES_RETENTION_PER_CONFIG = int(os.getenv('GOES_RETENTION_PER_CONFIG', 4))  # Imágenes por banda+paleta
+    GOES_MAX_AGE_HOURS = int(os.getenv('GOES_MAX_AGE_HOURS', 24))  # Edad máxima de imágenes
+    GOES_EVICTION_INTERVAL_SECONDS = int(os.getenv('GOES_EVICTION_INTERVAL_SECONDS', 60))
+
     # Claves secretas para firmar la sesión y los tokens JWT
     SECRET_KEY = os.getenv('SECRET_KEY', 'una-clave-secreta-muy-dificil-de-adivinar')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'otra-clave-secreta-para-jwt')
@@ -1,5 +1,19 @@
 import requests
 from src.config import Config
+from src.services.http_client import get_client
+
+OPENWEATHER_BASE_URL = "https://api.openweathermap.org/data/2.5"
+
+def _format_clima(data):
+    """Formato de respuesta a partir de un registro de OpenWeather"""
+    return {
+        "ciudad": data["name"],
+        "temperatura": data["main"]["temp"],
+        "sensacion_termica": data["main"]["feels_like"],
+        "humedad": data["main"]["humidity"],
+        "clima": data["weather"][0]["description"],
+        "icono": data["weather"][0]["icon"],
+    }
 
 def get_clima(city_name):
     """
@@ -11,23 +25,48 @@ def get_clima(city_name):
     
     city_id = Config.CITIES[city_name]["id"]
     
-    url = f"https://api.openweathermap.org/data/2.5/weather?id={city_id}&appid={Config.OPENWEATHER_API_KEY}&units=metric&lang=es"
+    url = f"{OPENWEATHER_BASE_URL}/weather?id={city_id}&appid={Config.OPENWEATHER_API_KEY}&units=metric&lang=es"
     
     try:
-        response = requests.get(url)
+        response = get_client('openweather').get(url)
         
         if response.status_code == 200:
-            data = response.json()
-            return {
-                "ciudad": data["name"],
-                "temperatura": data["main"]["temp"],
-                "sensacion_termica": data["main"]["feels_like"],
-                "humedad": data["main"]["humidity"],
-                "clima": data["weather"][0]["description"],
-                "icono": data["weather"][0]["icon"],
-            }
+            return _format_clima(response.json())
         else:
             return {"error": f"Error API: {response.status_code}"}
             
     except requests.exceptions.RequestException as e:
-        return {"error": f"Error de conexión: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Error de conexión: {str(e)}"}
+
+def get_clima_group(city_names):
+    """
+    Clima de varias ciudades configuradas en una sola request (endpoint /group de
+    OpenWeather, hasta 20 IDs). Devuelve {ciudad: datos} o {"error": ...} si falla
+    la request completa; las ciudades que no vengan en la respuesta quedan con error.
+    """
+    ids = {Config.CITIES[name]["id"]: name for name in city_names if name in Config.CITIES}
+    if not ids:
+        return {"error": "Ninguna ciudad configurada"}
+
+    params = {
+        "id": ",".join(str(city_id) for city_id in ids),
+        "appid": Config.OPENWEATHER_API_KEY,
+        "units": "metric",
+        "lang": "es",
+    }
+    try:
+        response = get_client('openweather').get(f"{OPENWEATHER_BASE_URL}/group", params=params)
+        if response.status_code != 200:
+            return {"error": f"Error API: {response.status_code}"}
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        return {"error": f"Error de conexión: {str(e)}"}
+
+    results = {}
+    for item in data.get("list", []):
+        name = ids.get(item.get("id"))
+        if name:
+            results[name] = _format_clima(item)
+    for name in city_names:
+        results.setdefault(name, {"error": "Ciudad no configurada" if name not in Config.CITIES else "Sin datos en la respuesta agrupada"})
+    return results
@@ -0,0 +1,34 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Pool compartido para las consultas en paralelo a servicios externos (I/O, no CPU)
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='fanout')
+
+
+def fan_out(tasks, deadline_seconds):
+    """
+    Ejecuta en paralelo {nombre: función sin argumentos} con un deadline global.
+    Devuelve ({nombre: resultado}, nombres que no terminaron a tiempo). Las que fallan
+    devuelven {"error": ...}; las que vencen siguen corriendo en el pool pero no
+    demoran la respuesta.
+    """
+    started = time.perf_counter()
+    futures = {_executor.submit(fn): name for name, fn in tasks.items()}
+    done, pending = wait(futures, timeout=deadline_seconds)
+
+    results = {}
+    for future in done:
+        name = futures[future]
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            results[name] = {"error": str(e)}
+
+    timed_out = [futures[future] for future in pending]
+    for name in timed_out:
+        results[name] = {"error": f"Tiempo de espera agotado ({deadline_seconds}s)"}
+
+    elapsed = time.perf_counter() - started
+    if timed_out:
+        print(f"⚠️ Fan-out: {len(timed_out)} de {len(tasks)} sin respuesta en {elapsed:.2f}s")
+    return results, timed_out
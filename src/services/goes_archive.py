@@ -0,0 +1,256 @@
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from src.services.goes_crop_index import compute_crop_windows
+from src.services.single_flight import FileLock
+
+DAY_FORMAT = '%Y%m%d'
+
+
+class CropArchive:
+    """
+    Archivo local de los recortes de CMI ya escalados (°C, reflectancia o K), en float16 y
+    con NaN donde no hay dato. Cada escaneo se guarda como un chunk propio comprimido
+    (.npz) dentro de la carpeta de su día, así que el disco solo crece con los escaneos
+    que realmente llegaron. Un índice JSON por día guarda las ranuras ocupadas (una por
+    escaneo según la cadencia), la forma y la georreferencia del recorte.
+
+    Leer un escaneo descomprime solo su chunk. Los días que superan la retención se
+    eliminan, y si el archivo completo (todas las bandas) supera max_bytes se borran los
+    escaneos más viejos hasta volver al presupuesto.
+    """
+
+    def __init__(self, folder, slot_seconds=600, retention_days=30, max_bytes=None):
+        self.folder = folder
+        self.slot_seconds = slot_seconds
+        self.retention_days = retention_days
+        self.max_bytes = max_bytes
+        self.slots_per_day = 86400 // slot_seconds
+
+    def _band_folder(self, band):
+        return os.path.join(self.folder, f'band_{band}')
+
+    def _day_folder(self, band, day):
+        return os.path.join(self._band_folder(band), day)
+
+    def _chunk_path(self, band, day, slot):
+        return os.path.join(self._day_folder(band, day), f'{int(slot):03d}.npz')
+
+    def _index_path(self, band, day):
+        return os.path.join(self._band_folder(band), f'{day}.json')
+
+    def _lock(self):
+        # Un solo lock para todo el archivo: el presupuesto de disco abarca todas las bandas
+        return FileLock(os.path.join(self.folder, 'archive.lock'), timeout=60, stale_after=300)
+
+    def _slot(self, scan_start):
+        seconds = scan_start.hour * 3600 + scan_start.minute * 60 + scan_start.second
+        return seconds // self.slot_seconds
+
+    def _read_index(self, band, day):
+        try:
+            with open(self._index_path(band, day)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _write_index(self, band, day, index):
+        path = self._index_path(band, day)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def _write_chunk(self, path, data):
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, data=data)
+        os.replace(tmp_path, path)
+
+    def bands(self):
+        """Bandas (o productos) con algún día archivado"""
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        return sorted(int(name[5:]) for name in names if name.startswith('band_') and name[5:].isdigit())
+
+    def days(self, band):
+        """Días archivados de la banda (YYYYmmdd), del más viejo al más nuevo"""
+        try:
+            names = os.listdir(self._band_folder(band))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-5] for name in names if name.endswith('.json'))
+
+    def append(self, band, scan_start, data, georef=None, units=None):
+        """Guarda el recorte de un escaneo en la ranura que le corresponde de su día"""
+        day = scan_start.strftime(DAY_FORMAT)
+        slot = self._slot(scan_start)
+        data = np.asarray(data, dtype=np.float16)
+        os.makedirs(self._day_folder(band, day), exist_ok=True)
+
+        with self._lock():
+            index = self._read_index(band, day)
+            if index is not None and tuple(index["shape"]) != data.shape:
+                print(f"⚠️ Archivo GOES banda {band}: la grilla cambió durante {day}, se omite el escaneo")
+                return False
+            if index is None:
+                index = {
+                    "band": band,
+                    "day": day,
+                    "slot_seconds": self.slot_seconds,
+                    "shape": list(data.shape),
+                    "georef": georef,
+                    "units": units,
+                    "scans": {},
+                }
+
+            # El chunk se escribe antes que el índice: una ranura indexada siempre tiene datos
+            self._write_chunk(self._chunk_path(band, day, slot), data)
+            index["scans"][str(slot)] = scan_start.isoformat()
+            self._write_index(band, day, index)
+
+            self._compact(band, scan_start)
+            self._enforce_budget()
+        return True
+
+    def _remove_day(self, band, day):
+        shutil.rmtree(self._day_folder(band, day), ignore_errors=True)
+        try:
+            os.remove(self._index_path(band, day))
+        except FileNotFoundError:
+            pass
+
+    def _compact(self, band, now):
+        """Elimina los días que superan la retención"""
+        oldest = (now - timedelta(days=self.retention_days)).strftime(DAY_FORMAT)
+        for day in self.days(band):
+            if day >= oldest:
+                break
+            self._remove_day(band, day)
+
+    def _archived_chunks(self):
+        """[(inicio, banda, día, ranura, bytes)] de todos los escaneos archivados"""
+        chunks = []
+        for band in self.bands():
+            for day in self.days(band):
+                index = self._read_index(band, day) or {"scans": {}}
+                for slot, iso in index["scans"].items():
+                    try:
+                        size = os.path.getsize(self._chunk_path(band, day, slot))
+                    except FileNotFoundError:
+                        size = 0
+                    chunks.append((datetime.fromisoformat(iso), band, day, slot, size))
+        return chunks
+
+    def total_bytes(self):
+        return sum(chunk[4] for chunk in self._archived_chunks())
+
+    def _enforce_budget(self):
+        """Borra los escaneos más viejos (de cualquier banda) mientras se supere max_bytes"""
+        if not self.max_bytes:
+            return 0
+        chunks = sorted(self._archived_chunks())
+        total = sum(chunk[4] for chunk in chunks)
+        removed = 0
+        for scan_start, band, day, slot, size in chunks:
+            if total <= self.max_bytes:
+                break
+            index = self._read_index(band, day)
+            if index is not None:
+                index["scans"].pop(slot, None)
+                if index["scans"]:
+                    self._write_index(band, day, index)
+            if index is None or not index["scans"]:
+                self._remove_day(band, day)
+            else:
+                try:
+                    os.remove(self._chunk_path(band, day, slot))
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        if removed:
+            print(f"🧹 Archivo GOES: {removed} escaneos eliminados por presupuesto ({total / 1e6:.1f} MB)")
+        return removed
+
+    def _load_chunk(self, band, day, slot):
+        """Recorte de una ranura (descomprime solo ese chunk), o None si no existe"""
+        try:
+            with np.load(self._chunk_path(band, day, slot)) as chunk:
+                return chunk['data']
+        except FileNotFoundError:
+            return None
+
+    def scans(self, band, start=None, end=None):
+        """Lista ordenada de inicios de escaneo archivados en [start, end]"""
+        found = []
+        for day in self.days(band):
+            if start is not None and day < start.strftime(DAY_FORMAT):
+                continue
+            if end is not None and day > end.strftime(DAY_FORMAT):
+                continue
+            index = self._read_index(band, day) or {"scans": {}}
+            for iso in index["scans"].values():
+                scan_start = datetime.fromisoformat(iso)
+                if (start is None or scan_start >= start) and (end is None or scan_start <= end):
+                    found.append(scan_start)
+        return sorted(found)
+
+    def bbox_window(self, georef, shape, bbox):
+        """(fila_ini, fila_fin, col_ini, col_fin) del bbox dentro del recorte archivado"""
+        row0, _, col0, _ = georef["window"]
+        x = (col0 + np.arange(shape[1])) * georef["x_scale"] + georef["x_offset"]
+        y = (row0 + np.arange(shape[0])) * georef["y_scale"] + georef["y_offset"]
+        return compute_crop_windows(georef["h_sat"], georef["lon_cen"], x, y, {"bbox": bbox})["bbox"]
+
+    def read(self, band, start, end, bbox=None):
+        """
+        Recortes de la banda entre start y end (inclusive), opcionalmente reducidos a un
+        bbox (lon_min, lat_min, lon_max, lat_max). Devuelve (inicios, arreglo T x filas x
+        columnas en float16); solo se descomprimen los chunks de los escaneos pedidos.
+        """
+        times = []
+        frames = []
+        for day in self.days(band):
+            if day < start.strftime(DAY_FORMAT) or day > end.strftime(DAY_FORMAT):
+                continue
+            index = self._read_index(band, day)
+            if index is None:
+                continue
+
+            window = (0, index["shape"][0], 0, index["shape"][1])
+            if bbox is not None:
+                if not index.get("georef"):
+                    raise ValueError(f"El archivo de la banda {band} ({day}) no tiene georreferencia")
+                window = self.bbox_window(index["georef"], index["shape"], bbox)
+            row0, row1, col0, col1 = window
+
+            for slot, iso in sorted(index["scans"].items(), key=lambda item: int(item[0])):
+                scan_start = datetime.fromisoformat(iso)
+                if start <= scan_start <= end:
+                    data = self._load_chunk(band, day, slot)
+                    if data is None:
+                        continue
+                    times.append(scan_start)
+                    frames.append(data[row0:row1, col0:col1])
+
+        if not frames:
+            return [], None
+        # Con bbox los días con grillas distintas pueden dar ventanas distintas: se recortan al mínimo
+        height = min(frame.shape[0] for frame in frames)
+        width = min(frame.shape[1] for frame in frames)
+        return times, np.stack([frame[:height, :width] for frame in frames])
+
+    def load(self, band, scan_start):
+        """Recorte de un escaneo puntual, o None si no está archivado"""
+        if scan_start.tzinfo is None:
+            scan_start = scan_start.replace(tzinfo=timezone.utc)
+        times, stack = self.read(band, scan_start, scan_start)
+        return stack[0] if times else None
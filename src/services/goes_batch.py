@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from src.services import goes_decode
+from src.services.goes_crop_index import MENDOZA_BBOX
+from src.services.goes_render import DERIVED_PRODUCTS
+from src.services.goes_service import (
+    BUCKET_NAME,
+    crop_index,
+    get_cache_key,
+    get_s3_client,
+    read_scan_crop,
+    render_crop,
+    scan_index,
+)
+
+# Las bandas de un mismo escaneo de disco completo comparten el inicio en la clave S3;
+# el margen cubre diferencias de segundos entre canales
+SCAN_MATCH_TOLERANCE = timedelta(seconds=60)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers=None):
+    """
+    Pool de procesos compartido entre lotes, creado una sola vez con el tamaño
+    configurado (GOES_DECODE_WORKERS, o los núcleos). Son procesos y no hilos: h5py
+    serializa todas sus llamadas con un lock global, así que en hilos las bandas se
+    decodificarían de a una. Los hijos arrancan desde goes_decode (ver pool_context).
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1,
+                                            mp_context=goes_decode.pool_context())
+    return _pool
+
+
+def _discard_pool(pool):
+    """Descarta un pool roto (un hijo murió) para que el próximo lote cree otro"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def decode_band_crop(file_key):
+    """Lee y decodifica el recorte de una banda en este proceso: (recorte, georef)"""
+    return read_scan_crop(get_s3_client(), file_key)
+
+
+def _decode_in_pool(pool, file_key):
+    return pool.submit(goes_decode.decode_band_crop, BUCKET_NAME, file_key, MENDOZA_BBOX, crop_index.path)
+
+
+def find_scan_keys(bands, scan_start=None):
+    """
+    Claves S3 de cada banda para un mismo escaneo: {banda: clave}. Sin scan_start se
+    usa el escaneo más reciente de la primera banda. Las bandas que todavía no
+    publicaron ese escaneo quedan fuera del resultado.
+    """
+    bands = list(bands)
+    if not bands:
+        return {}
+    if scan_start is None:
+        scans = scan_index.scans(bands[0])
+        if not scans:
+            return {}
+        scan_start = scans[-1][0]
+
+    keys = {}
+    for band in bands:
+        since = scan_start - SCAN_MATCH_TOLERANCE
+        for start, key in scan_index.scans(band, since=since):
+            if abs(start - scan_start) <= SCAN_MATCH_TOLERANCE:
+                keys[band] = key
+                break
+    return keys
+
+
+def derived_inputs(products):
+    """Bandas que hacen falta para calcular los productos derivados pedidos"""
+    return sorted({band for product in products for band in DERIVED_PRODUCTS[product]})
+
+
+def decode_scan_bands(keys_by_band, max_workers=None):
+    """
+    Decodifica los recortes de varias bandas de un escaneo: {banda: (recorte, georef)}.
+    Con más de una banda cada una se lee y decodifica en un proceso del pool, en
+    paralelo. Con una sola banda (o un único proceso configurado) se decodifica acá
+    mismo, sin el costo de pasar el recorte entre procesos. Si el pool se rompe, el
+    lote se decodifica en serie en este proceso.
+    """
+    bands = sorted(keys_by_band)
+    workers = min(len(bands), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return {band: decode_band_crop(keys_by_band[band]) for band in bands}
+
+    pool = _get_pool(max_workers)
+    try:
+        futures = {band: _decode_in_pool(pool, keys_by_band[band]) for band in bands}
+        decoded = {}
+        for band, future in futures.items():
+            recorte, stats = future.result()
+            print(f"📦 Banda {band}: {stats['bytes_fetched'] / 1e6:.1f} MB de {stats['object_bytes'] / 1e6:.1f} MB en {stats['requests']} GETs")
+            decoded[band] = (recorte, stats["georef"])
+        return decoded
+    except BrokenProcessPool as e:
+        print(f"⚠️ Pool de decodificación roto ({e}); se decodifica en serie")
+        _discard_pool(pool)
+        return {band: decode_band_crop(keys_by_band[band]) for band in bands}
+
+
+def render_scan_batch(keys_by_band, palettes, products=(), render_bands=None, max_workers=None):
+    """
+    Renderiza en un solo trabajo todas las bandas y productos derivados de un escaneo.
+    keys_by_band: {banda: clave S3} (de find_scan_keys); cada banda se lee una sola vez
+    aunque también la use un producto derivado. render_bands limita qué bandas se
+    publican como imagen (por defecto todas las de keys_by_band).
+    Devuelve ({banda_o_producto: {paleta: ruta_imagen}}, métricas).
+    """
+    started = time.perf_counter()
+    render_bands = sorted(keys_by_band) if render_bands is None else [b for b in render_bands if b in keys_by_band]
+
+    needed = set(render_bands)
+    for product in products:
+        needed.update(band for band in DERIVED_PRODUCTS[product] if band in keys_by_band)
+    decoded = decode_scan_bands({band: keys_by_band[band] for band in needed}, max_workers=max_workers)
+    crops = {band: recorte for band, (recorte, _) in decoded.items()}
+    decoded_at = time.perf_counter()
+
+    outputs = {}
+    for band in render_bands:
+        outputs[band] = render_crop(band, crops[band], palettes, get_cache_key(keys_by_band[band]),
+                                    georef=decoded[band][1])
+
+    for product in products:
+        band_a, band_b = DERIVED_PRODUCTS[product]
+        if band_a not in crops or band_b not in crops:
+            print(f"⚠️ Producto {product}: faltan las bandas {band_a}/{band_b} en este escaneo")
+            continue
+        if crops[band_a].shape != crops[band_b].shape:
+            print(f"⚠️ Producto {product}: las bandas {band_a} y {band_b} tienen grillas distintas")
+            continue
+        # Diferencia de temperatura de brillo en K (las dos bandas vienen sin escalar)
+        btd = crops[band_a] - crops[band_b]
+        outputs[product] = render_crop(product, btd, palettes, get_cache_key(keys_by_band[band_a]),
+                                       georef=decoded[band_a][1])
+
+    stats = {
+        "bands": sorted(needed),
+        "decode_seconds": round(decoded_at - started, 3),
+        "render_seconds": round(time.perf_counter() - decoded_at, 3),
+    }
+    print(f"🧩 Lote GOES: {len(outputs)} productos en {stats['decode_seconds'] + stats['render_seconds']:.2f}s")
+    return outputs, stats
@@ -0,0 +1,188 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# latest_band_<banda>_<paleta>_<clave>.png
+IMAGE_FILENAME_RE = re.compile(r'^latest_band_(\d+)_([a-z]+)_(.+)\.png$')
+
+# Cada cuánto como mucho se escribe el último acceso de una imagen en su atime
+ACCESS_WRITE_INTERVAL_SECONDS = 60
+
+
+class ImageCatalog:
+    """
+    Índice en memoria de las imágenes renderizadas: (banda, paleta, clave) -> ruta,
+    tamaño, mtime y último acceso. Se construye una vez escaneando la carpeta y luego
+    se actualiza en cada render y cada eliminación, así las búsquedas y las
+    estadísticas de disco no dependen de la cantidad de archivos en radar_images.
+    La carpeta es compartida entre procesos: antes de devolver una imagen se comprueba
+    que siga en disco, y la eviction re-escanea la carpeta (rescan) antes de decidir.
+    El último acceso se guarda en el atime del archivo (os.utime, conservando el mtime),
+    así el LRU de la eviction ve los accesos de todos los workers.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.RLock()
+        self._built = False
+        # Ordenado por mtime: el primero es el más antiguo y el último el más nuevo
+        self._entries = OrderedDict()  # ruta -> entrada
+        self._by_key = {}              # (banda, paleta, clave) -> ruta
+        self.total_bytes = 0
+
+    def _scan_folder(self):
+        """(mtime, tamaño, ruta, (banda, paleta, clave), atime) de cada imagen en la carpeta"""
+        found = []
+        if os.path.isdir(self.folder):
+            with os.scandir(self.folder) as it:
+                for item in it:
+                    match = IMAGE_FILENAME_RE.match(item.name)
+                    if not match:
+                        continue
+                    try:
+                        if item.is_file():
+                            stat = item.stat()
+                            found.append((stat.st_mtime, stat.st_size, item.path, match.groups(), stat.st_atime))
+                    except FileNotFoundError:
+                        continue  # La eliminó otro proceso durante el escaneo
+        return sorted(found)
+
+    def build(self):
+        """Escanea la carpeta una sola vez (al iniciar la app)"""
+        with self._lock:
+            if self._built:
+                return
+            for mtime, size, path, (band, palette, key), atime in self._scan_folder():
+                self._insert(int(band), palette, key, path, size, mtime, atime)
+            self._built = True
+            print(f"🗂️ Catálogo de imágenes: {len(self._entries)} archivos, {self.total_bytes / (1024 * 1024):.2f} MB")
+
+    def rescan(self):
+        """
+        Vuelve a leer la carpeta, que comparten todos los workers del servidor: incorpora
+        lo que renderizaron otros procesos y quita lo que eliminaron. El último acceso sale
+        del atime (lo escriben todos los procesos) o del registrado en este proceso si es
+        más reciente. Devuelve las entradas (como entries()).
+        """
+        found = self._scan_folder()
+        with self._lock:
+            previous = self._entries
+            self._entries = OrderedDict()
+            self._by_key = {}
+            self.total_bytes = 0
+            for mtime, size, path, (band, palette, key), atime in found:
+                self._insert(int(band), palette, key, path, size, mtime, atime)
+                if path in previous:
+                    self._entries[path]["last_access"] = max(previous[path]["last_access"], self._entries[path]["last_access"])
+            self._built = True
+            return list(self._entries.values())
+
+    def _insert(self, band, palette, key, path, size, mtime, atime=0):
+        previous = self._entries.pop(path, None)
+        if previous:
+            self.total_bytes -= previous["size"]
+        self._entries[path] = {
+            "band": band,
+            "palette": palette,
+            "key": key,
+            "path": path,
+            "size": size,
+            "mtime": mtime,
+            "last_access": max(mtime, atime),
+            "access_written": atime,
+        }
+        self._by_key[(band, palette, key)] = path
+        self.total_bytes += size
+
+    def add(self, band, palette, key, path):
+        """Registra una imagen recién renderizada"""
+        stat = os.stat(path)
+        with self._lock:
+            self.build()
+            self._insert(band, palette, key, path, stat.st_size, stat.st_mtime)
+
+    def _record_access(self, entry):
+        """
+        Registra el acceso en memoria y, como mucho cada ACCESS_WRITE_INTERVAL_SECONDS,
+        en el atime del archivo, visible para los demás procesos en su próximo rescan
+        """
+        now = time.time()
+        if now - entry["access_written"] >= ACCESS_WRITE_INTERVAL_SECONDS:
+            try:
+                stat = os.stat(entry["path"])
+                os.utime(entry["path"], ns=(time.time_ns(), stat.st_mtime_ns))
+                entry["access_written"] = now
+            except OSError:
+                pass  # La eliminó otro proceso: el próximo get/contains la descarta
+        entry["last_access"] = now
+
+    def discard(self, path):
+        """Quita una imagen del catálogo (tras eliminarla del disco)"""
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                return None
+            self.total_bytes -= entry["size"]
+            if self._by_key.get((entry["band"], entry["palette"], entry["key"])) == path:
+                del self._by_key[(entry["band"], entry["palette"], entry["key"])]
+            return entry
+
+    def get(self, band, palette, key):
+        """Entrada de la imagen para banda+paleta+clave, o None. Registra el acceso."""
+        with self._lock:
+            self.build()
+            path = self._by_key.get((band, palette, key))
+            if path is None:
+                return None
+            # Otro worker del servidor pudo haberla eliminado: cuenta como no encontrada
+            if not os.path.exists(path):
+                self.discard(path)
+                return None
+            entry = self._entries[path]
+            self._record_access(entry)
+            return entry
+
+    def contains(self, path):
+        """
+        True si la imagen existe. Si no está en el catálogo (la generó otro worker del
+        servidor) se comprueba solo esa ruta en disco y se incorpora.
+        """
+        with self._lock:
+            self.build()
+            entry = self._entries.get(path)
+            if entry is not None:
+                if os.path.exists(path):
+                    self._record_access(entry)
+                    return True
+                self.discard(path)
+                return False
+
+        match = IMAGE_FILENAME_RE.match(os.path.basename(path))
+        if not match or not os.path.exists(path):
+            return False
+        band, palette, key = match.groups()
+        try:
+            self.add(int(band), palette, key, path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def entries(self):
+        """Copia de las entradas, de la más antigua a la más nueva"""
+        with self._lock:
+            self.build()
+            return list(self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            self.build()
+            oldest = next(iter(self._entries.values()), None)
+            newest = next(reversed(self._entries.values()), None) if self._entries else None
+            return {
+                "total_bytes": self.total_bytes,
+                "file_count": len(self._entries),
+                "oldest_file": os.path.basename(oldest["path"]) if oldest else None,
+                "newest_file": os.path.basename(newest["path"]) if newest else None,
+            }
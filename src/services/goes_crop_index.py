@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import unicodedata
+import uuid
+
+import numpy as np
+from pyproj import Proj
+
+DEPARTAMENTOS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'raw', 'departamentos-mendoza.json'))
+
+# Recorte de Mendoza (lon_min, lat_min, lon_max, lat_max)
+MENDOZA_BBOX = (-70.5, -37.5, -66.5, -32.0)
+
+
+def _region_name(name):
+    """Nombre de región normalizado: minúsculas, sin acentos y con guiones bajos"""
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    return name.strip().lower().replace(' ', '_')
+
+
+def load_regions(path=DEPARTAMENTOS_PATH):
+    """
+    Regiones con nombre para recortar: la provincia completa más el bbox de cada
+    departamento de departamentos-mendoza.json.
+    """
+    regions = {"mendoza": MENDOZA_BBOX}
+    try:
+        with open(path, encoding='utf-8') as f:
+            geojson = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ No se encontró {path}; solo se usa el recorte provincial")
+        return regions
+
+    for feature in geojson.get('features', []):
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        coords = np.array([point for polygon in polygons for ring in polygon for point in ring])
+        name = _region_name(feature['properties']['departamento'])
+        regions[f"departamento_{name}"] = (
+            float(coords[:, 0].min()), float(coords[:, 1].min()),
+            float(coords[:, 0].max()), float(coords[:, 1].max()),
+        )
+    return regions
+
+
+REGIONS = load_regions()
+
+
+def compute_crop_windows(h_sat, lon_cen, x, y, bboxes):
+    """
+    Ventanas de índices (fila_ini, fila_fin, col_ini, col_fin) que cubren cada bbox
+    (lon_min, lat_min, lon_max, lat_max); equivalen al ds.sel(x=slice, y=slice) original.
+    x e y son las coordenadas de la grilla en radianes.
+    """
+    p = Proj(proj='geos', h=h_sat, lon_0=lon_cen)
+    x = np.asarray(x, dtype=np.float64) * h_sat
+    y = np.asarray(y, dtype=np.float64) * h_sat
+
+    windows = {}
+    for name, (lon_min, lat_min, lon_max, lat_max) in bboxes.items():
+        x1, y1 = p(lon_min, lat_min)
+        x2, y2 = p(lon_max, lat_max)
+
+        cols = np.nonzero((x >= x1) & (x <= x2))[0]
+        rows = np.nonzero((y <= y2) & (y >= y1))[0]
+        if cols.size == 0 or rows.size == 0:
+            raise ValueError(f"La región '{name}' no intersecta la grilla del satélite")
+        windows[name] = (int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1)
+    return windows
+
+
+class CropIndexCache:
+    """
+    Caché persistente de ventanas de recorte. La clave es
+    (perspective_point_height, longitude_of_projection_origin, forma de la grilla, bbox),
+    de modo que los escaneos siguientes van directo a un slicing entero sobre CMI
+    sin recalcular la proyección ni leer las coordenadas x/y.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._windows = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(h_sat, lon_cen, shape, bbox):
+        bbox_str = ",".join(f"{v:.4f}" for v in bbox)
+        return f"{float(h_sat):.1f}|{float(lon_cen):.4f}|{shape[0]}x{shape[1]}|{bbox_str}"
+
+    def _load(self):
+        if self._windows is None:
+            try:
+                with open(self.path) as f:
+                    self._windows = {k: tuple(v) for k, v in json.load(f).items()}
+            except (FileNotFoundError, ValueError):
+                self._windows = {}
+        return self._windows
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._windows, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def get_windows(self, h_sat, lon_cen, shape, bboxes, load_coordinates):
+        """
+        Devuelve {nombre: (fila_ini, fila_fin, col_ini, col_fin)} para cada bbox.
+        load_coordinates() -> (x, y) solo se llama si falta alguna ventana en la caché.
+        """
+        with self._lock:
+            windows = self._load()
+            keys = {name: self.make_key(h_sat, lon_cen, shape, bbox) for name, bbox in bboxes.items()}
+            missing = [name for name, key in keys.items() if key not in windows]
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+            if missing:
+                x, y = load_coordinates()
+                computed = compute_crop_windows(h_sat, lon_cen, x, y, {name: bboxes[name] for name in missing})
+                for name, window in computed.items():
+                    windows[keys[name]] = window
+                self._save()
+
+            return {name: windows[key] for name, key in keys.items()}
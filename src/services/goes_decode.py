@@ -0,0 +1,42 @@
+"""
+Punto de entrada de los procesos que decodifican bandas GOES.
+
+h5py serializa todas sus llamadas con un lock global propio, y los GETs por rango a S3
+ocurren dentro de los callbacks de lectura de h5py, así que varias bandas en hilos de
+un mismo proceso se decodifican de a una. Cada banda se decodifica en un proceso
+aparte, que solo importa este módulo (h5py, boto3, pyproj): nunca src.app ni
+goes_service con sus cachés y workers.
+"""
+import multiprocessing
+
+from src.services.goes_crop_index import CropIndexCache
+from src.services.goes_remote import read_cmi_crop
+from src.services.goes_scans import get_s3_client
+
+# Una caché de ventanas por proceso hijo, cargada desde el mismo JSON que usa la app
+_crop_indexes = {}
+
+
+def _crop_index(path):
+    if path not in _crop_indexes:
+        _crop_indexes[path] = CropIndexCache(path)
+    return _crop_indexes[path]
+
+
+def decode_band_crop(bucket, file_key, bbox, crop_index_path):
+    """Lee y decodifica el recorte de una banda en el proceso hijo: (recorte, estadísticas)"""
+    return read_cmi_crop(get_s3_client(), bucket, file_key, bbox, _crop_index(crop_index_path))
+
+
+def pool_context():
+    """
+    Contexto de multiprocessing para el pool: forkserver donde existe (los hijos salen
+    de un servidor limpio que solo precargó este módulo, no de un fork del worker web
+    con sus hilos) y spawn en el resto.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        # Sin '__main__' en la precarga el servidor no vuelve a importar el script principal
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context('spawn')
@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from src.services.single_flight import FileLock
+
+
+class ImageEvictor:
+    """
+    Eviction del almacén de imágenes satelitales, fuera del camino de las requests.
+    Por cada configuración (banda+paleta) conserva las `retention_per_config` más nuevas
+    y descarta las de más de `max_age_hours`; si el total sigue por encima del presupuesto
+    de bytes, elimina por LRU (último acceso de cualquier worker, guardado en el atime por
+    ImageCatalog). La imagen más nueva de cada configuración nunca se elimina porque es
+    la que se está sirviendo.
+    La carpeta es compartida por todos los workers: cada pasada toma un lock de archivo
+    (si otro proceso ya está evictando, se saltea) y re-escanea la carpeta, así el
+    presupuesto se aplica al total real del servidor.
+    """
+
+    def __init__(self, catalog, budget_bytes, retention_per_config=4, max_age_hours=24, interval_seconds=60):
+        self.catalog = catalog
+        self.budget_bytes = budget_bytes
+        self.retention_per_config = retention_per_config
+        self.max_age_hours = max_age_hours
+        self.interval_seconds = interval_seconds
+
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.runs = 0
+        self.last_run_at = None
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='goes-eviction', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def wake(self):
+        """Pide una pasada de eviction sin bloquear (ej. después de un render)"""
+        self._wake_event.set()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.evict_once()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Error en eviction de imágenes: {e}")
+            self._wake_event.wait(self.interval_seconds)
+            self._wake_event.clear()
+
+    def select_victims(self, entries, now):
+        """Decide qué entradas eliminar; determinista para un mismo estado del catálogo"""
+        groups = defaultdict(list)
+        for entry in entries:
+            groups[(entry["band"], entry["palette"])].append(entry)
+
+        victims = {}
+        protected = set()
+        max_age_seconds = self.max_age_hours * 3600
+        for items in groups.values():
+            items.sort(key=lambda e: (e["mtime"], e["path"]), reverse=True)
+            protected.add(items[0]["path"])
+            for position, entry in enumerate(items[1:], start=1):
+                if position >= self.retention_per_config or now - entry["mtime"] > max_age_seconds:
+                    victims[entry["path"]] = entry
+
+        remaining = sum(e["size"] for e in entries) - sum(e["size"] for e in victims.values())
+        if remaining > self.budget_bytes:
+            candidates = sorted(
+                (e for e in entries if e["path"] not in victims and e["path"] not in protected),
+                key=lambda e: (e["last_access"], e["path"])
+            )
+            for entry in candidates:
+                if remaining <= self.budget_bytes:
+                    break
+                victims[entry["path"]] = entry
+                remaining -= entry["size"]
+
+        return list(victims.values())
+
+    def _lock_path(self):
+        os.makedirs(self.catalog.folder, exist_ok=True)
+        return os.path.join(self.catalog.folder, 'eviction.lock')
+
+    def evict_once(self):
+        """Una pasada de eviction. Devuelve (archivos, bytes) eliminados."""
+        files = 0
+        freed = 0
+        try:
+            with FileLock(self._lock_path(), timeout=1):
+                for entry in self.select_victims(self.catalog.rescan(), time.time()):
+                    try:
+                        os.remove(entry["path"])
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        print(f"⚠️ Error al eliminar {entry['path']}: {e}")
+                        continue
+                    self.catalog.discard(entry["path"])
+                    files += 1
+                    freed += entry["size"]
+        except TimeoutError:
+            return 0, 0  # Otro worker está haciendo la pasada sobre la misma carpeta
+
+        with self._lock:
+            self.runs += 1
+            self.evicted_files += files
+            self.evicted_bytes += freed
+            self.last_run_at = datetime.now(timezone.utc)
+
+        if files:
+            print(f"🗑️ Eviction: {files} imágenes eliminadas ({freed / (1024 * 1024):.2f} MB)")
+        return files, freed
+
+    def status(self):
+        with self._lock:
+            return {
+                "budget_mb": round(self.budget_bytes / (1024 * 1024), 2),
+                "retention_per_config": self.retention_per_config,
+                "max_age_hours": self.max_age_hours,
+                "evicted_files": self.evicted_files,
+                "evicted_mb": round(self.evicted_bytes / (1024 * 1024), 2),
+                "runs": self.runs,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_error": self.last_error,
+            }
+
+
+_evictor = None
+
+def start_eviction_worker(catalog, config):
+    """Inicia (una sola vez por proceso) la eviction en segundo plano"""
+    global _evictor
+    if _evictor is None:
+        _evictor = ImageEvictor(
+            catalog,
+            budget_bytes=config['GOES_CACHE_BUDGET_MB'] * 1024 * 1024,
+            retention_per_config=config['GOES_RETENTION_PER_CONFIG'],
+            max_age_hours=config['GOES_MAX_AGE_HOURS'],
+            interval_seconds=config['GOES_EVICTION_INTERVAL_SECONDS'],
+        )
+        _evictor.start()
+    return _evictor
+
+def wake_eviction_worker():
+    if _evictor is not None:
+        _evictor.wake()
+
+def get_eviction_status():
+    if _evictor is None:
+        return {"running": False}
+    return _evictor.status()
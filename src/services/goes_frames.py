@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import numpy as np
+
+from src.services.goes_render import (
+    BAND_CLASSES,
+    band_class,
+    encode_animation,
+    encode_image,
+    get_lut,
+    quantize,
+)
+from src.services.single_flight import FileLock
+
+# Clave de cuadro: inicio del escaneo (YYYYmmdd_HHMMSS), igual que la clave de caché de imágenes
+FRAME_KEY_RE = re.compile(r'^\d{8}_\d{6}$')
+
+
+class FrameStore:
+    """
+    Buffer circular en disco con los últimos `capacity` recortes de cada banda, en float16
+    y ya escalados (°C, reflectancia o K). Cada escaneo nuevo agrega un solo cuadro y
+    descarta el más viejo; el índice por banda es un JSON que se reemplaza de forma
+    atómica, así todos los workers del servidor ven el mismo buffer. Los cuadros se
+    leen con mmap.
+    """
+
+    def __init__(self, folder, capacity=48):
+        self.folder = folder
+        self.capacity = capacity
+
+    def _index_path(self, band):
+        return os.path.join(self.folder, f'frames_band_{band}.json')
+
+    def _frame_path(self, band, key):
+        return os.path.join(self.folder, f'frame_band_{band}_{key}.npy')
+
+    def _lock(self, band):
+        return FileLock(os.path.join(self.folder, f'lock_frames_band_{band}'), timeout=30, stale_after=120)
+
+    def frames(self, band):
+        """Cuadros disponibles de la banda, del más viejo al más nuevo"""
+        try:
+            with open(self._index_path(band)) as f:
+                return json.load(f)["frames"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return []
+
+    def _write_index(self, band, frames):
+        path = self._index_path(band)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"band": band, "capacity": self.capacity, "frames": frames}, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def append(self, band, key, data, georef=None):
+        """
+        Agrega el cuadro de un escaneo (o lo reemplaza si ya estaba) y recorta el buffer.
+        georef (de read_scan_crop) permite reproyectar el cuadro, ej. para los tiles.
+        """
+        if not FRAME_KEY_RE.match(key):
+            return False
+        os.makedirs(self.folder, exist_ok=True)
+
+        frame_path = self._frame_path(band, key)
+        tmp_path = f"{frame_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(data, dtype=np.float16))
+        os.replace(tmp_path, frame_path)
+
+        with self._lock(band):
+            frames = [frame for frame in self.frames(band) if frame["key"] != key]
+            scan_start = datetime.strptime(key, '%Y%m%d_%H%M%S').replace(tzinfo=timezone.utc)
+            frames.append({
+                "key": key,
+                "scan_start": scan_start.isoformat(),
+                "shape": list(np.shape(data)),
+                "georef": georef,
+            })
+            # La clave es el inicio del escaneo (YYYYmmdd_HHMMSS): ordena cronológicamente
+            frames.sort(key=lambda frame: frame["key"])
+            dropped, frames = frames[:-self.capacity], frames[-self.capacity:]
+            self._write_index(band, frames)
+
+        for frame in dropped:
+            try:
+                os.remove(self._frame_path(band, frame["key"]))
+            except FileNotFoundError:
+                pass
+        return True
+
+    def frame(self, band, key):
+        """Entrada del índice para el cuadro, o None"""
+        return next((frame for frame in self.frames(band) if frame["key"] == key), None)
+
+    def load(self, band, key):
+        """Recorte float16 del cuadro (mmap de solo lectura), o None si ya salió del buffer"""
+        try:
+            return np.load(self._frame_path(band, key), mmap_mode='r')
+        except FileNotFoundError:
+            return None
+
+
+class FrameAnimator:
+    """
+    Cuadros y animaciones a partir del FrameStore. Cada cuadro se cuantiza una sola vez a
+    índices de LUT (uint8, independiente de la paleta) y queda en un LRU en memoria, así
+    un escaneo nuevo solo agrega la cuantización de su cuadro; la animación codificada
+    se cachea hasta que cambia la lista de cuadros.
+    Con un archivo de recortes (CropArchive) también sirve escaneos que ya salieron del
+    buffer y rangos históricos.
+    """
+
+    def __init__(self, store, archive=None, max_cached_frames=256, max_cached_animations=16):
+        self.store = store
+        self.archive = archive
+        self.max_cached_frames = max_cached_frames
+        self.max_cached_animations = max_cached_animations
+        self._lock = threading.Lock()
+        self._indices = OrderedDict()     # (banda, clave) -> índices uint8
+        self._animations = OrderedDict()  # (banda, paleta, formato, claves) -> bytes
+
+    @staticmethod
+    def _remember(cache, key, value, limit):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > limit:
+            cache.popitem(last=False)
+
+    def recent_frames(self, band, count):
+        """Los últimos `count` cuadros de la banda según el índice del buffer"""
+        return self.store.frames(band)[-count:] if count > 0 else []
+
+    def frames_between(self, band, start, end, count):
+        """
+        Los últimos `count` cuadros con inicio en [start, end]: los del buffer más los del
+        archivo (solo se leen los índices de cada día, no los recortes)
+        """
+        frames = {frame["key"]: frame for frame in self.store.frames(band)
+                  if start <= datetime.fromisoformat(frame["scan_start"]) <= end}
+        if self.archive is not None:
+            for scan_start in self.archive.scans(band, start, end):
+                key = scan_start.strftime('%Y%m%d_%H%M%S')
+                frames.setdefault(key, {"key": key, "scan_start": scan_start.isoformat()})
+        return [frames[key] for key in sorted(frames)][-count:] if count > 0 else []
+
+    def _load(self, band, key):
+        """Recorte del cuadro: del buffer, o del archivo si ya salió de él"""
+        data = self.store.load(band, key)
+        if data is None and self.archive is not None and FRAME_KEY_RE.match(key):
+            scan_start = datetime.strptime(key, '%Y%m%d_%H%M%S').replace(tzinfo=timezone.utc)
+            data = self.archive.load(band, scan_start)
+            if data is not None:
+                data = np.nan_to_num(data)  # El buffer guarda los recortes sin NaN
+        return data
+
+    def frame_indices(self, band, key):
+        with self._lock:
+            indices = self._indices.get((band, key))
+            if indices is not None:
+                self._indices.move_to_end((band, key))
+                return indices
+
+        data = self._load(band, key)
+        if data is None:
+            return None
+        vmin, vmax = BAND_CLASSES[band_class(band)]
+        indices = quantize(np.asarray(data, dtype=np.float32), vmin, vmax)
+
+        with self._lock:
+            self._remember(self._indices, (band, key), indices, self.max_cached_frames)
+        return indices
+
+    def render_frame(self, band, palette, key):
+        """PNG de un cuadro del buffer o del archivo, o None si ya no está"""
+        indices = self.frame_indices(band, key)
+        if indices is None:
+            return None
+        return encode_image(get_lut(palette)[indices])
+
+    def render_animation(self, band, palette, frames, fmt='WEBP'):
+        """WebP animado o APNG con los cuadros indicados (del más viejo al más nuevo)"""
+        keys = tuple(frame["key"] for frame in frames)
+        cache_key = (band, palette, fmt.upper(), keys)
+        with self._lock:
+            data = self._animations.get(cache_key)
+            if data is not None:
+                self._animations.move_to_end(cache_key)
+                return data
+
+        lut = get_lut(palette)
+        rgba_frames = []
+        for key in keys:
+            indices = self.frame_indices(band, key)
+            if indices is not None:
+                rgba_frames.append(lut[indices])
+        if not rgba_frames:
+            return None
+        # Todos los cuadros deben tener la misma grilla (cambia solo si cambia la proyección)
+        shape = rgba_frames[-1].shape
+        rgba_frames = [rgba for rgba in rgba_frames if rgba.shape == shape]
+
+        data = encode_animation(rgba_frames, fmt=fmt)
+        with self._lock:
+            self._remember(self._animations, cache_key, data, self.max_cached_animations)
+        return data
@@ -0,0 +1,203 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from src.config import Config
+from src.services.goes_batch import derived_inputs, find_scan_keys, render_scan_batch
+from src.services.goes_render import DERIVED_PRODUCTS
+from src.services.goes_service import (
+    VALID_PALETTES,
+    get_cache_key,
+    get_published_image,
+    legend_registry,
+    parse_scan_start,
+    publish_image,
+    scan_lock,
+)
+from src.services.worker_status import StatusFile
+
+# Estado publicado por el proceso que corre la ingesta (uno por servidor)
+status_file = StatusFile(os.path.join(Config.BACKGROUND_STATUS_DIR, 'goes_ingest_status.json'))
+
+
+class GoesIngestWorker:
+    """
+    Worker de ingesta GOES-19 que corre junto a la app.
+    Un hilo consulta S3 por escaneos nuevos y los encola; otro hilo procesa cada
+    escaneo como un lote (todas las bandas, productos derivados y paletas, con una
+    sola lectura por banda) y lo publica, de modo que /api/satellite-image solo
+    sirve imágenes ya generadas.
+    """
+
+    def __init__(self, bands, palettes, poll_seconds=120, products=(), decode_workers=None):
+        self.bands = list(bands)
+        self.products = [p for p in products if p in DERIVED_PRODUCTS]
+        self.palettes = [p for p in palettes if p in VALID_PALETTES] or ['inferno']
+        self.poll_seconds = poll_seconds
+        self.decode_workers = decode_workers or None
+        # Bandas a leer: las publicadas más las que usan los productos derivados
+        self.input_bands = self.bands + [b for b in derived_inputs(self.products) if b not in self.bands]
+
+        self._queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+        # Último escaneo encolado/publicado por banda o producto (para no re-renderizar)
+        self._queued_keys = {}
+        self._published_keys = {}
+
+        # Métricas expuestas en /api/satellite-ingest/status
+        self._last_scan_start = {}
+        self._last_success_at = {}
+        self._last_render_seconds = {}
+        self._last_error = None
+        self._renders_ok = 0
+        self._renders_failed = 0
+
+    def start(self):
+        if self._threads:
+            return
+        for target, name in ((self._poll_loop, 'goes-ingest-poll'), (self._render_loop, 'goes-ingest-render')):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print(f"🛰️ Worker de ingesta GOES iniciado: bandas={self.bands}, productos={self.products}, paletas={self.palettes}")
+
+    def stop(self):
+        self._stop_event.set()
+        self._queue.put(None)
+
+    def _target_key(self, target, keys):
+        """Clave S3 que identifica el escaneo de una banda o producto derivado"""
+        if target in DERIVED_PRODUCTS:
+            # El producto solo existe cuando todas sus bandas publicaron el escaneo
+            if any(band not in keys for band in DERIVED_PRODUCTS[target]):
+                return None
+            return keys[DERIVED_PRODUCTS[target][0]]
+        return keys.get(target)
+
+    def _poll_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                keys = find_scan_keys(self.input_bands)
+            except Exception as e:
+                keys = {}
+                self._last_error = f"Error al listar escaneos: {e}"
+                print(f"❌ {self._last_error}")
+
+            with self._lock:
+                pending = []
+                for target in self.bands + self.products:
+                    file_key = self._target_key(target, keys)
+                    if file_key and self._queued_keys.get(target) != file_key:
+                        self._queued_keys[target] = file_key
+                        pending.append(target)
+            if pending:
+                self._queue.put((keys, pending))
+            status_file.publish(self.status())
+
+            self._stop_event.wait(self.poll_seconds)
+
+    def _render_loop(self):
+        try:
+            legend_registry.warm_up(self.palettes, self.bands + self.products)
+        except Exception as e:
+            print(f"⚠️ No se pudieron pre-generar las leyendas: {e}")
+        while not self._stop_event.is_set():
+            job = self._queue.get()
+            if job is None:
+                break
+
+            keys, targets = job
+            reference_key = next(iter(keys.values()))
+            scan_start = parse_scan_start(reference_key)
+
+            started = time.perf_counter()
+            try:
+                # Con varios workers de gunicorn, solo uno renderiza cada escaneo
+                with scan_lock(f'lock_ingest_scan_{get_cache_key(reference_key)}'):
+                    pending = [
+                        target for target in targets
+                        if any(
+                            (get_published_image(target, palette) or {}).get("scan_key") != self._target_key(target, keys)
+                            for palette in self.palettes
+                        )
+                    ]
+                    if pending:
+                        outputs, _ = render_scan_batch(
+                            keys, self.palettes,
+                            products=[t for t in pending if t in DERIVED_PRODUCTS],
+                            render_bands=[t for t in pending if t not in DERIVED_PRODUCTS],
+                            max_workers=self.decode_workers,
+                        )
+                        for target, images in outputs.items():
+                            for palette, image_path in images.items():
+                                publish_image(target, palette, image_path, self._target_key(target, keys))
+            except Exception as e:
+                with self._lock:
+                    self._renders_failed += 1
+                    self._last_error = f"Error al renderizar el escaneo {get_cache_key(reference_key)}: {e}"
+                    # Permitir que el próximo poll vuelva a encolar el escaneo
+                    for target in targets:
+                        if self._queued_keys.get(target) == self._target_key(target, keys):
+                            self._queued_keys.pop(target)
+                print(f"❌ {self._last_error}")
+                status_file.publish(self.status())
+                continue
+
+            elapsed = round(time.perf_counter() - started, 3)
+            with self._lock:
+                self._renders_ok += 1
+                for target in targets:
+                    self._published_keys[target] = self._target_key(target, keys)
+                    self._last_scan_start[target] = scan_start
+                    self._last_success_at[target] = datetime.now(timezone.utc)
+                    self._last_render_seconds[target] = elapsed
+            status_file.publish(self.status())
+
+    def status(self):
+        """Estado del worker para detectar si la ingesta se está atrasando"""
+        with self._lock:
+            return {
+                "running": any(t.is_alive() for t in self._threads),
+                "queue_depth": self._queue.qsize(),
+                "poll_seconds": self.poll_seconds,
+                "renders_ok": self._renders_ok,
+                "renders_failed": self._renders_failed,
+                "last_error": self._last_error,
+                "bands": {
+                    band: {
+                        "scan_key": self._published_keys.get(band),
+                        "last_scan_start": self._last_scan_start[band].isoformat() if self._last_scan_start.get(band) else None,
+                        "last_success_at": self._last_success_at[band].isoformat() if band in self._last_success_at else None,
+                        "last_render_seconds": self._last_render_seconds.get(band),
+                    }
+                    for band in self.bands + self.products
+                },
+            }
+
+
+_worker = None
+
+def start_ingest_worker(config):
+    """Inicia (una sola vez por proceso) el worker de ingesta con la configuración de la app"""
+    global _worker
+    if _worker is None:
+        _worker = GoesIngestWorker(
+            bands=config['GOES_BANDS'],
+            palettes=config['GOES_PALETTES'],
+            poll_seconds=config['GOES_POLL_SECONDS'],
+            products=config['GOES_DERIVED_PRODUCTS'],
+            decode_workers=config['GOES_DECODE_WORKERS'],
+        )
+        _worker.start()
+    return _worker
+
+def get_ingest_status():
+    """Estado de la ingesta: el del worker de este proceso o el publicado por el que la corre"""
+    if _worker is None:
+        return status_file.read()
+    return dict(_worker.status(), pid=os.getpid())
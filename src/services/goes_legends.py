@@ -0,0 +1,84 @@
+import hashlib
+import io
+import os
+import threading
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from src.services.goes_render import BAND_CLASSES, band_class, write_atomic
+
+# Las leyendas tienen nombre por hash de contenido: se pueden cachear para siempre
+LEGEND_MAX_AGE = 365 * 24 * 3600
+
+
+def _format_tick(value, cls):
+    if cls == 'ir':
+        return f'{value:.0f}°C'
+    if cls == 'btd':
+        return f'{value:.0f} K'
+    return f'{value:.2f}'
+
+
+def render_legend_png(palette, cls):
+    """Renderiza la barra de colores horizontal de la paleta para la clase de banda"""
+    vmin, vmax = BAND_CLASSES[cls]
+
+    fig_legend = Figure(figsize=(6, 1), dpi=100)
+    FigureCanvasAgg(fig_legend)
+    ax_legend = fig_legend.add_subplot(111)
+
+    gradient = np.linspace(vmin, vmax, 256)
+    gradient = np.vstack((gradient, gradient))
+
+    ax_legend.imshow(gradient, aspect='auto', cmap=palette)
+    ax_legend.set_xticks([0, 64, 128, 192, 255])
+    ax_legend.set_xticklabels([
+        _format_tick(vmin + (vmax - vmin) * fraction, cls)
+        for fraction in (0, 0.25, 0.5, 0.75, 1)
+    ])
+    ax_legend.set_yticks([])
+
+    buffer = io.BytesIO()
+    fig_legend.savefig(buffer, format='png', bbox_inches='tight', pad_inches=0)
+    return buffer.getvalue()
+
+
+class LegendRegistry:
+    """
+    Registro de leyendas estáticas: cada (paleta, clase de banda) se renderiza una sola
+    vez por proceso y se guarda como legend_<paleta>_<clase>_<hash>.png en la carpeta.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, palette, band):
+        """Devuelve {"filename", "path"} de la leyenda para la paleta y la banda"""
+        key = (palette, band_class(band))
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                data = render_legend_png(*key)
+                digest = hashlib.sha256(data).hexdigest()[:16]
+                filename = f"legend_{key[0]}_{key[1]}_{digest}.png"
+                path = os.path.join(self.folder, filename)
+                if not os.path.exists(path):
+                    os.makedirs(self.folder, exist_ok=True)
+                    write_atomic(path, data)
+                entry = {"filename": filename, "path": path}
+                self._entries[key] = entry
+        return entry
+
+    def warm_up(self, palettes, bands):
+        """Genera por adelantado las leyendas de las paletas y bandas configuradas"""
+        for palette in palettes:
+            for band in bands:
+                self.get(palette, band)
@@ -0,0 +1,172 @@
+import io
+from collections import OrderedDict
+
+import h5py
+import numpy as np
+
+# Tamaño de bloque para las lecturas pequeñas de h5py (metadatos HDF5, B-trees, chunks)
+DEFAULT_BLOCK_SIZE = 256 * 1024
+MAX_CACHED_BLOCKS = 64
+
+
+class S3RangeFile(io.RawIOBase):
+    """
+    Archivo de solo lectura sobre un objeto S3 que usa GETs con Range.
+    h5py lo abre como un archivo local y solo se descargan los bytes que realmente lee.
+    """
+
+    def __init__(self, s3, bucket, key, block_size=DEFAULT_BLOCK_SIZE, max_blocks=MAX_CACHED_BLOCKS):
+        super().__init__()
+        self._s3 = s3
+        self._bucket = bucket
+        self._key = key
+        self._block_size = block_size
+        self._max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._pos = 0
+
+        self.size = s3.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.bytes_fetched = 0
+        self.requests = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        elif whence == io.SEEK_END:
+            self._pos = self.size + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        return self._pos
+
+    def _fetch(self, start, end):
+        """Descarga los bytes [start, end) con un único GET"""
+        response = self._s3.get_object(Bucket=self._bucket, Key=self._key, Range=f"bytes={start}-{end - 1}")
+        data = response['Body'].read()
+        self.requests += 1
+        self.bytes_fetched += len(data)
+        return data
+
+    def _get_block(self, index):
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        start = index * self._block_size
+        block = self._fetch(start, min(start + self._block_size, self.size))
+        self._blocks[index] = block
+        if len(self._blocks) > self._max_blocks:
+            self._blocks.popitem(last=False)
+        return block
+
+    def readinto(self, b):
+        if self._pos >= self.size:
+            return 0
+        out = memoryview(b).cast('B')
+        n = min(len(out), self.size - self._pos)
+
+        # Lecturas grandes (chunks de datos): un GET directo, sin pasar por la caché de bloques
+        if n > self._block_size:
+            out[:n] = self._fetch(self._pos, self._pos + n)
+            self._pos += n
+            return n
+
+        written = 0
+        while written < n:
+            position = self._pos + written
+            index, offset = divmod(position, self._block_size)
+            chunk = self._get_block(index)[offset:offset + n - written]
+            out[written:written + len(chunk)] = chunk
+            written += len(chunk)
+
+        self._pos += written
+        return written
+
+
+def _attr(obj, name, default=None):
+    """Atributo escalar de una variable netCDF4 leída con h5py"""
+    if name not in obj.attrs:
+        return default
+    value = obj.attrs[name]
+    if isinstance(value, bytes):
+        return value.decode()
+    value = np.asarray(value).ravel()
+    return value[0].item() if value.size else default
+
+
+def _decode(variable, raw):
+    """Aplica _Unsigned, _FillValue, scale_factor y add_offset igual que xarray"""
+    raw = np.asarray(raw)
+    fill_value = _attr(variable, '_FillValue')
+
+    if str(_attr(variable, '_Unsigned', 'false')).lower() == 'true' and raw.dtype.kind == 'i':
+        unsigned = raw.dtype.str.replace('i', 'u')
+        if fill_value is not None:
+            fill_value = np.array(fill_value, dtype=raw.dtype).view(unsigned).item()
+        raw = raw.view(unsigned)
+
+    data = raw.astype(np.float32)
+    if fill_value is not None:
+        data[raw == fill_value] = np.nan
+    data *= _attr(variable, 'scale_factor', 1.0)
+    data += _attr(variable, 'add_offset', 0.0)
+    return data
+
+
+def read_cmi_regions(s3, bucket, file_key, bboxes, crop_index):
+    """
+    Lee directamente desde S3 solo las ventanas de CMI que cubren cada bbox, sin archivo
+    temporal. Las ventanas salen de crop_index, así que las coordenadas x/y solo se leen
+    la primera vez que aparece una combinación de proyección/grilla/bbox.
+    Devuelve ({nombre: recorte}, estadísticas de transferencia). Las estadísticas
+    incluyen "georef": la proyección, la escala de la grilla fija y la ventana de
+    cada recorte, para ubicar cada píxel sin volver a leer x/y.
+    """
+    with S3RangeFile(s3, bucket, file_key) as remote:
+        with h5py.File(remote, 'r') as h5:
+            proj_info = h5['goes_imager_projection']
+            h_sat = float(_attr(proj_info, 'perspective_point_height'))
+            lon_cen = float(_attr(proj_info, 'longitude_of_projection_origin'))
+            cmi = h5['CMI']
+
+            def load_coordinates():
+                return _decode(h5['x'], h5['x'][:]), _decode(h5['y'], h5['y'][:])
+
+            windows = crop_index.get_windows(h_sat, lon_cen, cmi.shape, bboxes, load_coordinates)
+            grid = {
+                "h_sat": h_sat,
+                "lon_cen": lon_cen,
+                "x_scale": float(_attr(h5['x'], 'scale_factor', 1.0)),
+                "x_offset": float(_attr(h5['x'], 'add_offset', 0.0)),
+                "y_scale": float(_attr(h5['y'], 'scale_factor', 1.0)),
+                "y_offset": float(_attr(h5['y'], 'add_offset', 0.0)),
+            }
+            recortes = {
+                name: _decode(cmi, cmi[row0:row1, col0:col1])
+                for name, (row0, row1, col0, col1) in windows.items()
+            }
+
+        stats = {
+            "object_bytes": remote.size,
+            "bytes_fetched": remote.bytes_fetched,
+            "requests": remote.requests,
+            "georef": {name: dict(grid, window=list(window)) for name, window in windows.items()},
+        }
+    return recortes, stats
+
+
+def read_cmi_crop(s3, bucket, file_key, bbox, crop_index):
+    """Lee la ventana de CMI de un único bbox. Devuelve (recorte, estadísticas)."""
+    recortes, stats = read_cmi_regions(s3, bucket, file_key, {"crop": bbox}, crop_index)
+    stats["georef"] = stats["georef"]["crop"]
+    return recortes["crop"], stats
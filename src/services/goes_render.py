@@ -0,0 +1,135 @@
+import io
+import os
+import threading
+import uuid
+
+import numpy as np
+from PIL import Image
+
+# Tamaño del lado mayor de la imagen; equivale a la figura de 5x5 pulgadas a 100 dpi
+OUTPUT_SIZE = 500
+LUT_SIZE = 256
+
+# Rango de valores por clase de banda: infrarrojas en °C, visibles/NIR en reflectancia,
+# diferencias de temperatura de brillo en K
+BAND_CLASSES = {
+    'ir': (-80, 40),
+    'vis': (0, 1),
+    'btd': (-40, 10),
+}
+
+BAND_UNITS = {
+    'ir': '°C',
+    'vis': 'reflectancia',
+    'btd': 'K',
+}
+
+# Productos derivados: id (se usa como "banda" en archivos, catálogo y manifiestos) ->
+# (banda_a, banda_b) para la diferencia a - b. C13 - C08 (ventana IR - vapor de agua)
+# se acerca a 0 o es positiva en topes convectivos profundos (posible granizo).
+DERIVED_PRODUCTS = {
+    1308: (13, 8),
+}
+
+_luts = {}
+_luts_lock = threading.Lock()
+
+
+def band_class(band):
+    """Clase de banda: las bandas 7 a 16 son infrarrojas (temperatura de brillo)"""
+    if band in DERIVED_PRODUCTS:
+        return 'btd'
+    return 'ir' if band >= 7 else 'vis'
+
+
+def get_lut(palette):
+    """
+    Tabla RGBA de 256 entradas (uint8) para la paleta. Se construye una sola vez por
+    paleta a partir del colormap de matplotlib, así los colores son idénticos.
+    """
+    lut = _luts.get(palette)
+    if lut is None:
+        with _luts_lock:
+            lut = _luts.get(palette)
+            if lut is None:
+                import matplotlib
+                cmap = matplotlib.colormaps[palette].resampled(LUT_SIZE)
+                lut = cmap(np.arange(LUT_SIZE), bytes=True)
+                _luts[palette] = lut
+    return lut
+
+
+def quantize(data, vmin, vmax):
+    """
+    Índices de la LUT (uint8) del recorte normalizado a [vmin, vmax], con el mismo criterio
+    que matplotlib (floor(norm * 256), valores fuera de rango al primer/último color).
+    """
+    scale = LUT_SIZE / (vmax - vmin)
+    return np.clip((data - vmin) * scale, 0, LUT_SIZE - 1).astype(np.uint8)
+
+
+def colorize(data, palette, vmin, vmax):
+    """Normaliza el recorte a [vmin, vmax] y lo mapea por la LUT de la paleta"""
+    return get_lut(palette)[quantize(data, vmin, vmax)]
+
+
+def _output_shape(height, width, size):
+    """Mismo encuadre que imshow(aspect='equal') + bbox_inches='tight' en una figura cuadrada"""
+    if height >= width:
+        return size, max(1, round(size * width / height))
+    return max(1, round(size * height / width)), size
+
+
+def _to_image(rgba, size):
+    """Imagen Pillow escalada (vecino más cercano) al tamaño de salida"""
+    image = Image.fromarray(rgba)
+    out_height, out_width = _output_shape(rgba.shape[0], rgba.shape[1], size)
+    if (out_height, out_width) != rgba.shape[:2]:
+        image = image.resize((out_width, out_height), Image.NEAREST)
+    return image
+
+
+def encode_image(rgba, fmt='PNG', size=OUTPUT_SIZE):
+    """Escala (vecino más cercano) y codifica la imagen RGBA directamente con Pillow"""
+    image = _to_image(rgba, size)
+
+    buffer = io.BytesIO()
+    if fmt.upper() == 'WEBP':
+        image.save(buffer, format='WEBP', lossless=True)
+    else:
+        image.save(buffer, format='PNG', optimize=False, compress_level=6)
+    return buffer.getvalue()
+
+
+def encode_animation(frames, fmt='WEBP', size=OUTPUT_SIZE, duration_ms=400):
+    """
+    Codifica una secuencia de cuadros RGBA como WebP animado o APNG (loop infinito).
+    El último cuadro se mantiene el triple de tiempo para marcar el final del loop.
+    """
+    images = [_to_image(rgba, size) for rgba in frames]
+    durations = [duration_ms] * len(images)
+    durations[-1] = duration_ms * 3
+
+    buffer = io.BytesIO()
+    if fmt.upper() == 'WEBP':
+        # Con muchos cuadros el WebP con pérdida es mucho más chico; method=4 equilibra tiempo/tamaño
+        images[0].save(buffer, format='WEBP', save_all=True, append_images=images[1:],
+                       duration=durations, loop=0, quality=80, method=4)
+    else:
+        images[0].save(buffer, format='PNG', save_all=True, append_images=images[1:],
+                       duration=durations, loop=0, compress_level=6)
+    return buffer.getvalue()
+
+
+def write_atomic(path, data):
+    """Escribe en un temporal y lo publica con os.replace (atómico)"""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def render_image(data, palette, vmin, vmax, path, fmt='PNG'):
+    """Renderiza el recorte con la paleta y lo guarda de forma atómica en path"""
+    write_atomic(path, encode_image(colorize(data, palette, vmin, vmax), fmt=fmt))
+    return path
@@ -0,0 +1,184 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import boto3
+from botocore import UNSIGNED
+from botocore.config import Config
+
+# OR_ABI-L2-CMIPF-M6C13_G19_s20252911200210_e..._c....nc
+SCAN_KEY_RE = re.compile(r'-M\d+C(\d{2})_G\d+_s(\d{14})_')
+
+# Una hora de S3 se considera completa cuando pasó este margen desde su fin
+HOUR_COMPLETE_MARGIN = timedelta(minutes=15)
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Cliente S3 anónimo compartido por todo el proceso (los clientes de boto3 son
+    thread-safe): la cadena de credenciales, el endpoint y el pool de conexiones
+    se resuelven una sola vez.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                _s3_client = boto3.client('s3', config=Config(
+                    signature_version=UNSIGNED,
+                    max_pool_connections=32,
+                    retries={'max_attempts': 3, 'mode': 'standard'},
+                ))
+    return _s3_client
+
+
+def parse_scan_start(file_key):
+    """Extrae el inicio del escaneo (UTC) desde la clave S3: ..._sYYYYJJJHHMMSSs_..."""
+    match = SCAN_KEY_RE.search(file_key)
+    if not match:
+        return None
+    return datetime.strptime(match.group(2)[:13], "%Y%j%H%M%S").replace(tzinfo=timezone.utc)
+
+
+class ScanIndex:
+    """
+    Índice en memoria de los escaneos GOES publicados en S3: (banda, inicio) -> clave.
+    Cada prefijo horario se lista con paginación y las horas ya cerradas no se vuelven a
+    listar. Dentro de una hora S3 ordena las claves por canal y después por hora, así que
+    un único StartAfter por hora saltearía los escaneos nuevos de los canales menores:
+    la primera vez la hora se lista completa, y después cada banda consultada se lista
+    de forma incremental con su propio prefijo (..._G19_s) y StartAfter con su última
+    clave. La consulta "último escaneo de la banda X" es O(1). bands registra de entrada
+    las bandas a seguir; el resto se registra con su primera consulta.
+    """
+
+    def __init__(self, bucket, product, lookback_hours=4, ttl_seconds=60, client_factory=get_s3_client, bands=()):
+        self.bucket = bucket
+        self.product = product
+        self.lookback_hours = lookback_hours
+        self.ttl_seconds = ttl_seconds
+        self._client_factory = client_factory
+
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._prefixes = {}                # prefijo -> {"hour", "listed", "groups", "complete"}
+        self._scans = defaultdict(dict)    # banda -> {inicio: clave}
+        self._latest = {}                  # banda -> (inicio, clave)
+        self._tracked = set(bands)         # bandas consultadas (se listan de forma incremental)
+        self._refreshed_at = None
+
+        self.list_calls = 0
+
+    def hour_prefix(self, hour):
+        return f"{self.product}/{hour.year}/{hour.timetuple().tm_yday:03d}/{hour.hour:02d}/"
+
+    def _is_stale(self):
+        return self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.ttl_seconds
+
+    def _add(self, key, state):
+        match = SCAN_KEY_RE.search(key)
+        if not match:
+            return
+        band = int(match.group(1))
+        scan_start = parse_scan_start(key)
+        # Prefijo de la banda dentro de la hora (hasta "_s") y su última clave vista
+        state["groups"][band] = (key[:match.start(2)], key)
+        with self._lock:
+            self._scans[band][scan_start] = key
+            latest = self._latest.get(band)
+            if latest is None or scan_start > latest[0]:
+                self._latest[band] = (scan_start, key)
+
+    def _list(self, paginator, state, **kwargs):
+        for page in paginator.paginate(Bucket=self.bucket, **kwargs):
+            self.list_calls += 1
+            for obj in page.get('Contents', []):
+                self._add(obj['Key'], state)
+
+    def _track(self, band):
+        """
+        Registra una banda para el listado incremental. Las horas ya cerradas se vuelven
+        a abrir una vez para traer los escaneos de la banda publicados después de su
+        último listado.
+        """
+        if band in self._tracked:
+            return False
+        with self._refresh_lock:
+            self._tracked.add(band)
+            for state in self._prefixes.values():
+                state["complete"] = False
+        return True
+
+    def _prune(self, now):
+        """Descarta prefijos y escaneos fuera de la ventana de búsqueda"""
+        oldest_hour = (now - timedelta(hours=self.lookback_hours - 1)).replace(minute=0, second=0, microsecond=0)
+        for prefix in [p for p, state in self._prefixes.items() if state["hour"] < oldest_hour]:
+            del self._prefixes[prefix]
+
+        with self._lock:
+            for band, scans in self._scans.items():
+                for scan_start in [s for s in scans if s < oldest_hour]:
+                    del scans[scan_start]
+                if band in self._latest and self._latest[band][0] < oldest_hour:
+                    if scans:
+                        newest = max(scans)
+                        self._latest[band] = (newest, scans[newest])
+                    else:
+                        del self._latest[band]
+
+    def refresh(self, now=None, force=False):
+        """Lista solo lo nuevo de cada prefijo horario abierto dentro de la ventana"""
+        with self._refresh_lock:
+            if not force and not self._is_stale():
+                return
+            now = now or datetime.now(timezone.utc)
+            s3 = self._client_factory()
+            paginator = s3.get_paginator('list_objects_v2')
+
+            for i in range(self.lookback_hours):
+                hour = (now - timedelta(hours=i)).replace(minute=0, second=0, microsecond=0)
+                prefix = self.hour_prefix(hour)
+                state = self._prefixes.setdefault(prefix, {"hour": hour, "listed": False, "groups": {}, "complete": False})
+                if state["complete"]:
+                    continue
+
+                # Hora nueva o con una banda consultada que todavía no apareció: listado completo
+                if not state["listed"] or any(band not in state["groups"] for band in self._tracked):
+                    self._list(paginator, state, Prefix=prefix)
+                    state["listed"] = True
+                else:
+                    for band in sorted(self._tracked):
+                        group_prefix, last_key = state["groups"][band]
+                        self._list(paginator, state, Prefix=group_prefix, StartAfter=last_key)
+
+                if now >= hour + timedelta(hours=1) + HOUR_COMPLETE_MARGIN:
+                    state["complete"] = True
+
+            self._prune(now)
+            self._refreshed_at = time.monotonic()
+
+    def latest(self, band):
+        """Clave S3 del último escaneo de la banda (refresca el índice si venció el TTL)"""
+        if self._track(band):
+            self.refresh(force=True)
+        elif self._is_stale():
+            self.refresh()
+        with self._lock:
+            latest = self._latest.get(band)
+        return latest[1] if latest else None
+
+    def scans(self, band, since=None):
+        """Lista ordenada de (inicio, clave) de la banda dentro de la ventana"""
+        if self._track(band):
+            self.refresh(force=True)
+        elif self._is_stale():
+            self.refresh()
+        with self._lock:
+            items = sorted(self._scans.get(band, {}).items())
+        if since is not None:
+            items = [(start, key) for start, key in items if start >= since]
+        return items
@@ -1,275 +1,381 @@
-import boto3
-from botocore import UNSIGNED
-from botocore.config import Config
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 import os
-import xarray as xr
-from pyproj import Proj
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import numpy as np
-import time
 import uuid
 import hashlib
-import glob
+import json
+from src.services.single_flight import SingleFlight, FileLock
+from src.services.goes_scans import ScanIndex, get_s3_client, parse_scan_start
+from src.services.goes_remote import read_cmi_crop, read_cmi_regions
+from src.services.goes_crop_index import CropIndexCache, MENDOZA_BBOX, REGIONS
+from src.services.goes_render import BAND_CLASSES, BAND_UNITS, band_class, render_image
+from src.services.goes_legends import LegendRegistry
+from src.services.goes_catalog import IMAGE_FILENAME_RE, ImageCatalog
+from src.services.goes_archive import CropArchive
+from src.services.goes_frames import FrameAnimator, FrameStore
+from src.services.goes_tiles import TileRenderer
+from src.services.goes_eviction import wake_eviction_worker
 
 BUCKET_NAME = 'noaa-goes19'
 PRODUCT_NAME = 'ABI-L2-CMIPF'
 STATIC_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'radar_images'))
 
-# Configuración de caché y limpieza
-CACHE_DURATION_MINUTES = 30  # Tiempo de caché en minutos
-MAX_IMAGES_PER_CONFIG = 4    # Máximo de imágenes por configuración (banda+paleta)
-MAX_AGE_HOURS = 24          # Edad máxima de imágenes (horas)
-CLEANUP_PROBABILITY = 0.1   # Probabilidad de ejecutar limpieza (10%)
+# Configuración de caché
+LISTING_TTL_SECONDS = 60  # Cuánto se reutiliza el último listado de S3 antes de buscar un escaneo nuevo
+# La retención y el presupuesto de disco los maneja goes_eviction (ver Config.GOES_*)
 
-def cleanup_old_images():
-    """Limpia imágenes antiguas para evitar saturación del servidor"""
+# Índice en memoria de las imágenes renderizadas (evita listar la carpeta en cada request)
+image_catalog = ImageCatalog(STATIC_FOLDER)
+
+def get_cache_key(file_key):
+    """Clave de caché: inicio del escaneo GOES (UTC) tomado de la clave S3, no la hora del servidor"""
+    scan_start = parse_scan_start(file_key)
+    if scan_start is None:
+        return os.path.splitext(os.path.basename(file_key))[0]
+    return scan_start.strftime('%Y%m%d_%H%M%S')
+
+def image_file_path(band, palette, cache_key):
+    """Ruta de la imagen renderizada de un escaneo (exista o no)"""
+    return os.path.join(STATIC_FOLDER, f'latest_band_{band}_{palette}_{cache_key}.png')
+
+def get_cached_image(band, palette, cache_key):
+    """Busca en el catálogo la imagen ya renderizada de ese escaneo (los escaneos no cambian)"""
+    entry = image_catalog.get(band, palette, cache_key)
+    return entry["path"] if entry else None
+
+VALID_PALETTES = {
+    'inferno': 'inferno',
+    'viridis': 'viridis',
+    'plasma': 'plasma',
+    'gray': 'gray'
+}
+
+# Una sola generación por (banda, paleta, escaneo) aunque lleguen muchas requests a la vez
+_single_flight = SingleFlight()
+
+# Ventanas de recorte precalculadas por proyección/grilla/bbox (persisten entre reinicios)
+crop_index = CropIndexCache(os.path.join(STATIC_FOLDER, 'crop_index.json'))
+
+# Índice de escaneos disponibles en S3 (listado incremental, cacheado por LISTING_TTL_SECONDS)
+scan_index = ScanIndex(BUCKET_NAME, PRODUCT_NAME, lookback_hours=4, ttl_seconds=LISTING_TTL_SECONDS)
+
+# Buffer circular de los últimos recortes por banda para las animaciones
+ANIMATION_MAX_FRAMES = 48  # 8 horas a un escaneo cada 10 minutos
+frame_store = FrameStore(os.path.join(STATIC_FOLDER, 'frames'), capacity=ANIMATION_MAX_FRAMES)
+
+# Archivo de recortes escalados por banda y escaneo (re-render de paletas, animaciones históricas)
+ARCHIVE_RETENTION_DAYS = 30
+ARCHIVE_BUDGET_MB = 1024  # Todas las bandas; pasado el presupuesto se borran los escaneos más viejos
+crop_archive = CropArchive(os.path.join(STATIC_FOLDER, 'archive'), retention_days=ARCHIVE_RETENTION_DAYS,
+                           max_bytes=ARCHIVE_BUDGET_MB * 1024 * 1024)
+frame_animator = FrameAnimator(frame_store, archive=crop_archive)
+
+# Tiles XYZ (Web Mercator) generados a pedido desde el mismo buffer de cuadros
+tile_renderer = TileRenderer(frame_animator)
+
+# Leyendas estáticas por paleta y clase de banda, servidas en /api/satellite-legend/
+legend_registry = LegendRegistry(os.path.join(STATIC_FOLDER, 'legends'))
+
+def read_region_crops(s3, file_key, region_names=None):
+    """
+    Recortes de CMI (sin escalar a °C) para las regiones con nombre de REGIONS
+    (provincia y departamentos). Por defecto devuelve todas.
+    """
+    names = region_names or list(REGIONS)
+    unknown = [name for name in names if name not in REGIONS]
+    if unknown:
+        raise ValueError(f"Regiones desconocidas: {', '.join(unknown)}")
+    recortes, _ = read_cmi_regions(s3, BUCKET_NAME, file_key, {name: REGIONS[name] for name in names}, crop_index)
+    return recortes
+
+def read_scan_crop(s3, file_key):
+    """
+    Recorte de Mendoza de CMI (sin escalar a °C) leído con GETs por rango.
+    Devuelve (recorte, georef) con la ubicación del recorte en la grilla fija.
+    """
+    # Solo se descargan (con GETs por rango) los chunks de CMI que cubren el recorte
+    print(f"🛰️ Leyendo recorte de: {file_key}")
+    recorte, stats = read_cmi_crop(s3, BUCKET_NAME, file_key, MENDOZA_BBOX, crop_index)
+    print(f"📦 Transferidos {stats['bytes_fetched'] / 1e6:.1f} MB de {stats['object_bytes'] / 1e6:.1f} MB en {stats['requests']} GETs")
+    return recorte, stats["georef"]
+
+def render_crop(band, recorte, palettes, cache_key, georef=None):
+    """
+    Escala un recorte recién leído, lo guarda en el archivo y en el buffer de animación
+    y lo renderiza para cada paleta. band puede ser una banda ABI o un producto
+    derivado (ver DERIVED_PRODUCTS). Devuelve {paleta: ruta_imagen}.
+    """
+    if band_class(band) == 'ir':
+        recorte = recorte - 273.15
+
+    # El recorte escalado se archiva (con NaN) para no volver a descargar el escaneo
     try:
-        # Buscar en todas las posibles rutas
-        possible_paths = [
-            os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'radar_images')),
-            os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'radar_images')),
-            os.path.abspath(os.path.join(os.path.dirname(__file__), 'static', 'radar_images')),
-        ]
-        
-        total_deleted = 0
-        
-        for path_dir in possible_paths:
-            if os.path.exists(path_dir):
-                # Obtener todos los archivos PNG
-                png_files = glob.glob(os.path.join(path_dir, "*.png"))
-                
-                if not png_files:
-                    continue
-                
-                # Agrupar por configuración (banda + paleta)
-                config_groups = {}
-                for file_path in png_files:
-                    filename = os.path.basename(file_path)
-                    # Extraer banda y paleta del nombre: latest_band_13_inferno_...
-                    parts = filename.split('_')
-                    if len(parts) >= 4 and parts[0] == 'latest':
-                        band = parts[2]
-                        palette = parts[3]
-                        config_key = f"{band}_{palette}"
-                        
-                        if config_key not in config_groups:
-                            config_groups[config_key] = []
-                        
-                        config_groups[config_key].append({
-                            'path': file_path,
-                            'mtime': os.path.getmtime(file_path)
-                        })
-                
-                # Para cada configuración, mantener solo las más recientes
-                for config_key, files in config_groups.items():
-                    # Ordenar por fecha (más reciente primero)
-                    files.sort(key=lambda x: x['mtime'], reverse=True)
-                    
-                    # Eliminar las más antiguas si exceden el límite
-                    if len(files) > MAX_IMAGES_PER_CONFIG:
-                        for file_info in files[MAX_IMAGES_PER_CONFIG:]:
-                            try:
-                                os.remove(file_info['path'])
-                                total_deleted += 1
-                                print(f"🗑️ Eliminada: {os.path.basename(file_info['path'])}")
-                            except Exception as e:
-                                print(f"⚠️ Error al eliminar {file_info['path']}: {e}")
-                
-                # Eliminar imágenes muy antiguas (más de MAX_AGE_HOURS)
-                now = time.time()
-                max_age_seconds = MAX_AGE_HOURS * 3600
-                
-                for file_path in png_files:
-                    if now - os.path.getmtime(file_path) > max_age_seconds:
-                        try:
-                            os.remove(file_path)
-                            total_deleted += 1
-                            print(f"🗑️ Eliminada por edad: {os.path.basename(file_path)}")
-                        except Exception as e:
-                            print(f"⚠️ Error al eliminar {file_path} por edad: {e}")
-        
-        if total_deleted > 0:
-            print(f"✅ Limpieza completada: {total_deleted} imágenes eliminadas")
-        
+        crop_archive.append(band, _scan_start_from_key(cache_key), recorte, georef=georef,
+                            units=BAND_UNITS[band_class(band)])
     except Exception as e:
-        print(f"❌ Error en limpieza: {e}")
-
-def get_cache_key(band, palette):
-    """Genera una clave de caché única"""
-    now = datetime.utcnow()
-    rounded_time = now.replace(
-        minute=(now.minute // CACHE_DURATION_MINUTES) * CACHE_DURATION_MINUTES,
-        second=0,
-        microsecond=0
-    )
-    time_str = rounded_time.strftime("%Y%m%d_%H%M")
-    return f"{band}_{palette}_{time_str}"
-
-def get_cached_image(cache_key):
-    """Busca una imagen en caché válida"""
-    possible_paths = [
-        os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'radar_images')),
-        os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'static', 'radar_images')),
-        os.path.abspath(os.path.join(os.path.dirname(__file__), 'static', 'radar_images')),
-    ]
-    
-    for path_dir in possible_paths:
-        if os.path.exists(path_dir):
-            for filename in os.listdir(path_dir):
-                if cache_key in filename:
-                    image_path = os.path.join(path_dir, filename)
-                    legend_path = os.path.join(path_dir, filename.replace('latest_band', 'legend'))
-                    
-                    if os.path.exists(image_path) and os.path.exists(legend_path):
-                        # Verificar si aún es válida
-                        file_time = datetime.fromtimestamp(os.path.getmtime(image_path))
-                        if datetime.utcnow() - file_time < timedelta(minutes=CACHE_DURATION_MINUTES):
-                            return image_path, legend_path
-    
-    return None, None
-
-def get_latest_goes_image_url(band: int, palette: str = 'inferno', force_refresh: bool = False):
-    """Obtiene la imagen más reciente de GOES-19 con sistema de caché y limpieza"""
+        print(f"⚠️ No se pudo archivar el recorte: {e}")
+
+    # Cada escaneo agrega un cuadro al buffer de animación (no se re-renderiza el loop)
     try:
-        # Validar paleta
-        VALID_PALETTES = {
-            'inferno': 'inferno',
-            'viridis': 'viridis',
-            'plasma': 'plasma',
-            'gray': 'gray'
+        frame_store.append(band, cache_key, np.nan_to_num(recorte), georef=georef)
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar el cuadro de animación: {e}")
+
+    return render_scaled(band, recorte, palettes, cache_key)
+
+def render_scaled(band, recorte, palettes, cache_key):
+    """Renderiza un recorte ya escalado (°C, reflectancia o K) para cada paleta"""
+    os.makedirs(STATIC_FOLDER, exist_ok=True)
+    vmin, vmax = BAND_CLASSES[band_class(band)]
+    recorte_limpio = np.nan_to_num(np.asarray(recorte, dtype=np.float32))
+
+    outputs = {}
+    for palette in palettes:
+        output_png_path = image_file_path(band, palette, cache_key)
+
+        # Generar imagen principal (LUT + Pillow, sin matplotlib)
+        render_image(recorte_limpio, VALID_PALETTES[palette], vmin, vmax, output_png_path)
+        image_catalog.add(band, palette, cache_key, output_png_path)
+
+        print(f"✅ Generada: {os.path.basename(output_png_path)}")
+        outputs[palette] = output_png_path
+
+    # La eviction corre en su propio hilo; solo se le avisa que hay archivos nuevos
+    wake_eviction_worker()
+    return outputs
+
+def _scan_start_from_key(cache_key):
+    return datetime.strptime(cache_key, '%Y%m%d_%H%M%S').replace(tzinfo=timezone.utc)
+
+def render_from_archive(band, palettes, cache_key):
+    """
+    Renderiza las paletas desde el recorte archivado, sin tocar S3.
+    Devuelve {paleta: ruta_imagen}, o None si el escaneo no está archivado.
+    """
+    try:
+        recorte = crop_archive.load(band, _scan_start_from_key(cache_key))
+    except ValueError:
+        return None
+    if recorte is None:
+        return None
+    print(f"🗄️ Re-render desde el archivo local: banda {band}, escaneo {cache_key}")
+    return render_scaled(band, recorte, palettes, cache_key)
+
+def render_scan(s3, file_key, band, palettes):
+    """
+    Lee el recorte de Mendoza de un escaneo y renderiza la imagen para cada paleta.
+    Las leyendas no dependen del escaneo: salen de legend_registry.
+    Devuelve {paleta: ruta_imagen}.
+    """
+    recorte, georef = read_scan_crop(s3, file_key)
+    return render_crop(band, recorte, palettes, get_cache_key(file_key), georef=georef)
+
+def legend_url(palette, band):
+    """URL estable (con hash de contenido) de la leyenda de la paleta para la banda"""
+    return f"/api/satellite-legend/{legend_registry.get(VALID_PALETTES[palette], band)['filename']}"
+
+def _manifest_path(band, palette):
+    return os.path.join(STATIC_FOLDER, f'published_band_{band}_{palette}.json')
+
+def publish_image(band, palette, image_path, file_key):
+    """
+    Publica atómicamente la imagen renderizada como la más reciente para banda+paleta.
+    El manifiesto es compartido por todos los procesos del servidor.
+    """
+    scan_start = parse_scan_start(file_key)
+    manifest = {
+        "url": f"/static/radar_images/{os.path.basename(image_path)}",
+        "legend_url": legend_url(palette, band),
+        "scan_key": file_key,
+        "scan_start": scan_start.isoformat() if scan_start else None,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    path = _manifest_path(band, palette)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+    return manifest
+
+def get_published_image(band, palette):
+    """Devuelve el manifiesto publicado por el worker de ingesta, o None si aún no existe"""
+    try:
+        with open(_manifest_path(band, palette)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def scan_lock(name):
+    """Lock de archivo en STATIC_FOLDER compartido por todos los workers del servidor"""
+    os.makedirs(STATIC_FOLDER, exist_ok=True)
+    return FileLock(os.path.join(STATIC_FOLDER, f'{name}.lock'))
+
+def _published_for_scan(band, palette, file_key):
+    """Manifiesto publicado para este escaneo exacto si sus archivos siguen en disco"""
+    published = get_published_image(band, palette)
+    if not published or published.get("scan_key") != file_key:
+        return None
+    if not image_catalog.contains(os.path.join(STATIC_FOLDER, os.path.basename(published["url"]))):
+        return None
+    return published
+
+def _generate_image(s3, file_key, band, palette, force_refresh):
+    """
+    Genera y publica la imagen de un escaneo. Se ejecuta dentro del single-flight del
+    proceso y de un lock de archivo, así que otro worker puede haberla generado antes.
+    """
+    with scan_lock(f'lock_band_{band}_{palette}_{get_cache_key(file_key)}'):
+        if not force_refresh:
+            published = _published_for_scan(band, palette, file_key)
+            if published:
+                return published
+
+        # Cambiar de paleta no requiere volver a descargar: se usa el recorte archivado
+        outputs = None if force_refresh else render_from_archive(band, [palette], get_cache_key(file_key))
+        if outputs is None:
+            outputs = render_scan(s3, file_key, band, [palette])
+        return publish_image(band, palette, outputs[palette], file_key)
+
+def _regions_path(band):
+    return os.path.join(STATIC_FOLDER, f'regions_band_{band}.json')
+
+def _summarize_region(band, recorte):
+    """Mínimo, media y máximo del recorte en las unidades de la banda, ignorando NaN"""
+    if band_class(band) == 'ir':
+        recorte = recorte - 273.15
+    valid = recorte[np.isfinite(recorte)]
+    if valid.size == 0:
+        return {"min": None, "mean": None, "max": None, "valid_fraction": 0.0}
+    return {
+        "min": round(float(valid.min()), 2),
+        "mean": round(float(valid.mean()), 2),
+        "max": round(float(valid.max()), 2),
+        "valid_fraction": round(valid.size / recorte.size, 3),
+    }
+
+def _generate_region_summary(s3, file_key, band):
+    """Resume todas las regiones de un escaneo y lo publica (un worker por escaneo)"""
+    with scan_lock(f'lock_regions_{band}_{get_cache_key(file_key)}'):
+        path = _regions_path(band)
+        try:
+            with open(path) as f:
+                summary = json.load(f)
+            if summary.get("scan_key") == file_key:
+                return summary
+        except (FileNotFoundError, ValueError):
+            pass
+
+        recortes = read_region_crops(s3, file_key)
+        scan_start = parse_scan_start(file_key)
+        summary = {
+            "band": band,
+            "units": BAND_UNITS[band_class(band)],
+            "scan_key": file_key,
+            "scan_start": scan_start.isoformat() if scan_start else None,
+            "regions": {name: _summarize_region(band, recorte) for name, recorte in recortes.items()},
         }
-        
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(summary, f)
+        os.replace(tmp_path, path)
+        return summary
+
+def get_region_summary(band, region_names=None):
+    """
+    Estadísticas por región (provincia y cada departamento) del escaneo más reciente de
+    una banda ABI (1 a 16). Las ventanas de todas las regiones salen de una sola pasada
+    por crop_index; el resumen se calcula una vez por escaneo y se comparte entre procesos.
+    region_names debe contener solo nombres de REGIONS.
+    """
+    try:
+        file_key = scan_index.latest(band)
+        if not file_key:
+            return {"error": "No se encontraron imágenes satelitales recientes."}
+
+        s3 = get_s3_client()
+        summary = _single_flight.do(
+            ('regions', band, file_key),
+            lambda: _generate_region_summary(s3, file_key, band)
+        )
+        if region_names:
+            summary = dict(summary, regions={name: summary["regions"][name] for name in region_names})
+        return summary
+
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return {"error": f"Error al resumir las regiones: {str(e)}"}
+
+def get_image_path(result):
+    """Ruta en disco de la imagen devuelta por get_latest_goes_image_url, o None si ya no existe"""
+    path = os.path.join(STATIC_FOLDER, os.path.basename(result["url"]))
+    return path if image_catalog.contains(path) else None
+
+def get_scan_id(result):
+    """Identificador estable del escaneo: la clave de caché con la que se guardó la imagen"""
+    if result.get("scan_start"):
+        return datetime.fromisoformat(result["scan_start"]).strftime('%Y%m%d_%H%M%S')
+    match = IMAGE_FILENAME_RE.match(os.path.basename(result["url"]))
+    return match.group(3) if match else os.path.splitext(os.path.basename(result["url"]))[0]
+
+def get_scan_image_path(band, palette, scan_id):
+    """Ruta de la imagen de un escaneo puntual (el de ?scan=), o None si no existe o ya se eliminó"""
+    if not scan_id or os.path.basename(scan_id) != scan_id or palette not in VALID_PALETTES:
+        return None
+    path = image_file_path(band, palette, scan_id)
+    return path if image_catalog.contains(path) else None
+
+def _image_response(manifest, cached):
+    return {
+        "url": manifest["url"],
+        "legend_url": manifest["legend_url"],
+        "timestamp": manifest["timestamp"],
+        "scan_start": manifest["scan_start"],
+        "cached": cached
+    }
+
+def get_latest_goes_image_url(band: int, palette: str = 'inferno', force_refresh: bool = False, allow_render: bool = True):
+    """
+    Obtiene la imagen más reciente de GOES-19.
+    Con allow_render=False solo sirve lo publicado por el worker de ingesta. Si no, usa el
+    listado cacheado de S3 para saber si hay un escaneo nuevo y renderiza exactamente
+    una vez por escaneo.
+    """
+    try:
+        # Validar paleta
         if palette not in VALID_PALETTES:
             palette = 'inferno'
-        
-        cmap_name = VALID_PALETTES[palette]
-        
-        # Generar clave de caché
-        cache_key = get_cache_key(band, palette)
-        
-        # Verificar caché si no se fuerza actualización
-        if not force_refresh:
-            cached_image, cached_legend = get_cached_image(cache_key)
-            if cached_image and cached_legend:
-                print(f"✅ Usando imagen en caché: {os.path.basename(cached_image)}")
-                return {
-                    "url": cached_image,
-                    "legend_url": cached_legend,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "cached": True
-                }
-        
-        # Ejecutar limpieza probabilísticamente (no en cada solicitud)
-        if hash(str(time.time())) % 10 == 0:  # 10% de probabilidad
-            cleanup_old_images()
-        
-        # Generar nueva imagen
-        os.makedirs(STATIC_FOLDER, exist_ok=True)
-
-        s3 = boto3.client('s3', config=Config(signature_version=UNSIGNED))
-        now_utc = datetime.now(timezone.utc)
-        
-        file_key = None
-        for i in range(4):
-            search_time = now_utc - timedelta(hours=i)
-            prefix = f"{PRODUCT_NAME}/{search_time.year}/{search_time.timetuple().tm_yday:03d}/{search_time.hour:02d}/"
-            
-            response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=prefix)
-            
-            if 'Contents' in response:
-                band_str = f'C{band:02d}'
-                for file in reversed(response['Contents']):
-                    if band_str in file['Key']:
-                        file_key = file['Key']
-                        break
-            if file_key:
-                break
 
+        published = None if force_refresh else get_published_image(band, palette)
+
+        if not allow_render:
+            if published:
+                return _image_response(published, cached=True)
+            return {"error": "La imagen satelital todavía no fue procesada por el worker de ingesta."}
+
+        s3 = get_s3_client()
+        file_key = scan_index.latest(band)
         if not file_key:
+            if published:
+                return _image_response(published, cached=True)
             return {"error": "No se encontraron imágenes satelitales recientes."}
 
-        unique_id = str(uuid.uuid4())
-        local_nc_path = os.path.join(STATIC_FOLDER, f'temp_goes_image_{unique_id}.nc')
-        
-        # Usar clave de caché en el nombre del archivo
-        output_png_path = os.path.join(STATIC_FOLDER, f'latest_band_{band}_{palette}_{cache_key}.png')
-        output_legend_path = os.path.join(STATIC_FOLDER, f'legend_{palette}_{cache_key}.png')
-
-        print(f"🛰️ Descargando: {file_key}")
-        s3.download_file(BUCKET_NAME, file_key, local_nc_path)
-
-        with xr.open_dataset(local_nc_path) as ds:
-            # ... (código de procesamiento de imagen igual que antes) ...
-            proj_info = ds.goes_imager_projection
-            h_sat, lon_cen = proj_info.perspective_point_height, proj_info.longitude_of_projection_origin
-            p = Proj(proj='geos', h=h_sat, lon_0=lon_cen)
-            x1, y1 = p(-70.5, -37.5)
-            x2, y2 = p(-66.5, -32.0)
-            
-            ds['x'] = ds['x'] * h_sat
-            ds['y'] = ds['y'] * h_sat
-            
-            recorte = ds.sel(x=slice(x1, x2), y=slice(y2, y1))['CMI'].values
-
-            if band >= 7:
-                recorte = recorte - 273.15
-                vmin, vmax = -80, 40
-            else:
-                vmin, vmax = 0, 1
-
-            recorte_limpio = np.nan_to_num(recorte)
-
-            # Generar imagen principal
-            fig = plt.figure(figsize=(5, 5), dpi=100)
-            ax = fig.add_subplot(1, 1, 1)
-            im = ax.imshow(recorte_limpio, cmap=cmap_name, vmin=vmin, vmax=vmax)
-            ax.axis('off')
-            fig.tight_layout(pad=0)
-            plt.savefig(output_png_path, bbox_inches='tight', pad_inches=0, transparent=True)
-            plt.close(fig)
-
-            # Generar leyenda
-            fig_legend = plt.figure(figsize=(6, 1), dpi=100)
-            ax_legend = fig_legend.add_subplot(111)
-            
-            gradient = np.linspace(vmin, vmax, 256)
-            gradient = np.vstack((gradient, gradient))
-            
-            im_legend = ax_legend.imshow(gradient, aspect='auto', cmap=cmap_name)
-            ax_legend.set_xticks([0, 64, 128, 192, 255])
-            ax_legend.set_xticklabels([
-                f'{vmin:.0f}°C',
-                f'{vmin+(vmax-vmin)*0.25:.0f}°C',
-                f'{vmin+(vmax-vmin)*0.5:.0f}°C',
-                f'{vmin+(vmax-vmin)*0.75:.0f}°C',
-                f'{vmax:.0f}°C'
-            ])
-            ax_legend.set_yticks([])
-            
-            plt.savefig(output_legend_path, bbox_inches='tight', pad_inches=0)
-            plt.close(fig_legend)
-
-        try:
-            os.remove(local_nc_path)
-        except Exception as e:
-            print(f"Advertencia: no se pudo eliminar temporal: {e}")
+        # Verificar caché si no se fuerza actualización: el escaneo ya publicado o ya renderizado
+        if not force_refresh:
+            if published and _published_for_scan(band, palette, file_key):
+                return _image_response(published, cached=True)
 
-        relative_url = f"/static/radar_images/{os.path.basename(output_png_path)}"
-        relative_legend_url = f"/static/radar_images/{os.path.basename(output_legend_path)}"
-        
-        print(f"✅ Generada: {os.path.basename(output_png_path)}")
-        print(f"✅ Generada: {os.path.basename(output_legend_path)}")
+            cached_image = get_cached_image(band, palette, get_cache_key(file_key))
+            if cached_image:
+                print(f"✅ Usando imagen en caché: {os.path.basename(cached_image)}")
+                return _image_response(publish_image(band, palette, cached_image, file_key), cached=True)
 
-        return {
-            "url": relative_url,
-            "legend_url": relative_legend_url,
-            "timestamp": now_utc.isoformat(),
-            "cached": False
-        }
+        # Las requests concurrentes para el mismo escaneo esperan a una única generación
+        manifest = _single_flight.do(
+            (band, palette, file_key),
+            lambda: _generate_image(s3, file_key, band, palette, force_refresh)
+        )
+        return _image_response(manifest, cached=False)
 
     except Exception as e:
         print(f"❌ Error: {str(e)}")
-        return {"error": f"Error al procesar imagen satelital: {str(e)}"}
\ No newline at end of file
+        return {"error": f"Error al procesar imagen satelital: {str(e)}"}
@@ -0,0 +1,194 @@
+import io
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+from pyproj import Proj
+
+from src.services.goes_render import get_lut
+
+TILE_SIZE = 256
+MIN_ZOOM = 6
+MAX_ZOOM = 11
+# Hasta este zoom los tiles son pocos (la provincia entra en ~20 tiles a z8) y se
+# conservan en su propia caché; los más profundos compiten en un LRU aparte
+SHALLOW_MAX_ZOOM = 8
+
+
+def tile_lonlat(z, x, y, size=TILE_SIZE):
+    """Longitud/latitud (grados) del centro de cada píxel del tile XYZ en Web Mercator"""
+    world = size * 2 ** z
+    px = x * size + np.arange(size) + 0.5
+    py = y * size + np.arange(size) + 0.5
+    lon = px / world * 360.0 - 180.0
+    lat = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * py / world))))
+    return np.meshgrid(lon, lat)
+
+
+def tile_bounds(z, x, y):
+    """(lon_min, lat_min, lon_max, lat_max) del tile"""
+    n = 2 ** z
+    lon_min = x / n * 360.0 - 180.0
+    lon_max = (x + 1) / n * 360.0 - 180.0
+    lat_max = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    lat_min = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return lon_min, lat_min, lon_max, lat_max
+
+
+def crop_bounds(georef, shape):
+    """Bbox geográfico aproximado del recorte (esquinas de la ventana en la grilla fija)"""
+    p = Proj(proj='geos', h=georef["h_sat"], lon_0=georef["lon_cen"])
+    row0, _, col0, _ = georef["window"]
+    rows = np.array([row0, row0, row0 + shape[0], row0 + shape[0]])
+    cols = np.array([col0, col0 + shape[1], col0, col0 + shape[1]])
+    x = (cols * georef["x_scale"] + georef["x_offset"]) * georef["h_sat"]
+    y = (rows * georef["y_scale"] + georef["y_offset"]) * georef["h_sat"]
+    lon, lat = p(x, y, inverse=True)
+    return float(np.min(lon)), float(np.min(lat)), float(np.max(lon)), float(np.max(lat))
+
+
+def compute_tile_lookup(georef, shape, z, x, y):
+    """
+    Reproyección del tile: para cada píxel Web Mercator, el índice plano (fila * ancho +
+    columna) del píxel más cercano del recorte geoestacionario, o -1 fuera del recorte.
+    int32 ocupa 256 KB por tile. Depende solo de la grilla y la ventana, no del escaneo.
+    """
+    lon, lat = tile_lonlat(z, x, y)
+    p = Proj(proj='geos', h=georef["h_sat"], lon_0=georef["lon_cen"])
+    gx, gy = p(lon, lat)
+    gx = np.asarray(gx) / georef["h_sat"]
+    gy = np.asarray(gy) / georef["h_sat"]
+
+    row0, _, col0, _ = georef["window"]
+    with np.errstate(invalid='ignore'):
+        cols = np.rint((gx - georef["x_offset"]) / georef["x_scale"]) - col0
+        rows = np.rint((gy - georef["y_offset"]) / georef["y_scale"]) - row0
+        valid = np.isfinite(rows) & np.isfinite(cols)
+        valid &= (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+
+    flat = np.full(rows.shape, -1, dtype=np.int32)
+    flat[valid] = rows[valid].astype(np.int32) * shape[1] + cols[valid].astype(np.int32)
+    return flat
+
+
+class TileRenderer:
+    """
+    Tiles XYZ de 256 px (z6 a z11) generados a pedido desde el buffer de cuadros.
+    Las tablas de reproyección por tile se calculan una vez por grilla (sirven para
+    todos los escaneos) y el cuadro se cuantiza una vez por escaneo (FrameAnimator);
+    cada tile es solo una indexación + la LUT de la paleta. Los PNG quedan en dos LRU:
+    zooms bajos (pocos tiles, se piden en cada carga) y zooms profundos.
+    """
+
+    def __init__(self, animator, max_lookups=64, max_shallow_tiles=1024, max_deep_tiles=4096):
+        self.animator = animator
+        self.max_lookups = max_lookups
+        self.max_shallow_tiles = max_shallow_tiles
+        self.max_deep_tiles = max_deep_tiles
+
+        self._lock = threading.Lock()
+        self._lookups = OrderedDict()  # (grilla, z, x, y) -> índices planos (o None fuera del recorte)
+        self._shallow = OrderedDict()  # (banda, paleta, escaneo, z, x, y) -> PNG
+        self._deep = OrderedDict()
+        self._bounds = {}              # grilla -> bbox geográfico del recorte
+        self._blank = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _georef_key(georef, shape):
+        return (georef["h_sat"], georef["lon_cen"], georef["x_scale"], georef["x_offset"],
+                georef["y_scale"], georef["y_offset"], tuple(georef["window"]), tuple(shape))
+
+    def _cache_get(self, cache, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache, key, value, limit):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+
+    def blank_tile(self):
+        """Tile transparente para las zonas fuera del recorte"""
+        if self._blank is None:
+            buffer = io.BytesIO()
+            Image.new('RGBA', (TILE_SIZE, TILE_SIZE), (0, 0, 0, 0)).save(buffer, format='PNG')
+            self._blank = buffer.getvalue()
+        return self._blank
+
+    def lookup(self, georef, shape, z, x, y):
+        """Índices planos int32 del tile (-1 fuera del recorte), o None si el tile no toca el recorte"""
+        grid_key = self._georef_key(georef, shape)
+        key = (grid_key, z, x, y)
+        with self._lock:
+            if key in self._lookups:
+                self._lookups.move_to_end(key)
+                return self._lookups[key]
+
+        bounds = self._bounds.get(grid_key)
+        if bounds is None:
+            bounds = self._bounds[grid_key] = crop_bounds(georef, shape)
+        lon_min, lat_min, lon_max, lat_max = tile_bounds(z, x, y)
+        lookup = None
+        if not (lon_max < bounds[0] or lon_min > bounds[2] or lat_max < bounds[1] or lat_min > bounds[3]):
+            lookup = compute_tile_lookup(georef, shape, z, x, y)
+            if not (lookup >= 0).any():
+                lookup = None
+        self._cache_put(self._lookups, key, lookup, self.max_lookups)
+        return lookup
+
+    def render_tile(self, band, palette, scan, z, x, y):
+        """
+        PNG del tile, o None si el escaneo ya no está en el buffer.
+        Fuera del recorte devuelve el tile transparente.
+        """
+        cache = self._shallow if z <= SHALLOW_MAX_ZOOM else self._deep
+        limit = self.max_shallow_tiles if z <= SHALLOW_MAX_ZOOM else self.max_deep_tiles
+        cache_key = (band, palette, scan, z, x, y)
+
+        data = self._cache_get(cache, cache_key)
+        if data is not None:
+            self.hits += 1
+            return data
+        self.misses += 1
+
+        frame = self.animator.store.frame(band, scan)
+        if frame is None or not frame.get("georef"):
+            return None
+        shape = tuple(frame["shape"])
+
+        lookup = self.lookup(frame["georef"], shape, z, x, y)
+        if lookup is None:
+            data = self.blank_tile()
+        else:
+            indices = self.animator.frame_indices(band, scan)
+            if indices is None:
+                return None
+            invalid = lookup < 0
+            rgba = get_lut(palette)[indices.ravel()[np.where(invalid, 0, lookup)]]
+            rgba[invalid] = 0
+            buffer = io.BytesIO()
+            Image.fromarray(rgba).save(buffer, format='PNG', optimize=False, compress_level=6)
+            data = buffer.getvalue()
+
+        self._cache_put(cache, cache_key, data, limit)
+        return data
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "lookups": len(self._lookups),
+                "shallow_tiles": len(self._shallow),
+                "deep_tiles": len(self._deep),
+            }
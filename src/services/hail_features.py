@@ -0,0 +1,141 @@
+from datetime import date
+
+import numpy as np
+
+# Origen de cada feature
+DAILY = "daily"              # Primer (y único) valor diario del pronóstico de Open-Meteo
+HOURLY_MEAN = "hourly_mean"  # Promedio del día de una variable horaria
+POINT = "point"              # Coordenadas pedidas
+DATE = "date"                # Fecha local del pronóstico
+DERIVED = "derived"          # Calculada a partir de otras features
+
+# Esquema del modelo V3.1: (feature, origen, variable). El orden es el del scaler
+# (scaler.feature_names_in_, ver src/services/features_api.py) y define las columnas.
+FEATURE_SCHEMA = (
+    ("PRCP", DAILY, "precipitation_sum"),
+    ("SNWD", DAILY, "snowfall_sum"),
+    ("TAVG", DERIVED, "(TMAX + TMIN) / 2"),
+    ("TMAX", DAILY, "temperature_2m_max"),
+    ("TMIN", DAILY, "temperature_2m_min"),
+    ("latitude", POINT, "lat"),
+    ("longitude", POINT, "lon"),
+    ("om_weather_code", DAILY, "weather_code"),
+    ("om_rain_sum", DAILY, "rain_sum"),
+    ("om_snowfall_sum", DAILY, "snowfall_sum"),
+    ("om_precipitation_hours", DAILY, "precipitation_hours"),
+    ("om_wind_gusts_10m_max", DAILY, "wind_gusts_10m_max"),
+    ("om_wind_direction_10m_dominant", DAILY, "wind_direction_10m_dominant"),
+    ("om_shortwave_radiation_sum", DAILY, "shortwave_radiation_sum"),
+    ("om_et0_fao_evapotranspiration", DAILY, "et0_fao_evapotranspiration"),
+    ("om_dew_point_2m_mean", HOURLY_MEAN, "dew_point_2m"),
+    ("om_relative_humidity_2m_mean", HOURLY_MEAN, "relative_humidity_2m"),
+    ("om_pressure_msl_mean", HOURLY_MEAN, "pressure_msl"),
+    ("año", DATE, "year"),
+    ("mes", DATE, "month"),
+    ("dia_del_año", DATE, "day_of_year"),
+    ("rango_temp_diario", DERIVED, "TMAX - TMIN"),
+)
+
+FEATURE_ORDER = tuple(name for name, _, _ in FEATURE_SCHEMA)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_ORDER)}
+
+# Variables de Open-Meteo que se leen (sin repetir, en orden de aparición)
+DAILY_VARIABLES = tuple(dict.fromkeys(variable for _, source, variable in FEATURE_SCHEMA if source == DAILY))
+HOURLY_VARIABLES = tuple(dict.fromkeys(variable for _, source, variable in FEATURE_SCHEMA if source == HOURLY_MEAN))
+
+_MISSING = [None]  # Variable ausente en la respuesta: cuenta como dato faltante
+
+
+def _extract(responses):
+    """
+    Una sola pasada por las respuestas: primeros valores diarios (N x D), valores
+    horarios concatenados con la cantidad por respuesta y la fecha del pronóstico.
+    """
+    daily_rows = []
+    hourly_values = {variable: [] for variable in HOURLY_VARIABLES}
+    hourly_lengths = {variable: [] for variable in HOURLY_VARIABLES}
+    days = []
+    for response in responses:
+        if "error" in response:
+            raise ValueError(f"Error en los datos de Open-Meteo: {response['error']}")
+        daily = response.get("daily") or {}
+        hourly = response.get("hourly") or {}
+        daily_rows.append([(daily.get(variable) or _MISSING)[0] for variable in DAILY_VARIABLES])
+        for variable in HOURLY_VARIABLES:
+            values = hourly.get(variable) or _MISSING
+            hourly_values[variable].extend(values)
+            hourly_lengths[variable].append(len(values))
+        days.append((daily.get("time") or _MISSING)[0])
+    return daily_rows, hourly_values, hourly_lengths, days
+
+
+def _hourly_means(values, lengths):
+    """Promedio por respuesta de una variable horaria, ignorando los faltantes (NaN si no hay ninguno)"""
+    flat = np.array(values, dtype=np.float64)
+    valid = np.isfinite(flat)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sums = np.add.reduceat(np.where(valid, flat, 0.0), offsets)
+    counts = np.add.reduceat(valid.astype(np.int64), offsets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _date_columns(days, today=None):
+    """Año, mes y día del año de cada pronóstico (sin fecha se usa la de hoy)"""
+    today = (today or date.today()).isoformat()
+    dates = np.array([day or today for day in days], dtype='datetime64[D]')
+    years = dates.astype('datetime64[Y]')
+    return {
+        "year": years.astype(np.int64) + 1970,
+        "month": dates.astype('datetime64[M]').astype(np.int64) % 12 + 1,
+        "day_of_year": (dates - years).astype(np.int64) + 1,
+    }
+
+
+def build_matrix(responses, lats, lons, today=None):
+    """
+    Matriz contigua (N, 22) float32 en el orden de FEATURE_SCHEMA para N respuestas de
+    Open-Meteo y sus coordenadas. Los datos faltantes quedan en 0, como esperaba el
+    modelo desde la API original. Lanza ValueError si alguna respuesta es un error.
+    """
+    if len(responses) != len(lats) or len(responses) != len(lons):
+        raise ValueError("Se necesita una coordenada por respuesta")
+    matrix = np.zeros((len(responses), len(FEATURE_ORDER)), dtype=np.float32)
+    if not len(responses):
+        return matrix
+
+    daily_rows, hourly_values, hourly_lengths, days = _extract(responses)
+    daily = np.array(daily_rows, dtype=np.float64).reshape(len(responses), len(DAILY_VARIABLES))
+    daily_index = {variable: i for i, variable in enumerate(DAILY_VARIABLES)}
+    hourly = {variable: _hourly_means(hourly_values[variable], hourly_lengths[variable]) for variable in HOURLY_VARIABLES}
+    dates = _date_columns(days, today)
+    point = {"lat": np.asarray(lats, dtype=np.float64), "lon": np.asarray(lons, dtype=np.float64)}
+
+    for name, source, variable in FEATURE_SCHEMA:
+        column = FEATURE_INDEX[name]
+        if source == DAILY:
+            matrix[:, column] = daily[:, daily_index[variable]]
+        elif source == HOURLY_MEAN:
+            matrix[:, column] = hourly[variable]
+        elif source == POINT:
+            matrix[:, column] = point[variable]
+        elif source == DATE:
+            matrix[:, column] = dates[variable]
+
+    np.nan_to_num(matrix, copy=False)
+    # Derivadas (después de reemplazar los faltantes, como en la API original)
+    tmax = matrix[:, FEATURE_INDEX["TMAX"]]
+    tmin = matrix[:, FEATURE_INDEX["TMIN"]]
+    matrix[:, FEATURE_INDEX["TAVG"]] = (tmax + tmin) / 2
+    matrix[:, FEATURE_INDEX["rango_temp_diario"]] = tmax - tmin
+    return matrix
+
+
+def build_row(response, lat, lon, today=None):
+    """Fila (22,) de una sola respuesta: mismo código que el camino en lote"""
+    return build_matrix([response], [lat], [lon], today)[0]
+
+
+def row_to_dict(row):
+    """Fila -> {feature: valor}, el formato que espera la API de Hugging Face"""
+    return dict(zip(FEATURE_ORDER, (float(value) for value in row)))
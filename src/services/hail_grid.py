@@ -0,0 +1,296 @@
+import base64
+import io
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from src.config import Config
+from src.services.goes_crop_index import MENDOZA_BBOX
+from src.services.goes_render import get_lut, quantize
+from src.services.hail_features import build_matrix
+from src.services.hail_model import hail_model
+from src.services.meteo import DEPARTAMENTOS_PATH, get_weather_bulk
+from src.services.orchestration import prediction_batcher
+from src.services.single_flight import FileLock
+from src.services.worker_status import StatusFile
+
+GRID_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'hail_grid'))
+DEFAULT_GRID_PATH = os.path.join(GRID_FOLDER, 'mendoza.npz')
+DEFAULT_BBOX = MENDOZA_BBOX  # Mismo encuadre que las imágenes satelitales
+DEFAULT_PALETTE = 'inferno'
+
+# Estado publicado por el proceso que precalcula la grilla (uno por servidor)
+status_file = StatusFile(os.path.join(Config.BACKGROUND_STATUS_DIR, 'hail_grid_status.json'))
+
+
+def predict_points(lats, lons):
+    """
+    Probabilidad de granizo para cada punto: pronósticos pedidos en lote, una sola matriz
+    de features predicha en el micro-lote del modelo local (el mismo hilo que las
+    predicciones individuales). NaN donde no hubo pronóstico.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    responses = get_weather_bulk(list(zip(lats.tolist(), lons.tolist())))
+    ok = np.array(["error" not in r for r in responses], dtype=bool)
+
+    probabilities = np.full(len(responses), np.nan, dtype=np.float32)
+    if ok.any():
+        matrix = build_matrix([r for r, good in zip(responses, ok) if good], lats[ok], lons[ok])
+        # El plazo escala con la cantidad de tandas que ocupa la matriz en el modelo
+        batches = math.ceil(len(matrix) / prediction_batcher.max_batch)
+        probabilities[ok] = prediction_batcher.predict_many(matrix, timeout=Config.PREDICTION_TIMEOUT_SECONDS * batches)
+    return probabilities
+
+
+def grid_axes(bbox, resolution):
+    """Latitudes (de norte a sur) y longitudes (de oeste a este) de los centros de celda"""
+    lon_min, lat_min, lon_max, lat_max = bbox
+    nx = max(1, math.ceil(round((lon_max - lon_min) / resolution, 6)))
+    ny = max(1, math.ceil(round((lat_max - lat_min) / resolution, 6)))
+    lons = lon_min + (np.arange(nx) + 0.5) * resolution
+    lats = lat_max - (np.arange(ny) + 0.5) * resolution
+    return lats, lons
+
+
+_province_polygons = None
+_masks = {}
+_masks_lock = threading.Lock()
+
+
+def _load_province_polygons():
+    """Polígonos (lista de anillos [lon, lat]) de los departamentos de Mendoza"""
+    global _province_polygons
+    if _province_polygons is None:
+        polygons = []
+        try:
+            with open(DEPARTAMENTOS_PATH, encoding='utf-8') as f:
+                geojson = json.load(f)
+            for feature in geojson.get('features', []):
+                geometry = feature['geometry']
+                polygons.extend(geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ No se pudieron leer los departamentos para recortar la grilla: {e}")
+        _province_polygons = polygons
+    return _province_polygons
+
+
+def province_mask(bbox, resolution):
+    """
+    Celdas de la grilla dentro de la provincia (bool, filas x columnas). Los polígonos se
+    rasterizan una vez por bbox y resolución; sin el GeoJSON no se recorta nada.
+    """
+    key = (tuple(bbox), resolution)
+    with _masks_lock:
+        mask = _masks.get(key)
+    if mask is not None:
+        return mask
+
+    lats, lons = grid_axes(bbox, resolution)
+    polygons = _load_province_polygons()
+    if not polygons:
+        mask = np.ones((len(lats), len(lons)), dtype=bool)
+    else:
+        lon_min, _, _, lat_max = bbox
+        image = Image.new('1', (len(lons), len(lats)), 0)
+        draw = ImageDraw.Draw(image)
+        for polygon in polygons:
+            for i, ring in enumerate(polygon):
+                # Coordenadas de píxel con el centro de la celda en enteros; los huecos se borran
+                xy = [((point[0] - lon_min) / resolution - 0.5, (lat_max - point[1]) / resolution - 0.5) for point in ring]
+                fill = 0 if i else 1
+                draw.polygon(xy, fill=fill, outline=fill)
+        mask = np.array(image, dtype=bool)
+
+    with _masks_lock:
+        _masks[key] = mask
+    return mask
+
+
+def compute_grid(bbox, resolution, clip=True, max_points=None):
+    """
+    Grilla float32 (NaN fuera de la provincia o sin pronóstico) con sus metadatos.
+    max_points acota las celdas de un pedido (por defecto HAIL_GRID_MAX_POINTS); la
+    grilla precalculada de la provincia no tiene límite (max_points=0).
+    """
+    max_points = Config.HAIL_GRID_MAX_POINTS if max_points is None else max_points
+    lats, lons = grid_axes(bbox, resolution)
+    if max_points and len(lats) * len(lons) > max_points:
+        raise ValueError(f"La grilla tiene {len(lats) * len(lons)} celdas (máximo {max_points})")
+
+    mask = province_mask(bbox, resolution) if clip else np.ones((len(lats), len(lons)), dtype=bool)
+    rows, cols = np.nonzero(mask)
+    grid = np.full(mask.shape, np.nan, dtype=np.float32)
+    if len(rows):
+        grid[rows, cols] = predict_points(lats[rows], lons[cols])
+
+    return {
+        "bbox": [float(value) for value in bbox],
+        "resolution": float(resolution),
+        "grid": grid,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "model_version": hail_model.version,
+        "threshold": hail_model.threshold,
+    }
+
+
+def grid_to_json(result):
+    """Grilla compacta: float16 little-endian en base64, filas de norte a sur"""
+    grid = result["grid"]
+    valid = np.isfinite(grid)
+    meta = {key: value for key, value in result.items() if key != "grid"}
+    meta.update({
+        "shape": list(grid.shape),
+        "dtype": "float16",
+        "data": base64.b64encode(grid.astype('<f2').tobytes()).decode('ascii'),
+        "cells": int(valid.sum()),
+        "max_probability": round(float(grid[valid].max()), 4) if valid.any() else None,
+    })
+    return meta
+
+
+def grid_to_png(result, palette=DEFAULT_PALETTE):
+    """Heatmap RGBA de la grilla (un píxel por celda), transparente fuera de la provincia"""
+    grid = result["grid"]
+    rgba = get_lut(palette)[quantize(np.nan_to_num(grid), 0.0, 1.0)]
+    rgba[~np.isfinite(grid)] = 0
+    buffer = io.BytesIO()
+    Image.fromarray(rgba).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _save_default_grid(result):
+    os.makedirs(GRID_FOLDER, exist_ok=True)
+    meta = {key: value for key, value in result.items() if key != "grid"}
+    tmp_path = f"{DEFAULT_GRID_PATH}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, grid=result["grid"], meta=np.array(json.dumps(meta)))
+    os.replace(tmp_path, DEFAULT_GRID_PATH)
+
+
+_default_cache = {"mtime": None, "result": None}
+_default_lock = threading.Lock()
+
+
+def load_default_grid():
+    """Última grilla precalculada de la provincia (compartida entre workers por disco), o None"""
+    try:
+        mtime = os.path.getmtime(DEFAULT_GRID_PATH)
+    except OSError:
+        return None
+    with _default_lock:
+        if _default_cache["mtime"] == mtime:
+            return _default_cache["result"]
+    try:
+        with np.load(DEFAULT_GRID_PATH) as npz:
+            result = json.loads(str(npz["meta"]))
+            result["grid"] = npz["grid"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ No se pudo leer la grilla precalculada: {e}")
+        return None
+    with _default_lock:
+        _default_cache.update(mtime=mtime, result=result)
+    return result
+
+
+def _grid_age(result):
+    return time.time() - datetime.fromisoformat(result["generated_at"]).timestamp()
+
+
+def refresh_default_grid(max_age=None):
+    """
+    Recalcula la grilla de la provincia si la guardada tiene más de `max_age` segundos.
+    El lock de archivo evita que varios workers la calculen a la vez.
+    """
+    max_age = Config.HAIL_GRID_REFRESH_SECONDS if max_age is None else max_age
+    os.makedirs(GRID_FOLDER, exist_ok=True)
+    with FileLock(os.path.join(GRID_FOLDER, 'lock_hail_grid'), timeout=300, stale_after=600):
+        current = load_default_grid()
+        if current is not None and _grid_age(current) < max_age:
+            return current
+        started = time.perf_counter()
+        result = compute_grid(DEFAULT_BBOX, Config.HAIL_GRID_RESOLUTION, max_points=0)
+        _save_default_grid(result)
+        print(f"🧊 Grilla de granizo de la provincia actualizada en {time.perf_counter() - started:.1f}s")
+        return result
+
+
+def get_default_grid():
+    """
+    Grilla precalculada de la provincia. Nunca se calcula en la request: si está vencida
+    se devuelve igual (marcada como stale) y la actualiza el worker. Lanza RuntimeError
+    si todavía no hay ninguna.
+    """
+    result = load_default_grid()
+    if result is None:
+        raise RuntimeError("La grilla de granizo de la provincia todavía no se calculó, intentá de nuevo en unos minutos")
+    if _grid_age(result) >= 2 * Config.HAIL_GRID_REFRESH_SECONDS:
+        return dict(result, stale=True)
+    return result
+
+
+class HailGridWorker:
+    """Precalcula la grilla de la provincia en segundo plano para que el mapa cargue al instante"""
+
+    def __init__(self, interval_seconds=3600):
+        self.interval_seconds = interval_seconds
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.last_run_at = None
+        self.last_error = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='hail-grid', daemon=True)
+            self._thread.start()
+            status_file.publish(self.status())
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            try:
+                refresh_default_grid(self.interval_seconds)
+                self.runs += 1
+                self.last_run_at = datetime.now(timezone.utc).isoformat()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"❌ Error al precalcular la grilla de granizo: {e}")
+            status_file.publish(self.status())
+            self._stop_event.wait(self.interval_seconds)
+
+    def status(self):
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_error": self.last_error,
+        }
+
+
+_worker = None
+
+def start_hail_grid_worker(config):
+    """Inicia (una sola vez por proceso) el precálculo de la grilla de la provincia"""
+    global _worker
+    if _worker is None:
+        _worker = HailGridWorker(interval_seconds=config['HAIL_GRID_REFRESH_SECONDS'])
+        _worker.start()
+    return _worker
+
+def get_hail_grid_status():
+    """Estado del precálculo: el del worker de este proceso o el publicado por el que lo corre"""
+    if _worker is None:
+        return status_file.read()
+    return dict(_worker.status(), pid=os.getpid())
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import pickle
+import threading
+import warnings
+
+import cv2
+import numpy as np
+
+from src.config import Config
+from src.services.hail_features import FEATURE_ORDER
+
+# Entrada de imágenes del modelo: secuencia de recortes C13 de 64x64 (notebook 09)
+IMAGE_BAND = 13
+IMG_SIZE = 64
+MAX_SECUENCIA = 5
+PREDICT_CHUNK_ROWS = 256  # Filas por llamada al modelo
+
+
+def preprocess_frame(recorte):
+    """Igual que en el entrenamiento: resize a 64x64 y normalización min-max del recorte"""
+    recorte = cv2.resize(np.asarray(recorte, dtype=np.float32), (IMG_SIZE, IMG_SIZE))
+    with np.errstate(invalid='ignore'):
+        normalizado = (recorte - np.nanmin(recorte)) / (np.nanmax(recorte) - np.nanmin(recorte) + 1e-6)
+    return np.nan_to_num(normalizado)
+
+
+def artifact_version(path):
+    """Versión del artefacto: sha256 corto del archivo, o None si no existe"""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()[:12]
+
+
+def _signature(path):
+    """(fecha de modificación, tamaño) del archivo, o None si no existe"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class HailModel:
+    """
+    Modelo multimodal de granizo (V3.1) ejecutado dentro del proceso. El modelo Keras y
+    el scaler se cargan una sola vez y de forma perezosa (la primera predicción o el
+    warm-up al iniciar el servidor); TensorFlow se importa recién ahí para no demorar
+    el arranque de la app cuando se usa el backend remoto. Si el archivo del modelo
+    cambia en disco se recarga y cambia su versión.
+    """
+
+    def __init__(self, model_path, scaler_path, threshold=0.5):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.threshold = threshold
+
+        self._lock = threading.Lock()
+        self._loaded = None  # (scaler, modelo): se reemplazan juntos
+        self._signature = None
+        self.version = None
+        self.load_error = None
+        self._failed_signature = None  # No se reintenta la carga hasta que cambie el artefacto
+        self._file_version = None  # (firma, versión) del archivo en disco, sin cargar el modelo
+
+        # Secuencia de imágenes de los últimos escaneos (se rehace solo con un escaneo nuevo)
+        self._images_key = None
+        self._images = None
+        self._images_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._loaded is not None
+
+    def load(self):
+        """
+        Carga modelo y scaler si todavía no están cargados, o los recarga si el archivo
+        del modelo cambió. Lanza RuntimeError si no hay ningún modelo utilizable; si falla
+        una recarga se sigue usando la versión anterior.
+        """
+        signature = _signature(self.model_path)
+        if self._loaded is not None and signature == self._signature:
+            return
+        with self._lock:
+            if self._loaded is not None and signature == self._signature:
+                return
+            if self.load_error is not None and signature == self._failed_signature:
+                if self._loaded is not None:
+                    return
+                raise RuntimeError(f"No se pudo cargar el modelo de granizo: {self.load_error}")
+            try:
+                import keras
+
+                with open(self.scaler_path, 'rb') as f:
+                    scaler = pickle.load(f)
+                names = tuple(getattr(scaler, 'feature_names_in_', FEATURE_ORDER))
+                if names != FEATURE_ORDER:
+                    raise ValueError(f"El scaler espera otras features: {list(names)}")
+                model = keras.models.load_model(self.model_path, compile=False)
+            except Exception as e:
+                self.load_error = f"{type(e).__name__}: {e}"
+                self._failed_signature = signature
+                if self._loaded is not None:
+                    print(f"⚠️ No se pudo recargar el modelo de granizo, se mantiene la versión {self.version}: {e}")
+                    return
+                raise RuntimeError(f"No se pudo cargar el modelo de granizo: {self.load_error}") from e
+
+            self._loaded = (scaler, model)
+            self._signature = signature
+            self.version = artifact_version(self.model_path)
+            self.load_error = None
+            print(f"✅ Modelo de granizo cargado ({os.path.basename(self.model_path)}, versión {self.version})")
+
+    def current_version(self):
+        """Versión del modelo en uso (carga o recarga si hace falta)"""
+        self.load()
+        return self.version
+
+    def file_version(self):
+        """
+        Versión del artefacto en disco sin cargar el modelo (no importa TensorFlow): el
+        hash se recalcula solo cuando cambia la fecha o el tamaño del archivo.
+        """
+        signature = _signature(self.model_path)
+        if signature is None:
+            return None
+        cached = self._file_version
+        if cached is None or cached[0] != signature:
+            cached = self._file_version = (signature, artifact_version(self.model_path))
+        return cached[1]
+
+    def warm_up(self):
+        """Carga el modelo y corre una predicción de prueba (compila el grafo de TensorFlow)"""
+        try:
+            self.load()
+            self.predict(np.zeros((1, len(FEATURE_ORDER)), dtype=np.float32))
+            return True
+        except Exception as e:
+            print(f"⚠️ Warm-up del modelo de granizo falló: {e}")
+            return False
+
+    def image_sequence(self, frame_store):
+        """
+        Secuencia (64, 64, 5) con los últimos escaneos C13 del buffer de cuadros, del más
+        viejo al más nuevo y completada con ceros como en el entrenamiento. Sin cuadros
+        disponibles es toda ceros.
+        """
+        frames = frame_store.frames(IMAGE_BAND)[-MAX_SECUENCIA:]
+        key = tuple(frame["key"] for frame in frames)
+        with self._images_lock:
+            if key == self._images_key and self._images is not None:
+                return self._images
+
+            secuencia = []
+            for frame in frames:
+                recorte = frame_store.load(IMAGE_BAND, frame["key"])
+                if recorte is not None:
+                    secuencia.append(preprocess_frame(recorte))
+            while len(secuencia) < MAX_SECUENCIA:
+                secuencia.append(np.zeros((IMG_SIZE, IMG_SIZE), dtype=np.float32))
+            images = np.stack(secuencia[:MAX_SECUENCIA], axis=-1).astype(np.float32)
+
+            self._images_key, self._images = key, images
+            return images
+
+    def predict(self, matrix, images=None):
+        """
+        Probabilidades de granizo para una matriz (N, 22) de features sin escalar.
+        images es una secuencia (64, 64, 5) compartida por todas las filas o un arreglo
+        (N, 64, 64, 5); None usa imágenes en cero.
+        """
+        self.load()
+        scaler, model = self._loaded
+        matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+        with warnings.catch_warnings():
+            # El scaler se ajustó con un DataFrame: avisa al recibir un arreglo sin nombres
+            warnings.simplefilter('ignore', UserWarning)
+            scaled = scaler.transform(matrix).astype(np.float32)
+
+        if images is None:
+            images = np.zeros((IMG_SIZE, IMG_SIZE, MAX_SECUENCIA), dtype=np.float32)
+        images = np.asarray(images, dtype=np.float32)
+        if images.ndim == 3:
+            images = np.broadcast_to(images, (len(matrix),) + images.shape)
+
+        # Por tandas: con muchas filas (ej. la grilla de la provincia) las imágenes repetidas ocupan mucha memoria
+        probabilities = [
+            np.asarray(model.predict_on_batch([scaled[start:start + PREDICT_CHUNK_ROWS],
+                                                     images[start:start + PREDICT_CHUNK_ROWS]]), dtype=np.float32).reshape(-1)
+            for start in range(0, len(scaled), PREDICT_CHUNK_ROWS)
+        ]
+        return np.concatenate(probabilities) if probabilities else np.zeros(0, dtype=np.float32)
+
+    def to_response(self, probability):
+        """Mismo formato que devuelve la API de Hugging Face"""
+        return {
+            "probabilidad_granizo": round(float(probability), 4),
+            "alerta_sugerida": "Sí" if probability > self.threshold else "No",
+        }
+
+    def status(self):
+        return {
+            "loaded": self.loaded,
+            "model_path": self.model_path,
+            "version": self.version,
+            "threshold": self.threshold,
+            "load_error": self.load_error,
+        }
+
+
+# Modelo compartido por todo el proceso
+hail_model = HailModel(Config.HAIL_MODEL_PATH, Config.HAIL_SCALER_PATH, Config.HAIL_THRESHOLD)
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Configuración por servicio externo: timeout (conexión, lectura) en segundos y reintentos.
+# Los reintentos solo se aplican a métodos idempotentes (GET/HEAD/...), nunca a POST.
+UPSTREAMS = {
+    'open-meteo': {'timeout': (3.05, 8), 'retries': 2},
+    'ip-api': {'timeout': (3.05, 5), 'retries': 1},
+    'openweather': {'timeout': (3.05, 8), 'retries': 2},
+    'newsapi': {'timeout': (3.05, 10), 'retries': 1},
+    'huggingface': {'timeout': (5, 20), 'retries': 0},
+}
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+POOL_MAXSIZE = 16
+LATENCY_WINDOW = 200  # Cantidad de latencias recientes para el percentil 95
+
+
+class UpstreamClient:
+    """
+    Cliente HTTP de un servicio externo: una requests.Session propia con pool de
+    conexiones keep-alive por host, timeout por defecto, reintentos con backoff
+    exponencial y jitter para métodos idempotentes, y métricas de latencia y de
+    reutilización de conexiones.
+    """
+
+    def __init__(self, name, timeout=(3.05, 10), retries=2, pool_maxsize=POOL_MAXSIZE):
+        self.name = name
+        self.timeout = timeout
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=0.3,
+            backoff_jitter=0.3,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self._adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', self._adapter)
+        self.session.mount('http://', self._adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+
+    def request(self, method, url, **kwargs):
+        """Igual que requests.request, con el timeout del servicio si no se indica otro"""
+        kwargs.setdefault('timeout', self.timeout)
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self.requests += 1
+                self.errors += 1
+            raise
+
+        with self._lock:
+            self.requests += 1
+            if response.status_code >= 400:
+                self.errors += 1
+            self._latencies.append(time.perf_counter() - started)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _pool_counts(self):
+        """(conexiones nuevas, requests) acumuladas en los pools de urllib3 de este cliente"""
+        new_connections = 0
+        pool_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                new_connections += pool.num_connections
+                pool_requests += pool.num_requests
+        return new_connections, pool_requests
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            requests_count = self.requests
+            errors = self.errors
+        new_connections, pool_requests = self._pool_counts()
+        return {
+            "requests": requests_count,
+            "errors": errors,
+            "new_connections": new_connections,
+            # Requests (incluidos reintentos) que reutilizaron una conexión abierta
+            "reused_connections": max(0, pool_requests - new_connections),
+            "latency_ms_avg": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            "latency_ms_p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1) if latencies else None,
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(name):
+    """Cliente compartido por todo el proceso para el servicio externo `name`"""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                settings = UPSTREAMS.get(name, {})
+                client = UpstreamClient(name, timeout=settings.get('timeout', (3.05, 10)),
+                                        retries=settings.get('retries', 2))
+                _clients[name] = client
+    return client
+
+def get_http_stats():
+    """Métricas por servicio externo (solo de los clientes ya usados)"""
+    with _clients_lock:
+        clients = dict(_clients)
+    return {name: client.stats() for name, client in clients.items()}
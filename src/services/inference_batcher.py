@@ -0,0 +1,118 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """
+    Agrupa predicciones concurrentes en lotes: el primer pedido abre una ventana de
+    `max_wait_ms` y todo lo que llega mientras tanto (hasta `max_batch` filas) se apila
+    en una sola matriz y se resuelve con una única llamada a `predict_fn(matriz)`,
+    que devuelve un valor por fila. Cada pedido recibe su resultado en un Future; si
+    la llamada falla, el error llega a todos los pedidos del lote.
+    Un bloque de filas (submit_many) entra entero en un lote, aunque supere max_batch,
+    así las predicciones en lote (la grilla) usan el mismo hilo que las individuales.
+    """
+
+    def __init__(self, predict_fn, max_batch=32, max_wait_ms=5, name='inference-batcher'):
+        self.predict_fn = predict_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.name = name
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.batches = 0
+        self.rows = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+
+    def _ensure_worker(self):
+        """El hilo se inicia con el primer pedido (no al importar el módulo)"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+                    self._thread.start()
+
+    def submit(self, row):
+        """Encola una fila de features y devuelve un Future con su resultado"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(row)[np.newaxis], future, True))
+        return future
+
+    def submit_many(self, matrix):
+        """Encola un bloque de filas y devuelve un Future con el arreglo de resultados"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((np.asarray(matrix), future, False))
+        return future
+
+    def predict(self, row, timeout=None):
+        """Resultado de una fila (bloquea hasta que se procese su lote)"""
+        return self.submit(row).result(timeout=timeout)
+
+    def predict_many(self, matrix, timeout=None):
+        """Resultados de un bloque de filas (bloquea hasta que se procese su lote)"""
+        return self.submit_many(matrix).result(timeout=timeout)
+
+    def _collect(self):
+        """Espera el primer pedido y junta los que llegan dentro de la ventana"""
+        batch = [self._queue.get()]
+        rows = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+            rows += len(batch[-1][0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Los pedidos cancelados no ocupan lugar en la matriz
+            batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                results = self.predict_fn(np.concatenate([rows for rows, _, _ in batch]))
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            total = sum(len(rows) for rows, _, _ in batch)
+            with self._lock:
+                self.batches += 1
+                self.rows += total
+                self.max_batch_seen = max(self.max_batch_seen, total)
+            start = 0
+            for rows, future, single in batch:
+                chunk = results[start:start + len(rows)]
+                start += len(rows)
+                future.set_result(chunk[0] if single else chunk)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+                "batches": self.batches,
+                "rows": self.rows,
+                "errors": self.errors,
+                "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else None,
+                "max_batch_seen": self.max_batch_seen,
+                "queued": self._queue.qsize(),
+            }
@@ -0,0 +1,197 @@
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+from src.config import Config
+from src.services.http_client import get_client
+
+try:
+    import geoip2.database
+    import geoip2.errors
+except ImportError:  # Dependencia opcional: base GeoIP offline (MaxMind/DB-IP en formato .mmdb)
+    geoip2 = None
+
+IP_API_BASE = "http://ip-api.com/json/"
+
+
+def _parse_networks(values):
+    networks = []
+    for value in values:
+        value = value.strip()
+        if value:
+            networks.append(ipaddress.ip_network(value, strict=False))
+    return networks
+
+
+TRUSTED_PROXIES = _parse_networks(Config.TRUSTED_PROXIES)
+
+
+def _is_trusted(ip):
+    return any(ip.version == network.version and ip in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(remote_addr, forwarded_for=None):
+    """
+    IP real del cliente. X-Forwarded-For solo se tiene en cuenta si la conexión viene de
+    un proxy de confianza; se recorre de derecha a izquierda salteando los proxies de
+    confianza, así un cliente no puede falsificar su IP agregando valores al header.
+    """
+    try:
+        ip = _unmap(ipaddress.ip_address(remote_addr))
+    except (TypeError, ValueError):
+        return None
+    if not forwarded_for or not _is_trusted(ip):
+        return ip
+
+    for value in reversed(forwarded_for.split(',')):
+        try:
+            hop = _unmap(ipaddress.ip_address(value.strip()))
+        except ValueError:
+            break
+        ip = hop
+        if not _is_trusted(hop):
+            break
+    return ip
+
+
+def _unmap(ip):
+    """::ffff:a.b.c.d (IPv4 sobre un socket IPv6) se trata como la IPv4"""
+    if ip is not None and ip.version == 6 and ip.ipv4_mapped:
+        return ip.ipv4_mapped
+    return ip
+
+
+def ip_prefix(ip):
+    """Clave de caché: /24 para IPv4 y /48 para IPv6 (misma red, misma ubicación)"""
+    prefix = 24 if ip.version == 4 else 48
+    return str(ipaddress.ip_network(f"{ip}/{prefix}", strict=False))
+
+
+class IPLocationCache:
+    """LRU en memoria con TTL: prefijo de red -> ubicación"""
+
+    def __init__(self, max_entries=10000, ttl_seconds=86400):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # prefijo -> (vence, ubicación)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, location):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, location)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+location_cache = IPLocationCache(Config.IP_CACHE_SIZE, Config.IP_CACHE_TTL_SECONDS)
+
+_geoip_reader = None
+_geoip_failed = False
+_geoip_lock = threading.Lock()
+
+def _get_geoip_reader():
+    """Lector de la base GeoIP offline si está configurada e instalada, o None"""
+    global _geoip_reader, _geoip_failed
+    if _geoip_reader is None and not _geoip_failed and geoip2 is not None and Config.GEOIP_DB_PATH:
+        with _geoip_lock:
+            if _geoip_reader is None and not _geoip_failed:
+                try:
+                    _geoip_reader = geoip2.database.Reader(Config.GEOIP_DB_PATH)
+                except (OSError, ValueError) as e:
+                    print(f"⚠️ No se pudo abrir la base GeoIP {Config.GEOIP_DB_PATH}: {e}")
+                    _geoip_failed = True
+    return _geoip_reader
+
+
+def _default_location(ip):
+    location = dict(Config.DEFAULT_LOCATION)
+    location.update({"source": "default", "ip": str(ip) if ip else None})
+    return location
+
+
+def _lookup_geoip(ip):
+    reader = _get_geoip_reader()
+    if reader is None:
+        return None
+    try:
+        city = reader.city(str(ip))
+    except (geoip2.errors.AddressNotFoundError, ValueError):
+        return None
+    if city.location.latitude is None or city.location.longitude is None:
+        return None
+    return {
+        "source": "geoip",
+        "ip": str(ip),
+        "city": city.city.name,
+        "region": city.subdivisions.most_specific.name,
+        "country": city.country.name,
+        "lat": city.location.latitude,
+        "lon": city.location.longitude,
+    }
+
+
+def _lookup_ip_api(ip):
+    try:
+        response = get_client('ip-api').get(IP_API_BASE + (str(ip) if ip else ""))
+        response.raise_for_status()
+        j = response.json()
+    except (requests.RequestException, ValueError) as e:
+        return {"error": f"request error: {e}"}
+
+    # ip-api devuelve {"status":"fail", "message": "..."} cuando falla
+    if j.get("status") != "success":
+        return {"error": j.get("message") or "ip-api falló al geolocalizar"}
+    if j.get("lat") is None or j.get("lon") is None:
+        return {"error": "ip-api no devolvió coordenadas para la IP"}
+    return {
+        "source": "ip-api",
+        "ip": j.get("query"),
+        "city": j.get("city"),
+        "region": j.get("regionName"),
+        "country": j.get("country"),
+        "lat": j.get("lat"),
+        "lon": j.get("lon"),
+    }
+
+
+def locate_ip(ip):
+    """
+    Ubicación de una IP: las privadas/loopback van a la ubicación por defecto, después
+    la caché por prefijo, la base GeoIP offline (si hay) y por último ip-api.
+    Sin IP se geolocaliza la del servidor (comportamiento anterior).
+    """
+    if ip is not None and not ip.is_global:
+        return _default_location(ip)
+
+    key = ip_prefix(ip) if ip is not None else "server"
+    location = location_cache.get(key)
+    if location is not None:
+        return dict(location, ip=str(ip) if ip else location.get("ip"))
+
+    location = _lookup_geoip(ip) if ip is not None else None
+    if location is None:
+        location = _lookup_ip_api(ip)
+    if "error" not in location:
+        location_cache.set(key, location)
+    return location
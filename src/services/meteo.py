@@ -1,49 +1,170 @@
 # src/api/clima.py
 import requests  # Importa la librería requests para hacer peticiones HTTP
+import ipaddress
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from src.config import Config
+from src.services.http_client import get_client  # Sesiones HTTP compartidas (keep-alive, reintentos)
+from src.services.ip_location import locate_ip  # Geolocalización por IP con caché
+from src.services.sqlite_cache import shared_cache  # Caché SQLite compartida entre workers
 
 # URLs de las APIs que vamos a usar
 GEOCODE_URL = "https://geocoding-api.open-meteo.com/v1/search"  # API para convertir nombre de ciudad a coordenadas
 WEATHER_URL = "https://api.open-meteo.com/v1/forecast"  # API para obtener el pronóstico del tiempo
-IP_API_BASE = "http://ip-api.com/json/"  # API para obtener ubicación basada en dirección IP
 
-def _get_json(url, params=None, timeout=8):
+DEPARTAMENTOS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'raw', 'departamentos-mendoza.json'))
+
+FORECAST_NAMESPACE = "forecast"  # Namespace de los pronósticos en la caché compartida
+GEOCODE_NAMESPACE = "geocode"  # Namespace de la geocodificación en la caché compartida
+SEED_EXPIRES_AT = 2 ** 62  # Las entradas precargadas no vencen
+_geocode_seeded = False
+_geocode_seed_lock = threading.Lock()
+_revalidating = set()  # Celdas con una revalidación en curso en este proceso
+_revalidating_lock = threading.Lock()
+
+def _get_json(url, params=None, timeout=None, upstream='open-meteo'):
     """
     Función interna para hacer peticiones HTTP y obtener respuestas en formato JSON.
     Args:
         url: La URL a la que hacer la petición
         params: Parámetros para la consulta (opcional)
-        timeout: Tiempo máximo de espera en segundos (por defecto 8)
+        timeout: Tiempo máximo de espera en segundos (por defecto el del servicio)
+        upstream: Servicio externo, define el pool de conexiones y los reintentos
     Returns:
         Diccionario con la respuesta JSON o un diccionario de error si falla
     """
     try:
-        r = requests.get(url, params=params, timeout=timeout)  # Hace la petición GET
+        kwargs = {"timeout": timeout} if timeout else {}
+        r = get_client(upstream).get(url, params=params, **kwargs)  # Hace la petición GET
         r.raise_for_status()  # Lanza excepción si el status code es de error (4xx o 5xx)
         return r.json()  # Convierte la respuesta a formato JSON y la retorna
     except requests.RequestException as e:
         return {"error": f"request error: {e}"}  # Si hay error, retorna diccionario con mensaje de error
 
+def normalize_place_name(name):
+    """Nombre normalizado para la caché: sin acentos, en minúsculas y con espacios simples"""
+    name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode()
+    return re.sub(r'[\s_\-]+', ' ', name).strip().lower()
+
+def _polygon_centroid(ring):
+    """Centroide (por área) de un anillo de coordenadas [lon, lat]"""
+    area = cx = cy = 0.0
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        cx += (x0 + x1) * cross
+        cy += (y0 + y1) * cross
+    if area == 0:
+        return sum(p[1] for p in ring) / len(ring), sum(p[0] for p in ring) / len(ring)
+    return cy / (3 * area), cx / (3 * area)
+
+def _geocode_seeds():
+    """
+    Entradas precargadas: centroide de cada departamento de departamentos-mendoza.json
+    y las ciudades de Config.CITIES (más precisas, pisan al departamento homónimo).
+    """
+    seeds = {}
+    try:
+        with open(DEPARTAMENTOS_PATH, encoding='utf-8') as f:
+            geojson = json.load(f)
+        for feature in geojson.get('features', []):
+            geometry = feature['geometry']
+            polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+            # El anillo exterior del polígono más grande del departamento
+            ring = max((polygon[0] for polygon in polygons), key=len)
+            lat, lon = _polygon_centroid([tuple(point[:2]) for point in ring])
+            name = feature['properties']['departamento'].title()
+            seeds[normalize_place_name(name)] = {"lat": round(lat, 4), "lon": round(lon, 4), "name": name, "country": "Argentina"}
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ No se pudieron precargar los departamentos: {e}")
+
+    for key, city in Config.CITIES.items():
+        if "lat" in city and "lon" in city:
+            entry = {"lat": city["lat"], "lon": city["lon"], "name": city["name"], "country": "Argentina"}
+            seeds[normalize_place_name(key)] = entry
+            seeds[normalize_place_name(city["name"])] = entry
+    return seeds
+
+def _seed_geocode_cache():
+    """Carga las entradas precargadas en la caché compartida (una vez por proceso)"""
+    global _geocode_seeded
+    if _geocode_seeded:
+        return
+    with _geocode_seed_lock:
+        if _geocode_seeded:
+            return
+        try:
+            for key, entry in _geocode_seeds().items():
+                shared_cache.set(GEOCODE_NAMESPACE, key, entry, SEED_EXPIRES_AT)
+        except sqlite3.Error as e:
+            print(f"⚠️ No se pudo precargar la caché de geocodificación: {e}")
+        _geocode_seeded = True
+
 def geocode_city(city_name):
     """
     Convierte un nombre de ciudad en coordenadas geográficas (latitud y longitud).
+    Usa la caché compartida (precargada con las ciudades y departamentos de Mendoza):
+    en un acierto no hay ninguna llamada de red. "No encontrada" también se cachea.
     Args:
         city_name: Nombre de la ciudad a buscar (ej: "Mendoza")
     Returns:
         Diccionario con lat, lon, name y country, o diccionario de error si falla
     """
+    _seed_geocode_cache()
+    key = normalize_place_name(city_name)
+    try:
+        cached, _ = shared_cache.get(GEOCODE_NAMESPACE, key)
+    except sqlite3.Error as e:
+        print(f"⚠️ Caché de geocodificación no disponible: {e}")
+        cached = None
+
+    if cached is not None:
+        shared_cache.count(GEOCODE_NAMESPACE, "hit")
+        if cached.get("not_found"):
+            return {"error": f"Ciudad '{city_name}' no encontrada"}
+        return cached
+
+    shared_cache.count(GEOCODE_NAMESPACE, "miss")
+    shared_cache.count(GEOCODE_NAMESPACE, "upstream")
     j = _get_json(GEOCODE_URL, params={"name": city_name, "count": 1, "language": "es"})  # Busca la ciudad
-    if "error" in j:  # Si hubo error en la petición
+    if "error" in j:  # Si hubo error en la petición (no se cachea: puede ser transitorio)
         return {"error": j["error"]}
+
+    now = time.time()
     if not j.get("results"):  # Si no se encontraron resultados para la ciudad
+        _store_geocode(key, {"not_found": True}, now + Config.GEOCODE_NEGATIVE_TTL_SECONDS)
         return {"error": f"Ciudad '{city_name}' no encontrada"}
     res = j["results"][0]  # Toma el primer resultado de la búsqueda
-    return {"lat": res["latitude"], "lon": res["longitude"], "name": res.get("name"), "country": res.get("country")}
+    entry = {"lat": res["latitude"], "lon": res["longitude"], "name": res.get("name"), "country": res.get("country")}
+    _store_geocode(key, entry, now + Config.GEOCODE_TTL_SECONDS)
+    return entry
 
-def get_weather_by_coords(lat, lon):
+def _store_geocode(key, entry, expires_at):
+    try:
+        shared_cache.set(GEOCODE_NAMESPACE, key, entry, expires_at)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar la geocodificación en caché: {e}")
+
+def snap_to_grid(lat, lon, step=None):
+    """Ajusta lat/lon a la grilla del modelo: puntos de la misma celda comparten pronóstico"""
+    step = step or Config.FORECAST_GRID_DEGREES
+    return round(round(lat / step) * step, 4), round(round(lon / step) * step, 4)
+
+def _fetch_forecast(lat, lon):
     """
-    Obtiene el pronóstico del tiempo para unas coordenadas específicas,
-    solicitando las variables diarias y horarias necesarias para el modelo de predicción.
+    Pide el pronóstico a Open-Meteo, con las variables diarias y horarias
+    necesarias para el modelo de predicción. lat y lon pueden ser listas: Open-Meteo
+    acepta varias ubicaciones separadas por coma y devuelve una lista de respuestas.
     """
+    if isinstance(lat, (list, tuple)):
+        lat = ",".join(f"{value:.4f}" for value in lat)
+        lon = ",".join(f"{value:.4f}" for value in lon)
     params = {
         "latitude": lat,
         "longitude": lon,
@@ -59,14 +180,135 @@ def get_weather_by_coords(lat, lon):
         "timezone": "auto",
         "forecast_days": 1
     }
-    
-    j = _get_json(WEATHER_URL, params=params)
+    shared_cache.count(FORECAST_NAMESPACE, "upstream")
+    return _get_json(WEATHER_URL, params=params)
+
+def _forecast_expiry(now):
+    """Vencimiento alineado al ciclo de actualización del modelo (ej. el inicio de la próxima hora)"""
+    ttl = Config.FORECAST_TTL_SECONDS
+    return (now // ttl + 1) * ttl
+
+def _is_current_day(data):
+    """El pronóstico es de 1 día: después de la medianoche local el cacheado ya no sirve"""
+    try:
+        offset = timedelta(seconds=data.get("utc_offset_seconds", 0))
+        today = (datetime.now(timezone.utc) + offset).strftime("%Y-%m-%d")
+        return data["daily"]["time"][0] == today
+    except (KeyError, IndexError, TypeError):
+        return True
+
+def _store_forecast(key, data):
+    now = time.time()
+    try:
+        shared_cache.set(FORECAST_NAMESPACE, key, data, _forecast_expiry(now),
+                         now + Config.FORECAST_STALE_SECONDS, now=now)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar el pronóstico en caché: {e}")
+
+def _revalidate(key, lat, lon):
+    try:
+        data = _fetch_forecast(lat, lon)
+        if "error" not in data:
+            _store_forecast(key, data)
+            shared_cache.count(FORECAST_NAMESPACE, "revalidated")
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(key)
+
+def _revalidate_async(key, lat, lon):
+    """Refresca la celda en segundo plano (una sola vez por proceso)"""
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+    threading.Thread(target=_revalidate, args=(key, lat, lon), name='forecast-revalidate', daemon=True).start()
+
+def get_weather_by_coords(lat, lon):
+    """
+    Obtiene el pronóstico del tiempo para unas coordenadas específicas,
+    solicitando las variables diarias y horarias necesarias para el modelo de predicción.
+    Las coordenadas se ajustan a la grilla del modelo y la respuesta se cachea hasta la
+    próxima actualización; vencida se sigue sirviendo un tiempo mientras se revalida.
+    """
+    lat_q, lon_q = snap_to_grid(lat, lon)
+    key = _forecast_key(lat_q, lon_q)
+
+    try:
+        cached, state = shared_cache.get(FORECAST_NAMESPACE, key)
+    except sqlite3.Error as e:
+        print(f"⚠️ Caché de pronósticos no disponible: {e}")
+        cached, state = None, None
+
+    if cached is not None and _is_current_day(cached):
+        if state == "fresh":
+            shared_cache.count(FORECAST_NAMESPACE, "hit")
+            return cached
+        shared_cache.count(FORECAST_NAMESPACE, "stale")
+        _revalidate_async(key, lat_q, lon_q)
+        return cached
+
+    shared_cache.count(FORECAST_NAMESPACE, "miss")
+    j = _fetch_forecast(lat_q, lon_q)
     if "error" in j:
         return {"error": j["error"]}
     
+    _store_forecast(key, j)
     # La respuesta ahora contiene 'daily' y 'hourly' que serán procesados por el orquestador
     return j
 
+def _forecast_key(lat_q, lon_q):
+    return f"{lat_q:.4f},{lon_q:.4f}"
+
+def get_weather_bulk(points, chunk_size=None):
+    """
+    Pronósticos para muchas coordenadas [(lat, lon), ...] con pocas llamadas: las celdas
+    frescas salen de la caché y el resto se pide a Open-Meteo en lotes de `chunk_size`
+    ubicaciones por request. Si un lote falla se usa la versión vencida de la caché.
+    Devuelve una lista alineada con `points` (respuesta de Open-Meteo o {"error": ...}).
+    """
+    chunk_size = chunk_size or Config.FORECAST_BULK_CHUNK
+    keys = []
+    cells = {}  # clave -> (lat, lon) ajustados a la grilla
+    for lat, lon in points:
+        lat_q, lon_q = snap_to_grid(lat, lon)
+        key = _forecast_key(lat_q, lon_q)
+        keys.append(key)
+        cells[key] = (lat_q, lon_q)
+
+    found = {}
+    stale = {}
+    for key in cells:
+        try:
+            cached, state = shared_cache.get(FORECAST_NAMESPACE, key)
+        except sqlite3.Error:
+            cached, state = None, None
+        if cached is not None and _is_current_day(cached):
+            if state == "fresh":
+                found[key] = cached
+                shared_cache.count(FORECAST_NAMESPACE, "hit")
+                continue
+            stale[key] = cached
+            shared_cache.count(FORECAST_NAMESPACE, "stale")
+        else:
+            shared_cache.count(FORECAST_NAMESPACE, "miss")
+
+    missing = [key for key in cells if key not in found]
+    for start in range(0, len(missing), chunk_size):
+        chunk = missing[start:start + chunk_size]
+        data = _fetch_forecast([cells[key][0] for key in chunk], [cells[key][1] for key in chunk])
+        if isinstance(data, dict) and "error" not in data:
+            data = [data]  # Con una sola ubicación Open-Meteo devuelve un objeto, no una lista
+        if not isinstance(data, list) or len(data) != len(chunk):
+            error = data.get("error") if isinstance(data, dict) else "respuesta inesperada de Open-Meteo"
+            for key in chunk:
+                found[key] = stale.get(key) or {"error": error}
+            continue
+        for key, item in zip(chunk, data):
+            _store_forecast(key, item)
+            found[key] = item
+
+    return [found[key] for key in keys]
+
 def get_clima_ciudad(city_name):
     """
     Función principal: Obtiene el clima para una ciudad por su nombre.
@@ -98,37 +340,32 @@ def get_clima_by_ip(ip=None):
     """
     Obtiene el clima basado en la ubicación de una dirección IP.
     Args:
-        ip: Dirección IP (si es None, usa la IP del cliente que hace la petición)
+        ip: Dirección IP del cliente (si es None, se geolocaliza la IP del servidor)
     Returns:
         Diccionario con información de ubicación y clima, o error
     """
-    url = IP_API_BASE + (ip if ip else "")  # Construye la URL: con IP específica o vacía para IP actual
-    j = _get_json(url)  # Obtiene información de geolocalización por IP
-    if "error" in j:  # Si hubo error en la petición
-        return {"error": j["error"]}
-    
-    # ip-api devuelve {"status":"fail", "message": "..."} cuando falla
-    if j.get("status") != "success":  # Si la API reporta fallo
-        return {"error": j.get("message") or "ip-api falló al geolocalizar"}
-    
-    lat = j.get("lat")  # Extrae latitud
-    lon = j.get("lon")  # Extrae longitud
-    if lat is None or lon is None:  # Si no vienen coordenadas
-        return {"error": "ip-api no devolvió coordenadas para la IP"}
+    if isinstance(ip, str):
+        try:
+            ip = ipaddress.ip_address(ip)
+        except ValueError:
+            return {"error": f"IP inválida: {ip}"}
+
+    location = locate_ip(ip)  # Red privada, caché por prefijo, GeoIP offline o ip-api
+    if "error" in location:  # Si falló la geolocalización
+        return {"error": location["error"]}
     
-    # CAMBIO IMPORTANTE: Eliminado hourly_fields - solo obtenemos datos actuales
-    weather = get_weather_by_coords(lat, lon)  # Sin hourly_fields
+    weather = get_weather_by_coords(location["lat"], location["lon"])
     
     if "error" in weather:  # Si falla la obtención del clima
         return {"error": weather["error"]}
     
     return {  # Retorna toda la información combinada
-        "source": "ip-api",  # Indica que se usó geolocalización por IP
-        "ip": j.get("query"),  # Dirección IP usada
-        "city": j.get("city"),  # Ciudad
-        "region": j.get("regionName"),  # Región/Provincia
-        "country": j.get("country"),  # País
-        "lat": lat,  # Latitud
-        "lon": lon,  # Longitud
-        "weather": weather  # Datos del clima (solo current_weather)
-    }
\ No newline at end of file
+        "source": location["source"],  # ip-api, geoip o default (red privada)
+        "ip": location.get("ip"),  # Dirección IP usada
+        "city": location.get("city"),  # Ciudad
+        "region": location.get("region"),  # Región/Provincia
+        "country": location.get("country"),  # País
+        "lat": location["lat"],  # Latitud
+        "lon": location["lon"],  # Longitud
+        "weather": weather  # Datos del clima
+    }
@@ -1,5 +1,6 @@
 import requests
 from src.config import Config
+from src.services.http_client import get_client
 import time
 import unicodedata
 
@@ -37,7 +38,7 @@ def get_news(category='general', limit=5):
     
     try:
         print(f"📡 Solicitando {params['pageSize']} noticias de '{params['q']}' a NewsAPI.org...")
-        response = requests.get(Config.NEWSAPI_URL, params=params)
+        response = get_client('newsapi').get(Config.NEWSAPI_URL, params=params)
         response.raise_for_status()  # Lanza un error para respuestas 4xx/5xx
         
         data = response.json()
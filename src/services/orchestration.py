@@ -1,90 +1,262 @@
-import requests
-from datetime import datetime
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
 import numpy as np
-from src.services.meteo import get_weather_by_coords
+import requests
+from src.config import Config
+from src.services.meteo import get_weather_by_coords, snap_to_grid
+from src.services.sqlite_cache import shared_cache
+from src.services.http_client import get_client
+from src.services.hail_features import build_row, row_to_dict
+from src.services.hail_model import hail_model
+from src.services.goes_service import frame_store
+from src.services.inference_batcher import MicroBatcher
 
 # =====================================================================================
-# URL de la API de predicción en Hugging Face Spaces
-HUGGING_FACE_API_URL = "https://nahuelito22-nimbus-ai.hf.space/api/predict"
+# URL de la API de predicción en Hugging Face Spaces (backend remoto / respaldo)
+HUGGING_FACE_API_URL = Config.HF_PREDICTION_URL
 # =====================================================================================
 
-def _transform_data_for_model(lat, lon, open_meteo_data):
+LATENCY_WINDOW = 500  # Predicciones recientes por backend para los percentiles
+
+_latencies = {"local": deque(maxlen=LATENCY_WINDOW), "remote": deque(maxlen=LATENCY_WINDOW)}
+_counters = {"local": 0, "remote": 0, "fallback": 0, "errors": 0}
+_stats_lock = threading.Lock()
+
+PREDICTION_NAMESPACE = "prediction"  # Namespace de las predicciones en la caché compartida
+_revalidating = set()  # Celdas con una revalidación en curso en este proceso
+_revalidating_lock = threading.Lock()
+
+def _predict_batch(matrix):
+    """Un lote de filas de features -> probabilidades (misma secuencia de imágenes para todas)"""
+    return hail_model.predict(matrix, hail_model.image_sequence(frame_store))
+
+# Las requests concurrentes comparten una sola llamada al modelo local
+prediction_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch=Config.PREDICTION_BATCH_MAX_SIZE,
+    max_wait_ms=Config.PREDICTION_BATCH_MAX_WAIT_MS,
+    name='hail-batcher',
+)
+
+def _record(backend, started, error=False):
+    with _stats_lock:
+        _latencies[backend].append(time.perf_counter() - started)
+        _counters[backend] += 1
+        if error:
+            _counters["errors"] += 1
+
+def _predict_local(features):
     """
-    Transforma la respuesta de Open-Meteo al formato plano que espera el modelo de ML.
+    Predicción con el modelo cargado en el proceso (imágenes: últimos escaneos C13).
+    La fila se encola en el micro-lote y se espera su resultado.
     """
-    if "error" in open_meteo_data:
-        raise ValueError(f"Error en los datos de Open-Meteo: {open_meteo_data['error']}")
-
-    daily = open_meteo_data.get("daily", {})
-    hourly = open_meteo_data.get("hourly", {})
-
-    # --- 1. Extraer y calcular promedios de datos horarios ---
-    # Usamos np.mean para calcular el promedio, asegurándonos de manejar listas vacías.
-    om_dew_point_2m_mean = np.mean(hourly.get("dew_point_2m", [0]))
-    om_relative_humidity_2m_mean = np.mean(hourly.get("relative_humidity_2m", [0]))
-    om_pressure_msl_mean = np.mean(hourly.get("pressure_msl", [0]))
-
-    # --- 2. Extraer datos diarios (tomando el primer valor de la lista) ---
-    # Open-Meteo devuelve listas para los datos diarios, incluso si solo pedimos 1 día.
-    tmax = daily.get("temperature_2m_max", [0])[0]
-    tmin = daily.get("temperature_2m_min", [0])[0]
-    
-    # --- 3. Derivar características de fecha ---
-    now = datetime.now()
-    mes = now.month
-    dia_del_año = now.timetuple().tm_yday
-
-    # --- 4. Construir el diccionario final con las 22 características ---
-    model_input = {
-        "PRCP": daily.get("precipitation_sum", [0])[0],
-        "SNWD": daily.get("snowfall_sum", [0])[0],
-        "TAVG": (tmax + tmin) / 2,  # Calculado
-        "TMAX": tmax,
-        "TMIN": tmin,
-        "latitude": lat,
-        "longitude": lon,
-        "om_weather_code": daily.get("weather_code", [0])[0],
-        "om_rain_sum": daily.get("rain_sum", [0])[0],
-        "om_snowfall_sum": daily.get("snowfall_sum", [0])[0],
-        "om_precipitation_hours": daily.get("precipitation_hours", [0])[0],
-        "om_wind_gusts_10m_max": daily.get("wind_gusts_10m_max", [0])[0],
-        "om_wind_direction_10m_dominant": daily.get("wind_direction_10m_dominant", [0])[0],
-        "om_shortwave_radiation_sum": daily.get("shortwave_radiation_sum", [0])[0],
-        "om_et0_fao_evapotranspiration": daily.get("et0_fao_evapotranspiration", [0])[0],
-        "om_dew_point_2m_mean": om_dew_point_2m_mean, # Promedio
-        "om_relative_humidity_2m_mean": om_relative_humidity_2m_mean, # Promedio
-        "om_pressure_msl_mean": om_pressure_msl_mean, # Promedio
-        "mes": mes, # Derivado
-        "dia_del_año": dia_del_año, # Derivado
-        "rango_temp_diario": tmax - tmin, # Calculado
-    }
-    
-    return model_input
+    started = time.perf_counter()
+    try:
+        probability = prediction_batcher.predict(features, timeout=Config.PREDICTION_TIMEOUT_SECONDS)
+    except Exception:
+        _record("local", started, error=True)
+        raise
+    _record("local", started)
+    return dict(hail_model.to_response(probability), backend="local")
 
-def get_hail_prediction(lat, lon):
+def _predict_remote(features):
+    """Predicción con la API de Hugging Face Spaces"""
+    if HUGGING_FACE_API_URL == "URL_DE_TU_API_EN_HUGGING_FACE_AQUI":
+        return {"error": "La URL de la API de Hugging Face no ha sido configurada."}
+
+    started = time.perf_counter()
+    try:
+        response = get_client('huggingface').post(HUGGING_FACE_API_URL, json=row_to_dict(features))
+        response.raise_for_status()  # Lanza un error para respuestas 4xx/5xx
+        result = response.json()
+    except (requests.RequestException, ValueError) as e:
+        _record("remote", started, error=True)
+        return {"error": f"Error al contactar el modelo de predicción: {e}"}
+    _record("remote", started)
+    if isinstance(result, dict):
+        result.setdefault("backend", "remote")
+    return result
+
+def _compute_prediction(lat, lon):
     """
-    Función orquestadora principal.
-    1. Obtiene datos de Open-Meteo.
-    2. Transforma los datos para el modelo.
-    3. Llama a la API de predicción en Hugging Face.
-    4. Devuelve el resultado.
+    Sin caché: datos de Open-Meteo, fila de features y predicción.
+    Devuelve (resultado, features, pronóstico); features es None si no se pudo armar.
     """
     # 1. Obtener datos de Open-Meteo
     weather_data = get_weather_by_coords(lat, lon)
-    
+
     # 2. Transformar datos
     try:
-        model_input = _transform_data_for_model(lat, lon, weather_data)
+        features = build_row(weather_data, lat, lon)
     except ValueError as e:
-        return {"error": str(e)}
+        return {"error": str(e)}, None, weather_data
 
-    # 3. Llamar a la API de Hugging Face
-    if HUGGING_FACE_API_URL == "URL_DE_TU_API_EN_HUGGING_FACE_AQUI":
-        return {"error": "La URL de la API de Hugging Face no ha sido configurada."}
+    # 3. Predecir
+    if Config.PREDICTION_BACKEND != 'local':
+        return _predict_remote(features), features, weather_data
 
     try:
-        response = requests.post(HUGGING_FACE_API_URL, json=model_input, timeout=20)
-        response.raise_for_status()  # Lanza un error para respuestas 4xx/5xx
-        return response.json()
-    except requests.RequestException as e:
-        return {"error": f"Error al contactar el modelo de predicción: {e}"}
+        return _predict_local(features), features, weather_data
+    except Exception as e:
+        if not Config.PREDICTION_REMOTE_FALLBACK:
+            return {"error": f"Error en el modelo de predicción local: {e}"}, features, weather_data
+        print(f"⚠️ Modelo local no disponible, se usa la API de Hugging Face: {e}")
+        with _stats_lock:
+            _counters["fallback"] += 1
+        return _predict_remote(features), features, weather_data
+
+def _model_version():
+    """
+    Versión del modelo que identifica las predicciones cacheadas: el hash del artefacto
+    local (cambia, y se recarga el modelo, si el archivo cambia) o 'remote'. Se toma del
+    archivo sin cargar el modelo, así una request no espera a TensorFlow solo para
+    consultar la caché. None si el modelo local falló al cargar (no se cachea el
+    respaldo remoto).
+    """
+    if Config.PREDICTION_BACKEND != 'local':
+        return 'remote'
+    if hail_model.load_error is not None:
+        return None
+    return hail_model.file_version()
+
+def _inputs_fingerprint(features):
+    """Huella de las features: cambia cuando llega una corrida nueva del pronóstico"""
+    return hashlib.sha1(np.ascontiguousarray(features, dtype=np.float32).tobytes()).hexdigest()[:16]
+
+def _is_current_day(entry):
+    """La predicción es para el día del pronóstico: después de la medianoche local ya no sirve"""
+    offset = timedelta(seconds=entry.get("utc_offset_seconds") or 0)
+    return entry.get("date") in (None, (datetime.now(timezone.utc) + offset).strftime("%Y-%m-%d"))
+
+def _store_prediction(key, version, result, features, weather_data):
+    """Guarda el resultado si lo generó el backend configurado (no el respaldo)"""
+    if "error" in result or features is None:
+        return
+    if (version == 'remote') != (result.get("backend") == 'remote'):
+        return
+    now = time.time()
+    ttl = Config.PREDICTION_TTL_SECONDS
+    expires_at = (now // ttl + 1) * ttl  # Alineado a la actualización horaria del pronóstico
+    entry = {
+        "result": result,
+        "inputs": _inputs_fingerprint(features),
+        "date": ((weather_data.get("daily") or {}).get("time") or [None])[0],
+        "utc_offset_seconds": weather_data.get("utc_offset_seconds"),
+    }
+    try:
+        shared_cache.set(PREDICTION_NAMESPACE, key, entry, expires_at,
+                         expires_at + Config.PREDICTION_STALE_SECONDS, now=now)
+    except sqlite3.Error as e:
+        print(f"⚠️ No se pudo guardar la predicción en caché: {e}")
+
+def _revalidate(key, version, lat, lon, entry):
+    """Recalcula la celda; si la corrida del pronóstico no cambió se reutiliza el resultado"""
+    try:
+        weather_data = get_weather_by_coords(lat, lon)
+        try:
+            features = build_row(weather_data, lat, lon)
+        except ValueError:
+            return
+        if _inputs_fingerprint(features) == entry.get("inputs"):
+            _store_prediction(key, version, entry["result"], features, weather_data)
+            shared_cache.count(PREDICTION_NAMESPACE, "unchanged")
+            return
+        result, features, weather_data = _compute_prediction(lat, lon)
+        _store_prediction(key, version, result, features, weather_data)
+        shared_cache.count(PREDICTION_NAMESPACE, "revalidated")
+    finally:
+        with _revalidating_lock:
+            _revalidating.discard(key)
+
+def _revalidate_async(key, version, lat, lon, entry):
+    """Refresca la predicción en segundo plano (una sola vez por proceso)"""
+    with _revalidating_lock:
+        if key in _revalidating:
+            return
+        _revalidating.add(key)
+    threading.Thread(target=_revalidate, args=(key, version, lat, lon, entry),
+                     name='prediction-revalidate', daemon=True).start()
+
+def get_hail_prediction(lat, lon):
+    """
+    Función orquestadora principal.
+    1. Obtiene datos de Open-Meteo.
+    2. Arma la fila de features del modelo (hail_features, igual que en lote).
+    3. Predice con el modelo local (o la API de Hugging Face si así se configura
+       o si el modelo local no está disponible).
+    4. Devuelve el resultado.
+    Las predicciones se cachean por celda de la grilla de pronósticos y versión del
+    modelo hasta la próxima actualización horaria; vencidas se siguen sirviendo un
+    tiempo mientras se revalidan.
+    """
+    if not Config.PREDICTION_CACHE_ENABLED:
+        return _compute_prediction(lat, lon)[0]
+
+    # Todos los puntos de la celda comparten pronóstico, y por lo tanto predicción
+    lat_q, lon_q = snap_to_grid(lat, lon)
+    version = _model_version()
+    if version is None:
+        return _compute_prediction(lat_q, lon_q)[0]
+    key = f"{version}:{lat_q:.4f},{lon_q:.4f}"
+
+    try:
+        entry, state = shared_cache.get(PREDICTION_NAMESPACE, key)
+    except sqlite3.Error as e:
+        print(f"⚠️ Caché de predicciones no disponible: {e}")
+        entry, state = None, None
+
+    if entry is not None and _is_current_day(entry):
+        if state == "fresh":
+            shared_cache.count(PREDICTION_NAMESPACE, "hit")
+            return entry["result"]
+        shared_cache.count(PREDICTION_NAMESPACE, "stale")
+        _revalidate_async(key, version, lat_q, lon_q, entry)
+        return entry["result"]
+
+    shared_cache.count(PREDICTION_NAMESPACE, "miss")
+    result, features, weather_data = _compute_prediction(lat_q, lon_q)
+    _store_prediction(key, version, result, features, weather_data)
+    return result
+
+def _percentile_ms(values, q):
+    if not values:
+        return None
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000, 1)
+
+def get_prediction_stats():
+    """Backend configurado, estado del modelo local y latencias p50/p99 por backend"""
+    with _stats_lock:
+        latencies = {backend: sorted(values) for backend, values in _latencies.items()}
+        counters = dict(_counters)
+    return {
+        "backend": Config.PREDICTION_BACKEND,
+        "remote_fallback": Config.PREDICTION_REMOTE_FALLBACK,
+        "model": hail_model.status(),
+        "batching": prediction_batcher.stats(),
+        "cache": shared_cache.stats().get(PREDICTION_NAMESPACE, {}),
+        "counters": counters,
+        "latency_ms": {
+            backend: {"p50": _percentile_ms(values, 0.5), "p99": _percentile_ms(values, 0.99), "samples": len(values)}
+            for backend, values in latencies.items()
+        },
+    }
+
+def _warm_up():
+    if not hail_model.warm_up():
+        return
+    # Las ciudades monitoreadas quedan en la caché de predicciones desde el arranque
+    for city in Config.CITIES.values():
+        try:
+            get_hail_prediction(city["lat"], city["lon"])
+        except Exception as e:
+            print(f"⚠️ No se pudo precalcular la predicción de {city['name']}: {e}")
+
+def warm_up_prediction_backend():
+    """Carga el modelo local en segundo plano al iniciar (no bloquea el arranque)"""
+    if Config.PREDICTION_BACKEND == 'local':
+        threading.Thread(target=_warm_up, daemon=True, name='hail-model-warmup').start()
@@ -0,0 +1,188 @@
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas concurrentes dentro del proceso: para una misma clave
+    solo se ejecuta una función a la vez y el resto de los hilos espera su resultado.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+        return call.result
+
+
+class FileLock:
+    """
+    Lock entre procesos (ej. workers de gunicorn) sobre un archivo.
+    En POSIX usa flock: el sistema operativo lo libera si el proceso muere, así que no
+    hay locks abandonados. Quien lo obtiene comprueba que el archivo siga siendo el
+    mismo (otro lo pudo borrar al liberarlo) y solo el dueño lo borra.
+    En Windows usa la creación exclusiva del archivo con un token propio: solo se borra
+    si el token sigue siendo el nuestro, y los abandonados se liberan por antigüedad.
+    """
+
+    def __init__(self, path, timeout=300, stale_after=600, poll_interval=0.2):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._token = None
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while not (self._try_flock() if fcntl is not None else self._try_create()):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"No se pudo obtener el lock {self.path}")
+            time.sleep(self.poll_interval)
+
+    def _try_flock(self):
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # Si el dueño anterior lo borró al liberarlo, este descriptor apunta a un archivo viejo
+            current = os.stat(self.path)
+            opened = os.fstat(fd)
+            if (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+                os.close(fd)
+                return False
+        except (BlockingIOError, FileNotFoundError):
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def _read_token(self):
+        try:
+            with open(self.path) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _try_create(self):
+        token = f"{os.getpid()} {uuid.uuid4().hex}"
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            with os.fdopen(fd, 'w') as f:
+                f.write(token)
+            self._token = token
+            return True
+        except FileExistsError:
+            pass
+
+        owner = self._read_token()
+        try:
+            stale = time.time() - os.path.getmtime(self.path) > self.stale_after
+        except FileNotFoundError:
+            return False
+        # Solo se borra si sigue siendo el mismo lock abandonado (no uno recién tomado por otro)
+        if stale and owner is not None and self._read_token() == owner:
+            print(f"⚠️ Liberando lock abandonado: {os.path.basename(self.path)}")
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+        return False
+
+    def release(self):
+        if self._fd is not None:
+            # Se borra mientras todavía se tiene el flock: así nadie borra un archivo ajeno
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            os.close(self._fd)
+            self._fd = None
+        elif self._token is not None:
+            if self._read_token() == self._token:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+            self._token = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class ProcessLock:
+    """
+    Lock exclusivo y no bloqueante que se mantiene mientras viva el proceso, sobre un
+    archivo con flock (o msvcrt en Windows). El sistema operativo lo libera si el
+    proceso termina, así que nunca queda abandonado. Sirve para elegir un solo proceso
+    por servidor para las tareas de fondo (ej. la ingesta GOES entre workers de gunicorn).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self):
+        return self._file is not None
+
+    def try_acquire(self):
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
@@ -0,0 +1,101 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from src.config import Config
+
+
+class SQLiteTTLCache:
+    """
+    Caché clave-valor con TTL en SQLite, compartida por todos los workers del servidor
+    (modo WAL: lecturas concurrentes y una escritura a la vez). Cada entrada tiene dos
+    vencimientos: hasta `expires_at` es fresca y hasta `stale_until` todavía se puede
+    servir mientras se revalida en segundo plano. Los valores se guardan como JSON y
+    cada uso se agrupa por `namespace` (pronósticos, geocodificación, ...).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(int))
+        self._initialized = False
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with self._lock:
+                if not self._initialized:
+                    conn.execute(
+                        'CREATE TABLE IF NOT EXISTS cache ('
+                        ' namespace TEXT NOT NULL,'
+                        ' key TEXT NOT NULL,'
+                        ' value TEXT NOT NULL,'
+                        ' stored_at REAL NOT NULL,'
+                        ' expires_at REAL NOT NULL,'
+                        ' stale_until REAL NOT NULL,'
+                        ' PRIMARY KEY (namespace, key))'
+                    )
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def count(self, namespace, event, amount=1):
+        """Suma a un contador del namespace (hit, stale, miss, upstream, ...)"""
+        with self._lock:
+            self._stats[namespace][event] += amount
+
+    def get(self, namespace, key, now=None):
+        """
+        Devuelve (valor, estado) con estado 'fresh', 'stale' o None si no hay entrada
+        utilizable. No modifica los contadores.
+        """
+        now = now or time.time()
+        row = self._connect().execute(
+            'SELECT value, expires_at, stale_until FROM cache WHERE namespace = ? AND key = ?',
+            (namespace, key)
+        ).fetchone()
+        if row is None or now >= row[2]:
+            return None, None
+        return json.loads(row[0]), 'fresh' if now < row[1] else 'stale'
+
+    def set(self, namespace, key, value, expires_at, stale_until=None, now=None):
+        now = now or time.time()
+        self._connect().execute(
+            'INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at, stale_until) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (namespace, key, json.dumps(value), now, expires_at, max(expires_at, stale_until or expires_at))
+        )
+
+    def delete(self, namespace, key=None):
+        """Borra una entrada, o todo el namespace si key es None"""
+        if key is None:
+            self._connect().execute('DELETE FROM cache WHERE namespace = ?', (namespace,))
+        else:
+            self._connect().execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+
+    def purge(self, now=None):
+        """Elimina las entradas que ya no se pueden servir ni siquiera como stale"""
+        now = now or time.time()
+        return self._connect().execute('DELETE FROM cache WHERE stale_until <= ?', (now,)).rowcount
+
+    def stats(self):
+        """Contadores por namespace (de este proceso) con la tasa de aciertos"""
+        with self._lock:
+            snapshot = {namespace: dict(counters) for namespace, counters in self._stats.items()}
+        for counters in snapshot.values():
+            served = counters.get('hit', 0) + counters.get('stale', 0)
+            lookups = served + counters.get('miss', 0)
+            counters['hit_ratio'] = round(served / lookups, 3) if lookups else None
+        return snapshot
+
+
+# Caché compartida por los servicios (pronósticos, geocodificación, ...)
+shared_cache = SQLiteTTLCache(Config.CACHE_DB_PATH)
@@ -0,0 +1,54 @@
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+
+
+def _pid_alive(pid):
+    """Si el proceso sigue vivo. En Windows os.kill terminaría el proceso: se asume vivo."""
+    if os.name != 'posix' or not pid:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class StatusFile:
+    """
+    Estado de una tarea de fondo compartido por todos los workers del servidor. Solo un
+    proceso corre la tarea (el que tiene el lock de tareas de fondo) y publica su estado
+    de forma atómica, como los manifiestos; cualquier worker lo lee y responde igual.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def publish(self, status):
+        """Reemplaza el estado publicado, con el PID del proceso dueño y la hora"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        status = dict(status, pid=os.getpid(), updated_at=datetime.now(timezone.utc).isoformat())
+        tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(status, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️ No se pudo publicar el estado en {self.path}: {e}")
+
+    def read(self):
+        """
+        Último estado publicado, o {"running": False} si ninguna tarea lo publicó. Si el
+        proceso dueño ya terminó, running pasa a False.
+        """
+        try:
+            with open(self.path) as f:
+                status = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {"running": False}
+        if not _pid_alive(status.get("pid")):
+            status["running"] = False
+        return status